@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Per-file logging overhead of FileOrganizer with the different logging setups.
+
+Runs the same dry run over a directory of empty files once per setup, with
+the log written to a file (console output goes to /dev/null), and reports
+the wall time of the run and the overhead per file over a summary-only run.
+"stock" is the logging setup before the caller/thread/process lookups were
+turned off, i.e. how every file was logged previously.
+For the background setups, "drained" is the time until the listener has
+written the last line; the run itself only waits for the queue.
+
+Usage:
+    python benchmarks/bench_logging.py [--files 20000] [--workers 1] [--repeat 3]
+                                       [--tmp DIR]
+"""
+
+import argparse
+import atexit
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from file_folder_migration import FileOrganizer, setup_logging, skip_record_lookups  # noqa: E402
+
+# What skip_record_lookups turns off, as logging sets it; kept for the "stock" setup
+STOCK_FLAGS = {name: getattr(logging, name)
+               for name in ('_srcfile', 'logThreads', 'logProcesses', 'logMultiprocessing')}
+
+# (label, background, per-file mode, op log)
+SETUPS = [
+    ("summary only", False, 'none', False),
+    ("stock, every file", False, 'all', False),
+    ("sync, every file", False, 'all', False),
+    ("background, every file", True, 'all', False),
+    ("sync, 1 in 100", False, 'sample', False),
+    ("background, 1 in 100", True, 'sample', False),
+    ("summary + JSON op log", False, 'none', True),
+]
+
+
+def run(source: Path, tmp: str, workers: int, background: bool, per_file: str, op_log: bool,
+        stock: bool = False):
+    """One dry run; returns (run seconds, drained seconds)."""
+    root = logging.getLogger()
+    root.handlers.clear()
+    stderr, sys.stderr = sys.stderr, open(os.devnull, 'w')
+    try:
+        if stock:
+            for name, value in STOCK_FLAGS.items():
+                setattr(logging, name, value)
+        else:
+            skip_record_lookups()
+        listener = setup_logging(log_file=os.path.join(tmp, "bench.log"), background=background)
+        organizer = FileOrganizer(str(source), os.path.join(tmp, "dst"), pattern={"file_type": ".txt"},
+                                  dry_run=True, workers=workers, log_items=per_file,
+                                  op_log=os.path.join(tmp, "ops.jsonl") if op_log else None)
+        start = time.perf_counter()
+        organizer.organize()
+        elapsed = time.perf_counter() - start
+        if listener is not None:
+            listener.stop()
+            atexit.unregister(listener.stop)
+        drained = time.perf_counter() - start
+        for handler in root.handlers:
+            handler.close()
+        return elapsed, drained
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per setup (the fastest is shown)')
+    parser.add_argument('--tmp', default=None, help='Directory to create the test tree and log in')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory(dir=args.tmp) as tmp:
+        source = Path(tmp) / "src"
+        source.mkdir()
+        for i in range(args.files):
+            (source / f"file{i:06d}.txt").touch()
+        print(f"{args.files} files, workers={args.workers}, dry run, log file in {tmp}")
+        
+        baseline = None
+        for label, background, per_file, op_log in SETUPS:
+            elapsed, drained = min(run(source, tmp, args.workers, background, per_file, op_log,
+                                       stock=label.startswith("stock"))
+                                   for _ in range(args.repeat))
+            baseline = baseline or elapsed
+            overhead_us = (elapsed - baseline) / args.files * 1e6
+            print(f"{label:24s} {elapsed:7.3f} s  drained {drained:7.3f} s  "
+                  f"{overhead_us:+7.2f} us/file")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: compiled RuleMatcher vs. the original per-call interpretation.
+
+Runs the name/type part of matching over a list of synthetic filenames (no
+disk access) and checks that both implementations agree on every name.
+
+Usage:
+    python benchmarks/bench_matcher.py [--count 100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from file_folder_migration import RuleMatcher  # noqa: E402
+
+
+CRITERIA = {
+    "name_pattern": ["_1", "_draft$", "^Report", "^Summary", "*2024*", "*invoice*"],
+    "file_type": [".pdf", "docx", ".JPG", ".png", "xlsx"],
+}
+
+STEMS = ["Report", "Summary", "photo", "invoice", "scan", "notes", "data"]
+SUFFIXES = ["", "_1", "_2", "_draft", "_final", "_2024", "_v3"]
+EXTS = [".pdf", ".docx", ".jpg", ".png", ".txt", ".xlsx", ".mp4", ".zip"]
+
+
+def legacy_matches(criteria: dict, filename: str) -> bool:
+    """Name/type part of FileOrganizer.matches_pattern before compilation."""
+    name, ext = os.path.splitext(filename)
+    
+    name_pattern = criteria.get("name_pattern")
+    if name_pattern is not None:
+        patterns = [name_pattern] if isinstance(name_pattern, str) else name_pattern
+        pattern_matched = False
+        for pattern in patterns:
+            if pattern.startswith("^") and pattern.endswith("$"):
+                if name == pattern[1:-1]:
+                    pattern_matched = True
+                    break
+            elif pattern.startswith("^"):
+                if name.startswith(pattern[1:]):
+                    pattern_matched = True
+                    break
+            elif pattern.endswith("$"):
+                if name.endswith(pattern[:-1]):
+                    pattern_matched = True
+                    break
+            elif pattern.startswith("*") and pattern.endswith("*"):
+                if pattern[1:-1] in name:
+                    pattern_matched = True
+                    break
+            else:
+                if name.endswith(pattern):
+                    pattern_matched = True
+                    break
+        if not pattern_matched:
+            return False
+    
+    file_type = criteria.get("file_type")
+    if file_type is not None:
+        types = [file_type] if isinstance(file_type, str) else file_type
+        types = ["." + t if not t.startswith(".") else t for t in types]
+        type_matched = False
+        for ftype in types:
+            if ext.lower() == ftype.lower():
+                type_matched = True
+                break
+        if not type_matched:
+            return False
+    
+    return True
+
+
+def compiled_matches(matcher: RuleMatcher, filename: str) -> bool:
+    """Name/type part of FileOrganizer.matches_pattern using RuleMatcher."""
+    name, ext = os.path.splitext(filename)
+    return matcher.match_type(ext) and matcher.match_name(name)
+
+
+def make_names(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(STEMS)}{rng.randint(0, 9999)}{rng.choice(SUFFIXES)}{rng.choice(EXTS)}"
+        if rng.random() < 0.5 else
+        f"{rng.choice(STEMS)}_{rng.randint(0, 9999)}{rng.choice(SUFFIXES)}{rng.choice(EXTS)}"
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    names = make_names(args.count)
+    matcher = RuleMatcher(CRITERIA)
+    
+    legacy = [legacy_matches(CRITERIA, n) for n in names]
+    compiled = [compiled_matches(matcher, n) for n in names]
+    assert legacy == compiled, "compiled matcher disagrees with legacy matching"
+    
+    t_legacy = min(timeit.repeat(lambda: [legacy_matches(CRITERIA, n) for n in names],
+                                 number=1, repeat=args.repeat))
+    t_compiled = min(timeit.repeat(lambda: [compiled_matches(matcher, n) for n in names],
+                                   number=1, repeat=args.repeat))
+    
+    print(f"names:    {args.count} ({sum(compiled)} matching)")
+    print(f"legacy:   {t_legacy * 1000:8.1f} ms  ({t_legacy / args.count * 1e9:6.0f} ns/name)")
+    print(f"compiled: {t_compiled * 1000:8.1f} ms  ({t_compiled / args.count * 1e9:6.0f} ns/name)")
+    print(f"speedup:  {t_legacy / t_compiled:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Syscall counts for scanning the source: one os.scandir pass vs. iterdir.
+
+The "legacy" scan reproduces the pre-scandir code path: iterdir() for the
+folder scan, iterdir() again for the file scan, is_dir()/is_file() per entry
+and a stat() per name/type match in matches_pattern. The "scandir" scan is
+FileOrganizer.scan_source() shared by get_folders_to_migrate() and
+get_matching_files().
+
+When strace is on PATH, real syscalls are counted (strace -f -c). Otherwise
+filesystem calls are counted at the Python level: os.stat/os.lstat/
+os.listdir/os.scandir plus the first stat() of each DirEntry (is_file()/
+is_dir() answered from d_type cost nothing).
+
+Usage:
+    python benchmarks/bench_scan.py [--files 20000] [--folders 200]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from file_folder_migration import FileOrganizer  # noqa: E402
+
+
+STAT_CALLS = ("stat", "lstat", "fstat", "newfstatat", "statx", "fstatat64",
+              "getdents64", "getdents", "openat", "close")
+
+FILE_RULES = {
+    "name-only": {"name_pattern": "_1"},
+    "with-size": {"name_pattern": "_1", "min_size_mb": 0},
+}
+FOLDER_RULE = {"name_pattern": "^Proj"}
+
+
+def make_tree(root: Path, files: int, folders: int) -> None:
+    for i in range(files):
+        (root / f"doc{i}{'_1' if i % 3 == 0 else ''}.pdf").write_bytes(b"x")
+    for i in range(folders):
+        (root / f"{'Proj' if i % 2 == 0 else 'Misc'}{i}").mkdir()
+
+
+def legacy_scan(organizer: FileOrganizer) -> int:
+    """iterdir-based scan as it was before scan_source()."""
+    found = 0
+    for item in organizer.source.iterdir():
+        if item.is_dir() and organizer.matches_folder_pattern(item):
+            found += 1
+    for item in organizer.source.iterdir():
+        if not item.is_file():
+            continue
+        if organizer.matches_pattern(item):
+            if not organizer.file_matcher.needs_size:
+                item.stat()  # matches_pattern used to stat every name/type match
+            found += 1
+    return found
+
+
+def scandir_scan(organizer: FileOrganizer) -> int:
+    entries = organizer.scan_source()
+    return (len(organizer.get_folders_to_migrate(entries))
+            + len(organizer.get_matching_files(entries)))
+
+
+SCANS = {"legacy": legacy_scan, "scandir": scandir_scan}
+
+
+class _CountingEntry:
+    """DirEntry proxy counting the stat() calls that reach the filesystem."""
+    
+    def __init__(self, entry, counter):
+        self._entry = entry
+        self._counter = counter
+        self._stated = False
+    
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+    
+    def __fspath__(self):
+        return self._entry.__fspath__()
+    
+    def stat(self, *, follow_symlinks=True):
+        if not self._stated:
+            self._counter['stat'] = self._counter.get('stat', 0) + 1
+            self._stated = True
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+
+class _CountingScandir:
+    def __init__(self, it, counter):
+        self._it = it
+        self._counter = counter
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self._it.close()
+    
+    def __iter__(self):
+        for entry in self._it:
+            yield _CountingEntry(entry, self._counter)
+
+
+def count_python_calls(scan, organizer: FileOrganizer) -> dict:
+    counter = {}
+    originals = {name: getattr(os, name) for name in ("stat", "lstat", "listdir", "scandir")}
+    
+    def wrap(name):
+        func = originals[name]
+        
+        def counted(*args, **kwargs):
+            counter[name] = counter.get(name, 0) + 1
+            result = func(*args, **kwargs)
+            return _CountingScandir(result, counter) if name == "scandir" else result
+        return counted
+    
+    for name in originals:
+        setattr(os, name, wrap(name))
+    try:
+        scan(organizer)
+    finally:
+        for name, func in originals.items():
+            setattr(os, name, func)
+    return counter
+
+
+def count_strace(scan_name: str, rule_name: str, source: Path) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".strace") as out:
+        subprocess.run(
+            ["strace", "-f", "-c", "-o", out.name, sys.executable, __file__,
+             "--child", scan_name, rule_name, str(source)],
+            check=True, stdout=subprocess.DEVNULL)
+        counter = {}
+        for line in Path(out.name).read_text().splitlines():
+            parts = line.split()
+            if len(parts) >= 5 and parts[-1] in STAT_CALLS and parts[3].isdigit():
+                counter[parts[-1]] = int(parts[3])
+        return counter
+
+
+def run_child(scan_name: str, rule_name: str, source: str) -> None:
+    organizer = FileOrganizer(source, source + "_dst", pattern=FILE_RULES[rule_name],
+                              folders_to_migrate=FOLDER_RULE, dry_run=True)
+    SCANS[scan_name](organizer)
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        run_child(*sys.argv[2:])
+        return
+    
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=20000)
+    parser.add_argument('--folders', type=int, default=200)
+    args = parser.parse_args()
+    
+    use_strace = shutil.which("strace") is not None
+    print(f"counting: {'strace (kernel syscalls)' if use_strace else 'python-level fs calls'}")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "src"
+        source.mkdir()
+        make_tree(source, args.files, args.folders)
+        print(f"tree: {args.files} files, {args.folders} folders")
+        
+        for rule_name, rule in FILE_RULES.items():
+            for scan_name, scan in SCANS.items():
+                organizer = FileOrganizer(str(source), tmp + "/dst", pattern=rule,
+                                          folders_to_migrate=FOLDER_RULE, dry_run=True)
+                start = time.perf_counter()
+                scan(organizer)
+                elapsed = time.perf_counter() - start
+                
+                if use_strace:
+                    counts = count_strace(scan_name, rule_name, source)
+                else:
+                    counts = count_python_calls(scan, organizer)
+                detail = ", ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+                print(f"{rule_name:10s} {scan_name:8s} {elapsed * 1000:8.1f} ms  "
+                      f"total={sum(counts.values()):7d}  ({detail})")
+
+
+if __name__ == "__main__":
+    main()
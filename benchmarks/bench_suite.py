@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite: FileOrganizer on synthetic trees, as JSON.
+
+Generates a source tree with synthetic_tree.py (--preset/--config), then
+runs every scenario - file rules, folder rules and both combined, each in
+dry-run, copy and move mode - on a fresh destination (and, for moves, a
+freshly generated source) --repeat times. The fastest run of each scenario
+is kept: its elapsed time, time per phase (scan, folder_scan, file_scan,
+transfer), items/s, MB/s and latency percentiles from FileOrganizer.report().
+
+Results are written as JSON together with the commit, Python version and
+tree config, so two commits can be compared:
+
+    python benchmarks/bench_suite.py --output base.json
+    (check out the other commit)
+    python benchmarks/bench_suite.py --output new.json --compare base.json --threshold 10
+
+With --threshold, the exit status is 1 if any scenario got slower by more
+than that many percent.
+
+Usage:
+    python benchmarks/bench_suite.py [--preset small] [--config FILE] [--seed 0]
+                                     [--scenarios files/copy ...] [--workers 1]
+                                     [--repeat 3] [--output FILE]
+                                     [--compare FILE] [--threshold PCT] [--tmp DIR]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from file_folder_migration import FileOrganizer  # noqa: E402
+from synthetic_tree import FILE_RULE, FOLDER_RULE, PRESETS, generate_tree, load_config  # noqa: E402
+
+# Results format; bump when keys change meaning
+SUITE_VERSION = 1
+
+RULES = {
+    "files": (FILE_RULE, None),
+    "folders": (None, FOLDER_RULE),
+    "combo": (FILE_RULE, FOLDER_RULE),
+}
+MODES = ["dry-run", "copy", "move"]
+SCENARIOS = [f"{rule}/{mode}" for rule in RULES for mode in MODES]
+
+
+def git_commit():
+    """Commit of the working tree, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(scenario: str, source: str, destination: str, workers: int) -> dict:
+    """One run of a scenario; returns FileOrganizer.report()."""
+    rule, mode = scenario.split("/")
+    pattern, folders = RULES[rule]
+    organizer = FileOrganizer(source, destination,
+                              pattern=dict(pattern) if pattern else None,
+                              folders_to_migrate=dict(folders) if folders else None,
+                              copy_mode=mode == "copy", dry_run=mode == "dry-run",
+                              workers=workers, log_items='none')
+    organizer.organize()
+    return organizer.report()
+
+
+def compare(results: dict, base: dict, threshold: float = None) -> bool:
+    """
+    Print elapsed time per scenario against an earlier results file.
+    
+    Returns:
+        True if no scenario got slower by more than threshold percent
+    """
+    ok = True
+    base_runs = {run["scenario"]: run for run in base["results"]}
+    print()
+    print(f"vs {base.get('commit') or 'base'}:")
+    print(f"  {'scenario':16} {'base s':>9} {'now s':>9} {'change':>8}")
+    for run in results["results"]:
+        before = base_runs.get(run["scenario"])
+        if before is None or not before["elapsed_seconds"]:
+            continue
+        change = (run["elapsed_seconds"] / before["elapsed_seconds"] - 1) * 100
+        flag = ""
+        if threshold is not None and change > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"  {run['scenario']:16} {before['elapsed_seconds']:9.3f} {run['elapsed_seconds']:9.3f} "
+              f"{change:+7.1f}%{flag}")
+    if base.get("config") != results["config"]:
+        print("  (warning: the trees were generated from different configs)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    parser.add_argument('--config', metavar='FILE', help='JSON file overriding preset keys')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', metavar='FILE', default='bench_suite.json')
+    parser.add_argument('--compare', metavar='FILE', help='Earlier results file to compare with')
+    parser.add_argument('--threshold', type=float, metavar='PCT',
+                        help='With --compare, exit 1 if a scenario is more than PCT%% slower')
+    parser.add_argument('--tmp', default=None, help='Directory to create the test trees in')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    config = load_config(args.preset, args.config)
+    
+    results = {
+        "suite_version": SUITE_VERSION,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "preset": args.preset,
+        "config": config,
+        "seed": args.seed,
+        "workers": args.workers,
+        "repeat": args.repeat,
+        "results": [],
+    }
+    
+    with tempfile.TemporaryDirectory(dir=args.tmp) as tmp:
+        source = os.path.join(tmp, "src")
+        start = time.perf_counter()
+        tree = generate_tree(source, config, args.seed)
+        print(f"{args.preset}: {tree.files} files ({tree.bytes / 1024 / 1024:.1f} MB) in {tree.folders} folders, "
+              f"generated in {time.perf_counter() - start:.1f}s")
+        results["tree"] = tree._asdict()
+        print(f"  {'scenario':16} {'elapsed s':>9} {'scan':>7} {'folders':>7} {'files':>7} {'transfer':>8} "
+              f"{'items/s':>9} {'MB/s':>8} {'p99 ms':>8}")
+        
+        for scenario in args.scenarios:
+            runs = []
+            for i in range(max(1, args.repeat)):
+                run_source = source
+                if scenario.endswith("/move"):
+                    run_source = os.path.join(tmp, "move-src")
+                    generate_tree(run_source, config, args.seed)
+                destination = os.path.join(tmp, "dst")
+                runs.append(run_scenario(scenario, run_source, destination, args.workers))
+                shutil.rmtree(destination, ignore_errors=True)
+                if run_source != source:
+                    shutil.rmtree(run_source)
+            
+            best = min(runs, key=lambda report: report["elapsed_seconds"])
+            phases = best["phase_seconds"]
+            results["results"].append({
+                "scenario": scenario,
+                "elapsed_seconds": best["elapsed_seconds"],
+                "all_elapsed_seconds": [report["elapsed_seconds"] for report in runs],
+                "phase_seconds": phases,
+                "stats": best["stats"],
+                "bytes_copied": best["bytes_copied"],
+                "items_per_second": best["items_per_second"],
+                "mb_per_second": best["mb_per_second"],
+                "latency_ms": best["latency_ms"],
+                "peak_rss_mb": best["peak_rss_mb"],
+            })
+            print(f"  {scenario:16} {best['elapsed_seconds']:9.3f} {phases.get('scan', 0):7.3f} "
+                  f"{phases.get('folder_scan', 0):7.3f} {phases.get('file_scan', 0):7.3f} "
+                  f"{phases.get('transfer', 0):8.3f} {best['items_per_second'] or 0:9.1f} "
+                  f"{best['mb_per_second'] or 0:8.1f} {best['latency_ms']['p99']:8.2f}")
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results: {args.output}")
+    
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            base = json.load(f)
+        if not compare(results, base, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
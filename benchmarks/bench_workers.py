@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Throughput of FileOrganizer transfers with 1..N worker threads.
+
+Creates a source directory of equally sized files and copies it to a fresh
+destination once per worker count, reporting files/s and MB/s. Point
+--tmp at the filesystem you care about (SSD array, NFS mount, ...) since
+the scaling depends entirely on the storage underneath.
+
+Usage:
+    python benchmarks/bench_workers.py [--files 400] [--size-kb 1024]
+                                       [--workers 1 2 4 8] [--tmp DIR]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from file_folder_migration import FileOrganizer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=400)
+    parser.add_argument('--size-kb', type=int, default=1024)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--tmp', default=None, help='Directory to create the test tree in')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    with tempfile.TemporaryDirectory(dir=args.tmp) as tmp:
+        source = Path(tmp) / "src"
+        source.mkdir()
+        payload = os.urandom(args.size_kb * 1024)
+        for i in range(args.files):
+            (source / f"file{i:06d}.bin").write_bytes(payload)
+        total_mb = args.files * args.size_kb / 1024
+        print(f"{args.files} files x {args.size_kb} KB = {total_mb:.1f} MB")
+        
+        baseline = None
+        for workers in args.workers:
+            destination = Path(tmp) / f"dst{workers}"
+            organizer = FileOrganizer(str(source), str(destination), pattern={"file_type": ".bin"},
+                                      copy_mode=True, workers=workers)
+            files = organizer.get_matching_files()
+            
+            start = time.perf_counter()
+            organizer.run_transfers(organizer.process_file, files)
+            elapsed = time.perf_counter() - start
+            
+            assert organizer.stats['processed'] == args.files, organizer.stats
+            baseline = baseline or elapsed
+            print(f"workers={workers:3d}  {elapsed:7.2f} s  {args.files / elapsed:9.1f} files/s  "
+                  f"{total_mb / elapsed:8.1f} MB/s  speedup {baseline / elapsed:.2f}x")
+            shutil.rmtree(destination)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic source trees for the benchmarks.
+
+A tree is described by a config dict (see PRESETS): how many files and
+top-level folders, how deep the folders nest, a size distribution, an
+extension mix, and the share of files and folders the benchmark rules
+(FILE_RULE / FOLDER_RULE) should hit. The same config and seed always
+give the same tree, so runs on different commits are comparable.
+
+Layout:
+    root/
+        <loose files>                 top_level_share of all files
+        Project_0003/ | folder_0004/  hits of FOLDER_RULE get the prefix
+            <files>
+            sub1/ <files>
+                sub2/ ...             `depth` levels below each folder
+
+Usage:
+    python benchmarks/synthetic_tree.py ROOT [--preset small] [--config FILE]
+                                             [--seed 0]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from collections import namedtuple
+
+# Rules the generated names are built to hit; bench_suite.py uses the same ones
+FILE_RULE = {"name_pattern": "_1", "file_type": None, "min_size_mb": None, "max_size_mb": None}
+FOLDER_RULE = {"name_pattern": "^Project", "file_type": None, "min_size_mb": None, "max_size_mb": None}
+
+# Size buckets are [weight, min bytes, max bytes]; extensions are {ext: weight}
+PRESETS = {
+    "small": {
+        "files": 1000,
+        "folders": 20,
+        "depth": 2,
+        "top_level_share": 0.5,
+        "sizes": [[0.80, 0, 16384], [0.18, 16384, 262144], [0.02, 262144, 2097152]],
+        "extensions": {".pdf": 3, ".jpg": 3, ".txt": 2, ".docx": 1, ".mp4": 1},
+        "file_hit_ratio": 0.3,
+        "folder_hit_ratio": 0.3,
+    },
+    "medium": {
+        "files": 10000,
+        "folders": 100,
+        "depth": 3,
+        "top_level_share": 0.5,
+        "sizes": [[0.90, 0, 8192], [0.09, 8192, 131072], [0.01, 131072, 1048576]],
+        "extensions": {".pdf": 3, ".jpg": 3, ".txt": 2, ".docx": 1, ".mp4": 1},
+        "file_hit_ratio": 0.3,
+        "folder_hit_ratio": 0.3,
+    },
+    "large": {
+        "files": 100000,
+        "folders": 500,
+        "depth": 3,
+        "top_level_share": 0.5,
+        "sizes": [[0.95, 0, 4096], [0.05, 4096, 65536]],
+        "extensions": {".pdf": 3, ".jpg": 3, ".txt": 2, ".docx": 1, ".mp4": 1},
+        "file_hit_ratio": 0.3,
+        "folder_hit_ratio": 0.3,
+    },
+}
+
+# Every file's content is a slice of this block (incompressible, so copies
+# cost what real data costs)
+BLOCK_SIZE = 1024 * 1024
+
+TreeInfo = namedtuple('TreeInfo', 'files bytes folders file_hits folder_hits')
+
+
+def load_config(preset: str = "small", path: str = None) -> dict:
+    """
+    Preset config, with the keys of a JSON config file (if any) on top.
+    
+    Args:
+        preset: Name of one of PRESETS
+        path: Optional JSON file overriding preset keys
+    
+    Returns:
+        Config dictionary
+    """
+    config = dict(PRESETS[preset])
+    if path:
+        with open(path, encoding='utf-8') as f:
+            config.update(json.load(f))
+    return config
+
+
+def _pick(rng: random.Random, weighted) -> object:
+    """One value from a list of (weight, value...) rows."""
+    total = sum(row[0] for row in weighted)
+    point = rng.random() * total
+    for row in weighted:
+        point -= row[0]
+        if point <= 0:
+            return row
+    return weighted[-1]
+
+
+def generate_tree(root: str, config: dict, seed: int = 0) -> TreeInfo:
+    """
+    Create the tree described by config under root (which must not exist
+    or be empty).
+    
+    Args:
+        root: Directory to create the tree in
+        config: Tree config, see PRESETS
+        seed: Random seed; the same seed gives the same names and sizes
+    
+    Returns:
+        TreeInfo with the number of files, bytes and folders created and how
+        many files/folders FILE_RULE/FOLDER_RULE match at the top level
+    """
+    rng = random.Random(seed)
+    block = random.Random(seed).randbytes(BLOCK_SIZE) if hasattr(rng, 'randbytes') else os.urandom(BLOCK_SIZE)
+    extensions = [(weight, ext) for ext, weight in config["extensions"].items()]
+    depth = max(0, int(config["depth"]))
+    
+    # Top-level folders, and the directories inside each one
+    os.makedirs(root, exist_ok=True)
+    directories = []
+    folder_hits = 0
+    for i in range(int(config["folders"])):
+        hit = rng.random() < config["folder_hit_ratio"]
+        folder_hits += hit
+        path = os.path.join(root, f"{'Project' if hit else 'folder'}_{i:04d}")
+        directories.append(path)
+        for level in range(1, depth + 1):
+            path = os.path.join(path, f"sub{level}")
+            directories.append(path)
+        os.makedirs(path)
+    
+    files = total_bytes = file_hits = 0
+    top_level = int(config["files"] * config["top_level_share"]) if directories else int(config["files"])
+    for i in range(int(config["files"])):
+        directory = root if i < top_level else rng.choice(directories)
+        hit = rng.random() < config["file_hit_ratio"]
+        ext = _pick(rng, extensions)[1]
+        _, low, high = _pick(rng, config["sizes"])
+        size = rng.randint(int(low), int(high))
+        name = f"file_{i:07d}{'_1' if hit else ''}{ext}"
+        with open(os.path.join(directory, name), 'wb') as f:
+            remaining = size
+            while remaining:
+                chunk = min(remaining, BLOCK_SIZE)
+                f.write(block[:chunk])
+                remaining -= chunk
+        files += 1
+        total_bytes += size
+        file_hits += hit and directory == root
+    
+    return TreeInfo(files, total_bytes, len(directories), file_hits, folder_hits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('root', help='Directory to create the tree in')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    parser.add_argument('--config', metavar='FILE', help='JSON file overriding preset keys')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    if os.path.exists(args.root) and os.listdir(args.root):
+        parser.error(f"{args.root} is not empty")
+    info = generate_tree(args.root, load_config(args.preset, args.config), args.seed)
+    print(f"{info.files} files ({info.bytes / 1024 / 1024:.1f} MB) in {info.folders} folders; "
+          f"{info.file_hits} top-level file hits, {info.folder_hits} folder hits")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,13 +18,59 @@ Repository: https://github.com/yourusername/pattern-file-organizer
 """
 
 import os
+import re
+import select
 import shutil
+import signal
+import sqlite3
+import string
+import struct
+import sys
 import argparse
+import atexit
+import cProfile
+import errno
+import fnmatch
+import hashlib
+import json
 import logging
+import logging.handlers
+import pstats
+import queue
+import threading
+import time
+import tracemalloc
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from functools import partial
+from itertools import count, repeat
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from datetime import datetime
 
+try:
+    import resource  # Unix only; used to report peak memory
+except ImportError:
+    resource = None
+
+try:
+    import fcntl  # Unix only; used for reflink copies
+except ImportError:
+    fcntl = None
+
+try:
+    import tomllib  # Python 3.11+; used for TOML rules files
+except ImportError:
+    tomllib = None
+
+try:
+    import ctypes  # used for inotify in watch mode (Linux)
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
 
 # ============================================
 # CONFIGURATION - Easy Setup
@@ -203,481 +249,4334 @@ DRY_RUN = False    # True = Preview only, False = Execute changes
 # LOGGING CONFIGURATION
 # ============================================
 
-def setup_logging(log_file: str = None, verbose: bool = False) -> None:
-    """Configure logging for the application."""
+class _BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener whose handlers flush once per burst of records (when the
+    queue runs empty) instead of after every line.
+    """
+    
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            self.flush()
+            return self.queue.get(block)
+    
+    def flush(self) -> None:
+        for handler in self.handlers:
+            handler.flush_pending()
+    
+    def stop(self) -> None:
+        if self._thread is not None:
+            super().stop()
+            self.flush()
+
+
+class _DeferredFlush:
+    """
+    Handler mixin for _BatchingQueueListener: the flush after each emit()
+    is skipped, the listener calls flush_pending() instead.
+    """
+    
+    def flush(self) -> None:
+        pass
+    
+    def flush_pending(self) -> None:
+        super().flush()
+
+
+class _LogFileHandler(logging.FileHandler):
+    """
+    FileHandler that writes names os could not decode (lone surrogates)
+    as backslash escapes, like the console does, instead of failing.
+    """
+    
+    def _open(self):
+        return open(self.baseFilename, self.mode, encoding=self.encoding, errors='backslashreplace')
+
+
+class _DeferredFlushStreamHandler(_DeferredFlush, logging.StreamHandler):
+    pass
+
+
+class _DeferredFlushFileHandler(_DeferredFlush, _LogFileHandler):
+    pass
+
+
+def setup_logging(log_file: str = None, verbose: bool = False,
+                  background: bool = False) -> Optional[logging.handlers.QueueListener]:
+    """
+    Configure logging for the application.
+    
+    Args:
+        log_file: Also write the log to this file
+        verbose: Enable DEBUG messages
+        background: Format and write log lines on a background thread: the
+            logging call only puts the record on a queue (QueueHandler) and a
+            QueueListener does the console/file I/O, off the transfer path.
+            The listener is drained and stopped at exit.
+    
+    Returns:
+        The QueueListener in background mode, None otherwise
+    """
     log_level = logging.DEBUG if verbose else logging.INFO
     log_format = '%(asctime)s - %(levelname)s - %(message)s'
     
-    handlers = [logging.StreamHandler()]
+    if not background:
+        handlers = [logging.StreamHandler()]
+        if log_file:
+            handlers.append(_LogFileHandler(log_file))
+        logging.basicConfig(
+            level=log_level,
+            format=log_format,
+            handlers=handlers
+        )
+        return None
+    
+    handlers = [_DeferredFlushStreamHandler()]
     if log_file:
-        handlers.append(logging.FileHandler(log_file))
+        handlers.append(_DeferredFlushFileHandler(log_file))
     
-    logging.basicConfig(
-        level=log_level,
-        format=log_format,
-        handlers=handlers
-    )
+    # Only the output handlers format; the QueueHandler just merges the args
+    formatter = logging.Formatter(log_format)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = getattr(queue, 'SimpleQueue', queue.Queue)()
+    listener = _BatchingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    
+    root = logging.getLogger()
+    root.setLevel(log_level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def skip_record_lookups() -> None:
+    """
+    Stop log records from collecting the caller, thread and process
+    fields, which the log format does not show.
+    
+    These are process-wide logging switches, so setup_logging leaves them
+    alone and only main() calls this; programs that import this module
+    keep their own log records.
+    """
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
 
 
 # ============================================
-# CORE FUNCTIONALITY
+# PATTERN MATCHING
 # ============================================
 
-class FileOrganizer:
+BYTES_PER_MB = 1024 * 1024
+
+
+def _as_list(value) -> list:
+    """Return a filter value (str, list or None) as a list."""
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+class RuleMatcher:
     """
-    A flexible file and folder organizer that sorts based on multiple criteria.
+    Pre-compiled form of a FILES_TO_MIGRATE / FOLDERS_TO_MIGRATE filter dict.
     
-    Features:
-    - Pattern-based file matching (filename, type, size)
-    - Folder migration (single or multiple folders)
-    - SQL-like filtering with AND conditions
-    - Safe file/folder operations with error handling
-    - Dry-run mode for previewing changes
-    - Detailed logging and statistics
-    - Support for copy or move operations
+    The filter dict is interpreted once, when the matcher is built, instead of
+    on every file or folder that gets checked:
+    - ^pattern$ -> frozenset of exact names
+    - ^pattern  -> tuple of prefixes for str.startswith
+    - pattern$  -> tuple of suffixes for str.endswith
+    - *pattern* -> one combined regex for substring search
+    - pattern   -> tuple of suffixes (default "ends with" behavior)
+    
+    File types become a frozenset of lowercased, dot-prefixed extensions and
+    the size bounds are converted to bytes, so a size is only needed (and a
+    stat only made) when a bound is actually set.
     """
     
-    def __init__(self, source: str, destination: str, pattern: dict = None, 
-                 folders_to_migrate: dict = None, copy_mode: bool = False, 
-                 dry_run: bool = False):
+    __slots__ = ('has_name_filter', 'exact', 'prefixes', 'suffixes', 'contains',
+                 'types', 'min_bytes', 'max_bytes')
+    
+    def __init__(self, criteria: dict):
         """
-        Initialize the FileOrganizer.
+        Compile a filter dict.
         
         Args:
-            source: Source directory path
-            destination: Destination directory path
-            pattern: Dictionary with filtering criteria (for files):
-                - name_pattern (str/list): Pattern(s) in filename
-                - file_type (str/list): File extension(s)
-                - min_size_mb (float): Minimum file size in MB
-                - max_size_mb (float): Maximum file size in MB
-                Set to None to disable file migration
-            folders_to_migrate: Dictionary with filtering criteria (for folders):
-                - name_pattern (str/list): Pattern(s) in folder name
-                - file_type (str/list): File type(s) that folder must contain
-                - min_size_mb (float): Minimum folder size in MB
-                - max_size_mb (float): Maximum folder size in MB
-                Set to None to disable folder migration
-            copy_mode: If True, copy files/folders instead of moving them
-            dry_run: If True, only preview operations without executing
+            criteria: Dictionary with name_pattern, file_type, min_size_mb
+                and max_size_mb keys (missing keys mean "no filter")
         """
-        self.source = Path(source)
-        self.destination = Path(destination)
+        name_pattern = criteria.get("name_pattern")
+        self.has_name_filter = name_pattern is not None
         
-        # Handle pattern - can be None, dict, or string (for backward compatibility)
-        if pattern is None:
-            self.pattern = None
-        elif isinstance(pattern, dict):
-            self.pattern = pattern
-        elif isinstance(pattern, str):
-            self.pattern = {"name_pattern": pattern}
-        else:
-            self.pattern = None
+        exact, prefixes, suffixes, contains = set(), [], [], []
+        for pattern in _as_list(name_pattern):
+            # Same precedence as the original if/elif chain
+            if pattern.startswith("^") and pattern.endswith("$"):
+                exact.add(pattern[1:-1])
+            elif pattern.startswith("^"):
+                prefixes.append(pattern[1:])
+            elif pattern.endswith("$"):
+                suffixes.append(pattern[:-1])
+            elif pattern.startswith("*") and pattern.endswith("*"):
+                contains.append(pattern[1:-1])
+            else:
+                suffixes.append(pattern)
         
-        self.copy_mode = copy_mode
-        self.dry_run = dry_run
+        self.exact = frozenset(exact)
+        self.prefixes = tuple(prefixes)
+        self.suffixes = tuple(suffixes)
+        self.contains = (re.compile("|".join(re.escape(c) for c in contains)).search
+                         if contains else None)
         
-        # Handle folders_to_migrate - should be a dict or None
-        if folders_to_migrate is None:
-            self.folders_to_migrate = None
-        elif isinstance(folders_to_migrate, dict):
-            self.folders_to_migrate = folders_to_migrate
+        file_type = criteria.get("file_type")
+        if file_type is None:
+            self.types = None
         else:
-            # For backward compatibility, if it's a string or list, convert to dict
-            if isinstance(folders_to_migrate, str):
-                self.folders_to_migrate = {"name_pattern": folders_to_migrate}
-            elif isinstance(folders_to_migrate, list):
-                self.folders_to_migrate = {"name_pattern": folders_to_migrate}
-            else:
-                self.folders_to_migrate = None
+            self.types = frozenset(
+                (t if t.startswith(".") else "." + t).lower() for t in _as_list(file_type)
+            )
         
-        self.stats = {
-            'matched': 0,
-            'processed': 0,
-            'skipped': 0,
-            'errors': 0,
-            'folders_matched': 0,
-            'folders_migrated': 0
-        }
+        min_size = criteria.get("min_size_mb")
+        max_size = criteria.get("max_size_mb")
+        self.min_bytes = None if min_size is None else min_size * BYTES_PER_MB
+        self.max_bytes = None if max_size is None else max_size * BYTES_PER_MB
     
-    def validate_paths(self) -> bool:
-        """
-        Validate source and destination paths.
-        
-        Returns:
-            True if paths are valid, False otherwise
-        """
-        if not self.source.exists():
-            logging.error(f"Source directory does not exist: {self.source}")
+    @property
+    def needs_size(self) -> bool:
+        """True if a size bound is set (i.e. matching requires a stat)."""
+        return self.min_bytes is not None or self.max_bytes is not None
+    
+    def match_type(self, ext: str) -> bool:
+        """Check an extension (including the dot) against the file types."""
+        return self.types is None or ext.lower() in self.types
+    
+    def match_name(self, name: str) -> bool:
+        """Check a name (without extension for files) against the name patterns."""
+        if not self.has_name_filter:
+            return True
+        if name in self.exact:
+            return True
+        if self.prefixes and name.startswith(self.prefixes):
+            return True
+        if self.suffixes and name.endswith(self.suffixes):
+            return True
+        return self.contains is not None and self.contains(name) is not None
+    
+    def match_size(self, size_bytes: int) -> bool:
+        """Check a size in bytes against the min/max bounds."""
+        if self.min_bytes is not None and size_bytes < self.min_bytes:
             return False
-        
-        if not self.source.is_dir():
-            logging.error(f"Source path is not a directory: {self.source}")
+        if self.max_bytes is not None and size_bytes > self.max_bytes:
             return False
-        
         return True
+
+
+# Result of walking a folder once for its file types and size.
+#   size_bytes: total size of the files seen (a lower bound if not complete)
+#   file_count: number of files seen
+#   has_type:   True if a file of the requested type(s) was seen
+#   complete:   False if the walk stopped early because the outcome was decided
+#   errors:     number of subfolders that could not be read
+FolderProfile = namedtuple('FolderProfile', 'size_bytes file_count has_type complete errors')
+
+
+def describe_profile(profile: FolderProfile) -> str:
+    """Format a FolderProfile for logging, e.g. '12.50 MB in 42 file(s)'."""
+    bound = "" if profile.complete else ">= "
+    return f"{bound}{profile.size_bytes / BYTES_PER_MB:.2f} MB in {bound}{profile.file_count} file(s)"
+
+
+def profile_folder(folder_path, matcher: RuleMatcher) -> FolderProfile:
+    """
+    Walk a folder tree once, collecting type presence and total size together.
     
-    def matches_pattern(self, file_path: Path) -> bool:
-        """
-        Check if a file matches the pattern criteria.
-        
-        Pattern matching supports:
-        - ^pattern = Starts with
-        - pattern$ = Ends with
-        - *pattern* = Contains anywhere
-        - pattern = Ends with (default)
-        
-        Multiple values within name_pattern or file_type use OR logic.
-        Different criteria (name, type, size) use AND logic.
-        
-        Args:
-            file_path: Path to the file to check
-            
-        Returns:
-            True if file matches ALL specified criteria, False otherwise
-        """
-        name, ext = os.path.splitext(file_path.name)
-        
-        # Check name pattern (if specified)
-        name_pattern = self.pattern.get("name_pattern")
-        if name_pattern is not None:
-            # Convert single pattern to list for uniform processing
-            patterns = [name_pattern] if isinstance(name_pattern, str) else name_pattern
-            
-            # Check if ANY pattern matches (OR logic)
-            pattern_matched = False
-            for pattern in patterns:
-                if pattern.startswith("^") and pattern.endswith("$"):
-                    # Exact match: ^pattern$
-                    if name == pattern[1:-1]:
-                        pattern_matched = True
-                        break
-                elif pattern.startswith("^"):
-                    # Pattern at start of filename
-                    if name.startswith(pattern[1:]):
-                        pattern_matched = True
-                        break
-                elif pattern.endswith("$"):
-                    # Pattern at end of filename
-                    if name.endswith(pattern[:-1]):
-                        pattern_matched = True
-                        break
-                elif pattern.startswith("*") and pattern.endswith("*"):
-                    # Pattern anywhere in filename
-                    if pattern[1:-1] in name:
-                        pattern_matched = True
-                        break
-                else:
-                    # Default: Pattern at end of filename (before extension)
-                    if name.endswith(pattern):
-                        pattern_matched = True
-                        break
-            
-            if not pattern_matched:
-                return False
+    Uses os.scandir so directory/file types come from the listing and each
+    file is stat'ed at most once (only when a size bound is set). The walk
+    stops as soon as the result of the folder rule can no longer change:
+    - max_size_mb exceeded (the folder is too large), or
+    - the file type has been found and min_size_mb reached (no max bound).
+    
+    Like os.walk, symlinks to directories are listed but not followed.
+    
+    Args:
+        folder_path: Path (or DirEntry) of the folder to profile
+        matcher: Compiled folder rule
         
-        # Check file type (if specified)
-        file_type = self.pattern.get("file_type")
-        if file_type is not None:
-            # Convert single type to list for uniform processing
-            types = [file_type] if isinstance(file_type, str) else file_type
-            
-            # Ensure all types start with a dot
-            types = ["." + t if not t.startswith(".") else t for t in types]
-            
-            # Check if ANY type matches (OR logic)
-            type_matched = False
-            for ftype in types:
-                if ext.lower() == ftype.lower():
-                    type_matched = True
-                    break
-            
-            if not type_matched:
-                return False
+    Returns:
+        FolderProfile for the folder
+    """
+    types = matcher.types
+    need_size = matcher.needs_size
+    min_bytes, max_bytes = matcher.min_bytes, matcher.max_bytes
+    
+    size = 0
+    count = 0
+    has_type = types is None
+    errors = 0
+    stack = [os.fspath(folder_path)]
+    
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            errors += 1
+            continue
         
-        # Check file size constraints (if specified)
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            stack.append(entry.path)
+                        continue
+                except OSError:
+                    pass
+                
+                count += 1
+                if not has_type and os.path.splitext(entry.name)[1].lower() in types:
+                    has_type = True
+                
+                if need_size:
+                    try:
+                        size += entry.stat().st_size
+                    except OSError:
+                        continue
+                    
+                    if max_bytes is not None and size > max_bytes:
+                        return FolderProfile(size, count, has_type, False, errors)
+                
+                if has_type and max_bytes is None and (min_bytes is None or size >= min_bytes):
+                    return FolderProfile(size, count, has_type, False, errors)
+    
+    return FolderProfile(size, count, has_type, True, errors)
+
+
+def is_temp_name(name: str) -> bool:
+    """Whether a file name has the form of an in-progress copy (see make_temp)."""
+    return name.startswith('.') and name.endswith(PARTIAL_SUFFIX)
+
+
+def make_temp(destination, is_dir: bool, record=None) -> Path:
+    """
+    Create a new, uniquely named temporary file or folder next to
+    destination, to copy into before the copy is renamed into place.
+    
+    Like tempfile.mkstemp/mkdtemp, the item is created exclusively
+    (O_EXCL / mkdir) under a random name, so nothing but this copy ever
+    writes to it or removes it.
+    
+    Args:
+        destination: Final path of the copy
+        is_dir: Create a folder instead of a file
+        record: Called with the path before it is created (the journal),
+            so an interruption can never leave a temporary nobody knows of
+    """
+    destination = Path(destination)
+    while True:
+        path = destination.with_name(f".{destination.name}.{os.urandom(6).hex()}{PARTIAL_SUFFIX}")
+        if os.path.lexists(path):
+            continue
+        if record is not None:
+            record(path)
         try:
-            file_size_mb = file_path.stat().st_size / (1024 * 1024)  # Convert to MB
-            
-            min_size = self.pattern.get("min_size_mb")
-            if min_size is not None:
-                if file_size_mb < min_size:
-                    return False
-            
-            max_size = self.pattern.get("max_size_mb")
-            if max_size is not None:
-                if file_size_mb > max_size:
-                    return False
+            if is_dir:
+                os.mkdir(path, 0o700)
+            else:
+                os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
+            return path
+        except FileExistsError:
+            continue
+
+
+def _remove_quietly(path, is_dir: bool) -> None:
+    """Remove a leftover partial copy, ignoring errors."""
+    try:
+        if is_dir:
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+    except OSError:
+        pass
+
+
+def probe_case_insensitive(folder, write: bool = True) -> bool:
+    """
+    Whether the filesystem of folder (or of its nearest existing parent)
+    treats names that differ only in case as the same name.
+    
+    Args:
+        folder: Folder to probe
+        write: Create and remove a temporary file in the folder to find
+            out; otherwise (dry runs) only look the folder's own name up
+            in a different case, which checks its parent's filesystem
+    """
+    folder = os.path.abspath(folder)
+    while not os.path.isdir(folder) and os.path.dirname(folder) != folder:
+        folder = os.path.dirname(folder)
+    if write:
+        try:
+            probe = make_temp(Path(folder) / 'case', is_dir=False)
+        except OSError:
+            pass
+        else:
+            try:
+                return os.path.lexists(probe.with_name(probe.name.upper()))
+            finally:
+                _remove_quietly(probe, is_dir=False)
+    
+    swapped = os.path.join(os.path.dirname(folder), os.path.basename(folder).swapcase())
+    try:
+        return swapped != folder and os.path.samefile(folder, swapped)
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / BYTES_PER_MB if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(sorted_values, q: float) -> float:
+    """Nearest-rank percentile (q in 0..100) of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-q * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+# Complete (never early-terminated) summary of a folder tree, as kept by the
+# folder cache; any folder rule can be evaluated from it.
+#   size_bytes: total size of all files
+#   file_count: number of files
+#   extensions: frozenset of lowercased file extensions present
+#   dir_mtimes: tuple of (relative dir path, st_mtime_ns) for every folder in
+#               the tree, used to tell whether the summary is still valid
+#   errors:     number of subfolders that could not be read
+FolderSummary = namedtuple('FolderSummary', 'size_bytes file_count extensions dir_mtimes errors')
+
+
+def summarize_folder(folder_path) -> FolderSummary:
+    """
+    Walk a whole folder tree once with os.scandir, collecting its size,
+    file count, extension set and the mtime of every folder in it.
+    
+    Args:
+        folder_path: Path (or DirEntry) of the folder to summarize
         
-        except OSError as e:
-            logging.warning(f"Could not get size for {file_path.name}: {e}")
-            return False
+    Returns:
+        FolderSummary for the folder
+    """
+    root = os.fspath(folder_path)
+    size = 0
+    count = 0
+    extensions = set()
+    dir_mtimes = []
+    errors = 0
+    stack = [(root, "", None)]
+    
+    while stack:
+        path, rel, mtime_ns = stack.pop()
+        try:
+            if mtime_ns is None:
+                mtime_ns = os.stat(path).st_mtime_ns
+            it = os.scandir(path)
+        except OSError:
+            errors += 1
+            continue
+        dir_mtimes.append((rel, mtime_ns))
         
-        # All criteria matched
-        return True
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            stack.append((entry.path, os.path.join(rel, entry.name),
+                                          entry.stat(follow_symlinks=False).st_mtime_ns))
+                        continue
+                except OSError:
+                    pass
+                
+                count += 1
+                extensions.add(os.path.splitext(entry.name)[1].lower())
+                try:
+                    size += entry.stat().st_size
+                except OSError:
+                    continue
     
-    def matches_folder_pattern(self, folder_path: Path) -> bool:
-        """
-        Check if a folder matches the folder pattern criteria.
+    return FolderSummary(size, count, frozenset(extensions), tuple(dir_mtimes), errors)
+
+
+def profile_from_summary(summary: FolderSummary, matcher: RuleMatcher) -> FolderProfile:
+    """Evaluate a folder rule's type criterion against a cached FolderSummary."""
+    has_type = matcher.types is None or not matcher.types.isdisjoint(summary.extensions)
+    return FolderProfile(summary.size_bytes, summary.file_count, has_type, True, summary.errors)
+
+
+# Summaries of every folder of a tree, built bottom-up by summarize_tree
+#   summary:  FolderSummary of the folder (dir_mtimes only filled in at the
+#             root of the walk)
+#   children: {name: FolderTree} of its subfolders
+FolderTree = namedtuple('FolderTree', 'summary children')
+
+
+def summarize_tree(folder_path) -> FolderTree:
+    """
+    Walk a whole folder tree once, like summarize_folder, keeping the
+    summary of every folder in it: each folder's totals are added into its
+    parent's when its listing is done, so no subfolder is walked twice.
+    
+    Args:
+        folder_path: Path (or DirEntry) of the folder to summarize
         
-        Pattern matching supports:
-        - ^pattern = Starts with
-        - pattern$ = Ends with
-        - *pattern* = Contains anywhere
-        - pattern = Exact match or ends with (default)
+    Returns:
+        FolderTree of the folder
+    """
+    root = os.fspath(folder_path)
+    dir_mtimes = []
+    
+    def open_folder(path, rel, mtime_ns):
+        """Frame [iterator, size, count, extensions, errors, children] of a folder, or None."""
+        try:
+            if mtime_ns is None:
+                mtime_ns = os.stat(path).st_mtime_ns
+            it = os.scandir(path)
+        except OSError:
+            return None
+        dir_mtimes.append((rel, mtime_ns))
+        return [it, 0, 0, set(), 0, {}]
+    
+    unreadable = FolderTree(FolderSummary(0, 0, frozenset(), (), 1), {})
+    frame = open_folder(root, "", None)
+    if frame is None:
+        return unreadable
+    
+    # Stack of (frame, name in parent) of the folders being listed
+    stack = [(frame, None)]
+    while True:
+        frame, name = stack[-1]
+        it = frame[0]
+        entry = next(it, None)
         
-        Multiple values within name_pattern or file_type use OR logic.
-        Different criteria (name, type, size) use AND logic.
+        if entry is None:
+            it.close()
+            stack.pop()
+            _, size, count, extensions, errors, children = frame
+            if not stack:
+                summary = FolderSummary(size, count, frozenset(extensions), tuple(dir_mtimes), errors)
+                return FolderTree(summary, children)
+            parent = stack[-1][0]
+            parent[1] += size
+            parent[2] += count
+            parent[3] |= extensions
+            parent[4] += errors
+            parent[5][name] = FolderTree(FolderSummary(size, count, frozenset(extensions), (), errors), children)
+            continue
         
-        Args:
-            folder_path: Path to the folder to check
-            
-        Returns:
-            True if folder matches ALL specified criteria, False otherwise
-        """
-        folder_name = folder_path.name
+        try:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    child = open_folder(entry.path, os.path.relpath(entry.path, root),
+                                        entry.stat(follow_symlinks=False).st_mtime_ns)
+                    if child is None:
+                        frame[4] += 1
+                        frame[5][entry.name] = unreadable
+                    else:
+                        stack.append((child, entry.name))
+                continue
+        except OSError:
+            pass
+        
+        frame[2] += 1
+        frame[3].add(os.path.splitext(entry.name)[1].lower())
+        try:
+            frame[1] += entry.stat().st_size
+        except OSError:
+            continue
+
+
+# ============================================
+# COPY ENGINE
+# ============================================
+
+# ioctl request that clones a whole file on CoW filesystems (XFS, btrfs, ...)
+# _IOW(0x94, 9, int) on Linux
+FICLONE = 0x40049409
+
+# Buffer size for the userspace fallback (same order as shutil's default)
+COPY_BUFSIZE = 1024 * 1024
+
+# Streamed copies of large files (CopyEngine large_file_threshold) have the
+# pages of every window of this many bytes dropped from the page cache
+DROP_BEHIND_BYTES = 8 * 1024 * 1024
+
+# Files larger than this are split into chunks copied in parallel when they
+# are moved across devices
+CHUNK_SIZE = 64 * 1024 * 1024
+
+# Suffix of in-progress copies; they are created next to their destination
+# as ".<name>.<random>.partial" and renamed into place once complete
+PARTIAL_SUFFIX = ".partial"
+
+# Sources of verified cross-device moves are deleted in batches of this size
+DELETE_BATCH_SIZE = 256
+
+# Digest used by verified copies; blake2b-512, the same as the b2sum tool,
+# so a manifest can be checked with `b2sum -c`
+VERIFY_ALGORITHM = 'blake2b'
+
+# Fast verification accepts a copy whose mtime is this close to the source's:
+# destinations with coarse timestamps (FAT 2 s, exFAT 10 ms, SMB, some NFS)
+# cannot store the source's nanoseconds
+VERIFY_MTIME_TOLERANCE_NS = 2 * 1000 ** 3
+
+# errno values meaning "this method is not available here, try the next one"
+_FALLBACK_ERRNOS = frozenset(
+    getattr(errno, name) for name in
+    ('EXDEV', 'ENOSYS', 'EOPNOTSUPP', 'ENOTSUP', 'ENOTTY', 'EINVAL', 'EBADF', 'ETXTBSY', 'EPERM')
+    if hasattr(errno, name)
+)
+
+# The subset meaning the filesystems cannot do it at all: the method is not
+# tried again for the same devices. The others (EINVAL, EBADF, ETXTBSY,
+# EPERM, e.g. a swapfile or an immutable file) only concern one file
+_UNSUPPORTED_ERRNOS = frozenset(
+    getattr(errno, name) for name in ('EXDEV', 'ENOSYS', 'EOPNOTSUPP', 'ENOTSUP', 'ENOTTY')
+    if hasattr(errno, name)
+)
+
+
+def _fadvise(fd: int, offset: int, length: int, advice: str) -> None:
+    """posix_fadvise(fd, offset, length, os.<advice>) where supported."""
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fd, offset, length, getattr(os, advice))
+
+
+def file_digest(path, drop_cache: bool = False, buffer: bytearray = None) -> str:
+    """
+    Hex digest (VERIFY_ALGORITHM) of a file's contents.
+    
+    Args:
+        path: File to hash
+        drop_cache: Evict the file's cached pages first (where supported),
+            so the data is read back from the device, and again afterwards
+        buffer: Read buffer to use (default: a new COPY_BUFSIZE one)
+    """
+    digest = hashlib.new(VERIFY_ALGORITHM)
+    if buffer is None:
+        buffer = bytearray(COPY_BUFSIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb') as f:
+        if drop_cache:
+            _fadvise(f.fileno(), 0, 0, 'POSIX_FADV_DONTNEED')
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+        if drop_cache:
+            _fadvise(f.fileno(), 0, 0, 'POSIX_FADV_DONTNEED')
+    return digest.hexdigest()
+
+
+# Manifests are UTF-8 text; names os could not decode (lone surrogates) are
+# written back as the bytes they came from, as b2sum expects them
+MANIFEST_ERRORS = 'surrogateescape'
+
+# Escapes b2sum uses in names (the line then starts with a backslash)
+_MANIFEST_ESCAPES = {'\\': '\\\\', '\n': '\\n', '\r': '\\r'}
+_MANIFEST_UNESCAPE = re.compile(r'\\([\\nr])')
+
+
+def manifest_line(digest: str, name: str) -> str:
+    """A b2sum line for name, escaped the way b2sum does if it has to be."""
+    if any(char in name for char in _MANIFEST_ESCAPES):
+        escaped = ''.join(_MANIFEST_ESCAPES.get(char, char) for char in name)
+        return f"\\{digest}  {escaped}\n"
+    return f"{digest}  {name}\n"
+
+
+def read_manifest(path: str, root) -> dict:
+    """
+    Digests recorded in a manifest written by verified copies.
+    
+    Each digest line (see manifest_line) is preceded by a
+    "# size=<bytes> mtime_ns=<ns>" comment (b2sum -c skips comments) with
+    the file's stat when it was written; lines without one are skipped.
+    
+    Returns:
+        {absolute path: (size, mtime_ns, digest)}, later lines winning
+        (empty if the file does not exist)
+    """
+    known = {}
+    stat = None
+    try:
+        with open(path, encoding='utf-8', errors=MANIFEST_ERRORS) as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if line.startswith('# size='):
+                    try:
+                        size, mtime_ns = line[2:].split()
+                        stat = (int(size[len('size='):]), int(mtime_ns[len('mtime_ns='):]))
+                    except ValueError:
+                        stat = None
+                    continue
+                escaped = line.startswith('\\')
+                digest, sep, name = line[escaped:].partition('  ')
+                if escaped:
+                    name = _MANIFEST_UNESCAPE.sub(lambda m: {'n': '\n', 'r': '\r'}.get(m.group(1), m.group(1)), name)
+                if sep and stat is not None:
+                    known[os.path.join(os.fspath(root), name)] = stat + (digest,)
+                stat = None
+    except FileNotFoundError:
+        pass
+    return known
+
+
+class CopyEngine:
+    """
+    Copies file data with the fastest method the filesystems support.
+    
+    Methods are tried in order, falling back when one is not supported:
+    1. reflink         - FICLONE ioctl, shares the data blocks (CoW filesystems)
+    2. copy_file_range - in-kernel copy, may be offloaded by the filesystem
+    3. sendfile        - in-kernel copy through the page cache
+    4. userspace       - read/write loop through a reused buffer
+    
+    A method that fails with a "not supported" error is not retried for the
+    same (source device, destination device) pair; errors that concern one
+    file only (see _UNSUPPORTED_ERRNOS) fall back for that file. Per-method file and byte
+    counters are kept for the summary; copy() is safe to call from several
+    threads and has the shutil.copy2 signature, so it can be passed as
+    copy_function to shutil.copytree/shutil.move.
+    
+    Files of at least large_file_threshold bytes are reflinked where the
+    filesystem can, and otherwise streamed through a read/write loop that
+    keeps them out of the page cache: the source is read with
+    POSIX_FADV_SEQUENTIAL, and every DROP_BEHIND_BYTES the pages already
+    copied are released with POSIX_FADV_DONTNEED (which also starts the
+    writeback of the destination's), so copying a multi-GB file does not
+    evict everything else from memory.
+    """
+    
+    METHODS = ('reflink', 'copy_file_range', 'sendfile', 'userspace')
+    
+    def __init__(self, large_file_threshold: int = None, buffer_size: int = COPY_BUFSIZE,
+                 reuse_buffers: bool = True):
+        """
+        Args:
+            large_file_threshold: Size in bytes from which files are copied
+                with the page-cache-friendly streamed copy (None = never)
+            buffer_size: Buffer size of the read/write loops
+            reuse_buffers: Keep one buffer per thread for all copies instead
+                of allocating one per file
+        """
+        self._lock = threading.Lock()
+        self._unsupported = set()
+        self.large_file_threshold = large_file_threshold
+        self.buffer_size = max(4096, int(buffer_size))
+        self.reuse_buffers = reuse_buffers
+        self._buffers = threading.local()
+        # Throttle paying for the bytes copied (set by FileOrganizer)
+        self.throttle = None
+        # [files, bytes] per method; 'chunked' = parallel chunked copies,
+        # 'hashed' = copies checksummed while streamed (verified copies),
+        # 'streamed' = page-cache-friendly copies of large files
+        self.counters = {method: [0, 0] for method in self.METHODS + ('chunked', 'hashed', 'streamed')}
+    
+    def is_large(self, size: int) -> bool:
+        """Whether a file of size bytes gets the streamed large-file copy."""
+        return self.large_file_threshold is not None and size >= self.large_file_threshold
+    
+    def _throttle(self, size: int) -> None:
+        if self.throttle is not None:
+            self.throttle.transfer(size)
+    
+    def _step(self) -> int:
+        """Bytes per in-kernel copy call: small enough to throttle when a throttle is set."""
+        return self.buffer_size if self.throttle is not None else 1 << 30
+    
+    def _buffer(self) -> bytearray:
+        """Copy buffer for the calling thread (a fresh one without reuse_buffers)."""
+        if not self.reuse_buffers:
+            return bytearray(self.buffer_size)
+        buffer = getattr(self._buffers, 'buffer', None)
+        if buffer is None:
+            buffer = self._buffers.buffer = bytearray(self.buffer_size)
+        return buffer
+    
+    def copy(self, src, dst, *, follow_symlinks: bool = True) -> str:
+        """
+        Copy file data and metadata from src to dst (like shutil.copy2).
+        
+        Returns:
+            dst
+        """
+        if not follow_symlinks and os.path.islink(src):
+            os.symlink(os.readlink(src), dst)
+            return dst
+        
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            src_stat = os.fstat(fsrc.fileno())
+            dst_dev = os.fstat(fdst.fileno()).st_dev
+            size = src_stat.st_size
+            method = self._copy_data(fsrc, fdst, size, (src_stat.st_dev, dst_dev))
+        
+        shutil.copystat(src, dst)
+        self._record(method, size)
+        return dst
+    
+    def copy_chunked(self, src, dst, threads: int, chunk_size: int = CHUNK_SIZE) -> str:
+        """
+        Copy a large file as fixed-size chunks on several threads.
+        
+        Each chunk is copied with positional I/O (copy_file_range with offsets
+        or pread/pwrite), so the threads never share a file position. Small
+        files, threads <= 1, platforms without positional I/O and files that
+        get the streamed large-file copy use copy().
+        
+        Returns:
+            dst
+        """
+        size = os.stat(src).st_size
+        if threads <= 1 or size <= chunk_size or not hasattr(os, 'pwrite') or self.is_large(size):
+            return self.copy(src, dst)
+        
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+            fdst.truncate(size)
+            
+            def copy_chunk(offset):
+                self._copy_range(src_fd, dst_fd, offset, min(chunk_size, size - offset))
+            
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(copy_chunk, range(0, size, chunk_size)))
+        
+        shutil.copystat(src, dst)
+        self._record('chunked', size)
+        return dst
+    
+    def copy_verified(self, src, dst, fast: bool = False) -> Optional[str]:
+        """
+        Copy a file like copy() and check the copy.
+        
+        Full verification hashes the data while it is streamed from the source
+        to the destination (the source is read once), then re-reads the
+        destination from disk once and compares digests. Fast verification
+        copies with the fastest method and only compares size and mtime
+        (within VERIFY_MTIME_TOLERANCE_NS).
+        
+        Args:
+            src: Source file
+            dst: Destination file
+            fast: Compare size and mtime instead of checksums
+            
+        Returns:
+            Hex digest of the data (None in fast mode)
+            
+        Raises:
+            OSError: If the copy does not match the source
+        """
+        if fast:
+            self.copy(src, dst)
+            src_stat, dst_stat = os.stat(src), os.stat(dst)
+            if (src_stat.st_size != dst_stat.st_size
+                    or abs(src_stat.st_mtime_ns - dst_stat.st_mtime_ns) > VERIFY_MTIME_TOLERANCE_NS):
+                raise OSError(f"Verification failed for {dst}: size or mtime differs from source")
+            return None
+        
+        digest = hashlib.new(VERIFY_ALGORITHM)
+        buffer = self._buffer()
+        view = memoryview(buffer)
+        size = 0
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            large = self.is_large(os.fstat(fsrc.fileno()).st_size)
+            for read in self._stream(fsrc, fdst, buffer, large):
+                digest.update(view[:read])
+                size += read
+            # On disk before the re-read, so the check does not just read back the page cache
+            os.fsync(fdst.fileno())
+        
+        shutil.copystat(src, dst)
+        self._record('hashed', size)
+        
+        expected = digest.hexdigest()
+        if file_digest(dst, drop_cache=True, buffer=buffer) != expected:
+            raise OSError(f"Checksum mismatch after copy: {dst}")
+        return expected
+    
+    def _copy_range(self, src_fd: int, dst_fd: int, offset: int, count: int) -> None:
+        """Copy count bytes at offset between two files without moving file positions."""
+        end = offset + count
+        step = self._step()
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while offset < end:
+                    self._throttle(min(step, end - offset))
+                    sent = os.copy_file_range(src_fd, dst_fd, min(step, end - offset), offset, offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                if offset == end:
+                    return
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+        
+        while offset < end:
+            self._throttle(min(self.buffer_size, end - offset))
+            data = os.pread(src_fd, min(self.buffer_size, end - offset), offset)
+            if not data:
+                raise OSError(f"Unexpected end of file at offset {offset}")
+            offset += os.pwrite(dst_fd, data, offset)
+    
+    def _record(self, method: str, size: int) -> None:
+        with self._lock:
+            self.counters[method][0] += 1
+            self.counters[method][1] += size
+    
+    def _copy_data(self, fsrc, fdst, size: int, devices: tuple) -> str:
+        """Copy the file contents, returning the name of the method used."""
+        large = self.is_large(size)
+        if size > 0:
+            # Large files are only reflinked (no data moves at all) or streamed
+            for method in (self.METHODS[:1] if large else self.METHODS[:-1]):
+                if (method, devices) in self._unsupported:
+                    continue
+                try:
+                    if getattr(self, '_' + method)(fsrc.fileno(), fdst.fileno(), size):
+                        return method
+                except OSError as e:
+                    if e.errno not in _FALLBACK_ERRNOS:
+                        raise
+                    if e.errno in _UNSUPPORTED_ERRNOS:
+                        with self._lock:
+                            self._unsupported.add((method, devices))
+                # Start the next method from a clean slate
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        
+        for read in self._stream(fsrc, fdst, self._buffer(), large):
+            pass
+        return 'streamed' if large else 'userspace'
+    
+    def _stream(self, fsrc, fdst, buffer: bytearray, large: bool):
+        """
+        Copy fsrc to fdst through buffer, yielding the size of each block
+        after it was written (the data is in buffer until the next block).
+        
+        The loop reads into and writes from the same buffer, so it allocates
+        no data buffers. With large, the pages of each DROP_BEHIND_BYTES
+        window are dropped from the page cache once the window is copied;
+        the destination's are dropped one window later, when their
+        writeback (started by the first DONTNEED) has had time to finish.
+        """
+        view = memoryview(buffer)
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        fdst.flush()
+        if large:
+            _fadvise(src_fd, 0, 0, 'POSIX_FADV_SEQUENTIAL')
+        offset = window = previous = 0
+        while True:
+            read = fsrc.readinto(buffer)
+            if not read:
+                break
+            self._throttle(read)
+            written = 0
+            while written < read:
+                written += os.write(dst_fd, view[written:read])
+            offset += read
+            yield read
+            
+            if large and offset - window >= DROP_BEHIND_BYTES:
+                _fadvise(src_fd, window, offset - window, 'POSIX_FADV_DONTNEED')
+                _fadvise(dst_fd, previous, offset - previous, 'POSIX_FADV_DONTNEED')
+                previous, window = window, offset
+        
+        if large:
+            _fadvise(src_fd, 0, 0, 'POSIX_FADV_DONTNEED')
+            _fadvise(dst_fd, 0, 0, 'POSIX_FADV_DONTNEED')
+    
+    @staticmethod
+    def _reflink(src_fd: int, dst_fd: int, size: int) -> bool:
+        if fcntl is None or not sys.platform.startswith('linux'):
+            return False
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    
+    def _copy_file_range(self, src_fd: int, dst_fd: int, size: int) -> bool:
+        if not hasattr(os, 'copy_file_range'):
+            return False
+        copied = 0
+        step = self._step()
+        while copied < size:
+            self._throttle(min(size - copied, step))
+            sent = os.copy_file_range(src_fd, dst_fd, min(size - copied, step))
+            if sent == 0:
+                break
+            copied += sent
+        return copied == size
+    
+    def _sendfile(self, src_fd: int, dst_fd: int, size: int) -> bool:
+        # File-to-file sendfile is Linux only (other platforms need a socket)
+        if not hasattr(os, 'sendfile') or not sys.platform.startswith('linux'):
+            return False
+        copied = 0
+        step = self._step()
+        while copied < size:
+            self._throttle(min(size - copied, step))
+            sent = os.sendfile(dst_fd, src_fd, copied, min(size - copied, step))
+            if sent == 0:
+                break
+            copied += sent
+        return copied == size
+    
+    def describe(self) -> List[str]:
+        """Summary lines ('method: N file(s), X MB') for the methods used."""
+        return [
+            f"{method}: {files} file(s), {size / BYTES_PER_MB:.2f} MB"
+            for method, (files, size) in self.counters.items() if files
+        ]
+
+
+# ============================================
+# THROTTLING
+# ============================================
+
+# A full token bucket holds this many seconds of its rate: the largest
+# burst allowed after an idle spell
+THROTTLE_BURST_SECONDS = 1.0
+
+# Seconds between checks of the throttle control file for changes
+THROTTLE_CHECK_SECONDS = 1.0
+
+# Keys of the throttle control file
+THROTTLE_KEYS = ('max_mbps', 'max_ops_per_sec')
+
+
+class TokenBucket:
+    """
+    Token bucket limiting a rate (bytes/s or operations/s) across threads.
+    
+    take() never refuses: it takes the tokens even if that puts the bucket
+    in debt, then sleeps until the debt is paid off at the current rate.
+    Requests larger than the bucket (a whole chunk of a file) pass without
+    special cases, and concurrent callers are served in the order they came.
+    """
+    
+    def __init__(self, rate: Optional[float] = None):
+        self._lock = threading.Lock()
+        self.rate = None
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self.set_rate(rate)
+    
+    def set_rate(self, rate: Optional[float]) -> None:
+        """Change the rate (None or <= 0 = unlimited); applies to the next take()."""
+        with self._lock:
+            self._refill()
+            self.rate = rate if rate and rate > 0 else None
+            # Starting empty keeps short runs under the cap too
+            self._tokens = 0.0 if self.rate is None else min(self._tokens, self.rate * THROTTLE_BURST_SECONDS)
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate is not None:
+            self._tokens = min(self._tokens + (now - self._updated) * self.rate,
+                               self.rate * THROTTLE_BURST_SECONDS)
+        self._updated = now
+    
+    def take(self, amount: float) -> float:
+        """
+        Take amount tokens, sleeping as long as the rate requires.
+        
+        Returns:
+            Seconds slept
+        """
+        with self._lock:
+            if self.rate is None:
+                return 0.0
+            self._refill()
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class Throttle:
+    """
+    Bandwidth (MB/s) and operation (items/s) caps for a whole run, shared
+    by every worker thread, every copy (including the copies of
+    cross-device moves) and every move.
+    
+    Bytes are paid for as they are copied, in chunks of the copy buffer
+    size; same-device moves copy nothing and only cost an operation.
+    
+    The caps can be changed while a run goes on through the control file,
+    a JSON object with THROTTLE_KEYS (null = unlimited), e.g.
+    {"max_mbps": 20, "max_ops_per_sec": null}. It is written with the
+    starting caps, checked for changes every THROTTLE_CHECK_SECONDS, and
+    re-read at once after request_reload() (SIGHUP from the command line).
+    """
+    
+    def __init__(self, max_mbps: float = None, max_ops_per_sec: float = None, control_file: str = None):
+        self._bytes = TokenBucket()
+        self._ops = TokenBucket()
+        self._lock = threading.Lock()
+        self.max_mbps = self.max_ops_per_sec = None
+        self._set_caps(max_mbps, max_ops_per_sec)
+        
+        self.control_file = control_file
+        self._control_mtime = None
+        self._next_check = 0.0
+        self._reload_requested = False
+        self.adjustments = 0
+        
+        # What went through, for the achieved rates
+        self.bytes = self.operations = 0
+        self.waited_seconds = 0.0
+        self._first = self._last = None
+        
+        if control_file:
+            with open(control_file, 'w', encoding='utf-8') as f:
+                json.dump({'max_mbps': max_mbps, 'max_ops_per_sec': max_ops_per_sec}, f)
+                f.write('\n')
+            self._control_mtime = os.stat(control_file).st_mtime_ns
+    
+    def _set_caps(self, max_mbps: Optional[float], max_ops_per_sec: Optional[float]) -> None:
+        self.max_mbps = max_mbps if max_mbps and max_mbps > 0 else None
+        self.max_ops_per_sec = max_ops_per_sec if max_ops_per_sec and max_ops_per_sec > 0 else None
+        self._bytes.set_rate(self.max_mbps * BYTES_PER_MB if self.max_mbps else None)
+        self._ops.set_rate(self.max_ops_per_sec)
+    
+    def transfer(self, size: int) -> None:
+        """Pay for size bytes about to be copied."""
+        self._check()
+        self._account(size, 0, self._bytes.take(size))
+    
+    def operation(self) -> None:
+        """Pay for one item about to be copied or moved."""
+        self._check()
+        self._account(0, 1, self._ops.take(1))
+    
+    def request_reload(self) -> None:
+        """Re-read the control file before the next transfer (safe in signal handlers)."""
+        self._reload_requested = True
+    
+    def _account(self, size: int, operations: int, waited: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.bytes += size
+            self.operations += operations
+            self.waited_seconds += waited
+            if self._first is None:
+                self._first = now - waited
+            self._last = now
+    
+    def _check(self) -> None:
+        """Apply the control file if it changed (at most every THROTTLE_CHECK_SECONDS)."""
+        if self.control_file is None:
+            return
+        now = time.monotonic()
+        if now < self._next_check and not self._reload_requested:
+            return
+        with self._lock:
+            if now < self._next_check and not self._reload_requested:
+                return
+            self._next_check = now + THROTTLE_CHECK_SECONDS
+            self._reload_requested = False
+            try:
+                mtime = os.stat(self.control_file).st_mtime_ns
+                if mtime == self._control_mtime:
+                    return
+                self._control_mtime = mtime
+                with open(self.control_file, encoding='utf-8') as f:
+                    caps = json.load(f)
+                if not isinstance(caps, dict) or set(caps) - set(THROTTLE_KEYS):
+                    raise ValueError(f"expected an object with the keys {', '.join(THROTTLE_KEYS)}")
+                max_mbps = caps.get('max_mbps', self.max_mbps)
+                max_ops = caps.get('max_ops_per_sec', self.max_ops_per_sec)
+                for value in (max_mbps, max_ops):
+                    if value is not None and not isinstance(value, (int, float)):
+                        raise ValueError(f"caps must be numbers or null, not {value!r}")
+            except (OSError, ValueError) as e:
+                logging.warning(f"Throttle control file {self.control_file} ignored: {e}")
+                return
+            self._set_caps(max_mbps, max_ops)
+            self.adjustments += 1
+        logging.info(f"Throttle changed: {self.describe_caps()}")
+    
+    def describe_caps(self) -> str:
+        mbps = f"{self.max_mbps:g} MB/s" if self.max_mbps else "unlimited MB/s"
+        ops = f"{self.max_ops_per_sec:g} items/s" if self.max_ops_per_sec else "unlimited items/s"
+        return f"{mbps}, {ops}"
+    
+    def report(self) -> dict:
+        """Caps and achieved rates, as plain data."""
+        active = (self._last - self._first) if self._first is not None else 0.0
+        return {
+            'max_mbps': self.max_mbps,
+            'max_ops_per_sec': self.max_ops_per_sec,
+            'adjustments': self.adjustments,
+            'bytes': self.bytes,
+            'operations': self.operations,
+            'active_seconds': round(active, 6),
+            'waited_seconds': round(self.waited_seconds, 6),
+            'achieved_mbps': round(self.bytes / BYTES_PER_MB / active, 3) if active else None,
+            'achieved_ops_per_sec': round(self.operations / active, 3) if active else None,
+        }
+    
+    def describe(self) -> List[str]:
+        """Summary lines: achieved rates against the (final) caps."""
+        report = self.report()
+        lines = []
+        for label, achieved, cap, unit in (
+                ('Bandwidth', report['achieved_mbps'], self.max_mbps, 'MB/s'),
+                ('Operations', report['achieved_ops_per_sec'], self.max_ops_per_sec, 'items/s')):
+            achieved_text = f"{achieved:.2f} {unit}" if achieved is not None else "-"
+            if cap:
+                lines.append(f"{label + ':':<12} {achieved_text} of {cap:g} {unit} cap ({achieved / cap * 100:.0f}%)"
+                             if achieved is not None else f"{label + ':':<12} - of {cap:g} {unit} cap")
+            else:
+                lines.append(f"{label + ':':<12} {achieved_text} (no cap)")
+        lines.append(f"{'Waited:':<12} {report['waited_seconds']:.3f}s across all workers")
+        if self.adjustments:
+            lines.append(f"{'Changed:':<12} {self.adjustments} time(s) during the run")
+        return lines
+
+
+# ============================================
+# SCAN INDEX
+# ============================================
+
+# Directories modified less than this long before they are listed are not
+# trusted on the next run: another change within the same mtime tick
+# would go unnoticed
+INDEX_RACY_NS = 2 * 1000 ** 3
+
+
+class IndexedStat(namedtuple('IndexedStat', 'st_size st_mtime_ns')):
+    """The part of an os.stat_result kept in the scan index."""
+    
+    __slots__ = ()
+    
+    @property
+    def st_mtime(self) -> float:
+        return self.st_mtime_ns / 1e9
+
+
+class IndexedEntry:
+    """
+    os.DirEntry stand-in served from the scan index.
+    
+    Supports what the scanners use: name, path, is_dir(), is_file(),
+    is_symlink(), stat() and os.fspath().
+    """
+    
+    __slots__ = ('name', 'path', '_is_dir', '_is_file', '_is_link', '_stat')
+    
+    def __init__(self, parent: str, name: str, size: int, mtime_ns: int,
+                 is_dir: bool, is_file: bool, is_link: bool):
+        self.name = name
+        self.path = os.path.join(parent, name)
+        self._is_dir = is_dir
+        self._is_file = is_file
+        self._is_link = is_link
+        self._stat = IndexedStat(size, mtime_ns)
+    
+    def is_dir(self, *, follow_symlinks: bool = True) -> bool:
+        return self._is_dir if follow_symlinks else self._is_dir and not self._is_link
+    
+    def is_file(self, *, follow_symlinks: bool = True) -> bool:
+        return self._is_file if follow_symlinks else self._is_file and not self._is_link
+    
+    def is_symlink(self) -> bool:
+        return self._is_link
+    
+    def stat(self, *, follow_symlinks: bool = True) -> IndexedStat:
+        return self._stat
+    
+    def __fspath__(self) -> str:
+        return self.path
+    
+    def __repr__(self) -> str:
+        return f"<IndexedEntry {self.name!r}>"
+
+
+class ScanIndex:
+    """
+    Persistent (sqlite3) index of directory listings.
+    
+    Each listed directory is stored with its mtime, and each of its entries
+    as a (path, size, mtime, ext, is_dir) row. When a directory's mtime has
+    not changed since it was indexed, its listing is served from the index
+    with a single stat of the directory instead of a scandir plus a stat per
+    entry.
+    
+    Note: a file rewritten in place does not change its directory's mtime,
+    so its indexed size can be stale until something is added, removed or
+    renamed in that directory.
+    
+    The organizer reports every copy/move through record_transfer(); the
+    folders it changed are listed again on the next run, since other
+    programs may have changed them during this one too.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS dirs (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            parent TEXT NOT NULL,
+            name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            ext TEXT NOT NULL,
+            is_dir INTEGER NOT NULL,
+            is_file INTEGER NOT NULL,
+            is_link INTEGER NOT NULL,
+            PRIMARY KEY (parent, name)
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        Open (or create) an index.
+        
+        Args:
+            db_path: Path of the sqlite3 database file
+        """
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(self.SCHEMA)
+        self._lock = threading.Lock()
+        self._touched = set()
+        self.hits = 0
+        self.misses = 0
+        self.list_seconds = 0.0
+    
+    def list_dir(self, path) -> list:
+        """
+        List a directory, from the index when its mtime is unchanged.
+        
+        Returns:
+            List of IndexedEntry (index hit) or os.DirEntry (re-listed)
+        
+        Raises:
+            OSError: If the directory cannot be stat'ed or listed
+        """
+        start = time.perf_counter()
+        path = os.path.abspath(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        
+        with self._lock:
+            row = self._db.execute("SELECT mtime_ns FROM dirs WHERE path = ?", (path,)).fetchone()
+            if row is not None and row[0] == mtime_ns:
+                rows = self._db.execute(
+                    "SELECT name, size, mtime_ns, is_dir, is_file, is_link FROM entries WHERE parent = ?",
+                    (path,)).fetchall()
+                self.hits += 1
+                self.list_seconds += time.perf_counter() - start
+                return [IndexedEntry(path, name, size, mtime, bool(is_dir), bool(is_file), bool(is_link))
+                        for name, size, mtime, is_dir, is_file, is_link in rows]
+        
+        with os.scandir(path) as it:
+            entries = list(it)
+        
+        rows = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+                is_file = not is_dir and entry.is_file()
+                is_link = entry.is_symlink()
+                st = entry.stat() if is_file else entry.stat(follow_symlinks=False)
+                size, mtime = (st.st_size if is_file else 0), st.st_mtime_ns
+            except OSError:
+                continue
+            rows.append((path, entry.name, size, mtime, os.path.splitext(entry.name)[1].lower(),
+                         is_dir, is_file, is_link))
+        
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE parent = ?", (path,))
+            self._db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            if time.time_ns() - mtime_ns > INDEX_RACY_NS:
+                self._db.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (path, mtime_ns))
+            else:
+                self._db.execute("DELETE FROM dirs WHERE path = ?", (path,))
+            self.misses += 1
+            self.list_seconds += time.perf_counter() - start
+        return entries
+    
+    def record_transfer(self, source, destination, is_dir: bool, moved: bool) -> None:
+        """
+        Update the index after the organizer copied or moved an item.
+        
+        Args:
+            source: Source path of the item
+            destination: Destination path of the item
+            is_dir: True for folders
+            moved: True for moves (the source is gone), False for copies
+        """
+        source = os.path.abspath(source)
+        destination = os.path.abspath(destination)
+        
+        with self._lock:
+            if moved:
+                if is_dir:
+                    self._forget_tree(source)
+                self._touched.add(os.path.dirname(source))
+            self._touched.add(os.path.dirname(destination))
+    
+    def _forget_tree(self, path: str) -> None:
+        """Drop the rows of a folder tree that no longer exists."""
+        prefix = path.rstrip(os.sep) + os.sep
+        for table, column in (("entries", "parent"), ("dirs", "path")):
+            self._db.execute(
+                f"DELETE FROM {table} WHERE {column} = ? OR substr({column}, 1, ?) = ?",
+                (path, len(prefix), prefix))
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+    
+    def set_meta(self, key: str, value) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+    
+    def commit(self) -> None:
+        """
+        Write pending changes.
+        
+        Directories the organizer changed are dropped from the index: their
+        current mtime also covers whatever other programs did in them during
+        the run, which only a fresh listing can see.
+        """
+        with self._lock:
+            self._db.executemany("DELETE FROM dirs WHERE path = ?", ((path,) for path in self._touched))
+            self._touched.clear()
+            self._db.commit()
+    
+    def close(self) -> None:
+        self.commit()
+        self._db.close()
+
+
+# ============================================
+# FOLDER CACHE
+# ============================================
+
+class FolderCache:
+    """
+    Persistent (sqlite3) cache of FolderSummary records, bounded by LRU.
+    
+    A cached summary is valid while the mtime of every folder in its tree is
+    unchanged, which costs one stat per folder instead of one per file. Any
+    file added, removed or renamed anywhere in the tree changes the mtime of
+    its folder and invalidates the entry (a file rewritten in place does not).
+    
+    Usable on its own:
+        cache = FolderCache("folders.db")
+        summary = cache.summarize("/data/Project_A")
+        cache.close()
+    or through FileOrganizer(folder_cache=...) / --folder-cache.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS folder_summaries (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            file_count INTEGER NOT NULL,
+            extensions TEXT NOT NULL,
+            dir_mtimes TEXT NOT NULL,
+            last_used INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS folder_summaries_lru ON folder_summaries (last_used);
+    """
+    
+    def __init__(self, db_path: str, max_entries: int = 10000):
+        """
+        Open (or create) a folder cache.
+        
+        Args:
+            db_path: Path of the sqlite3 database file
+            max_entries: Maximum number of folders kept; the least recently
+                used entries are evicted beyond that
+        """
+        self.db_path = db_path
+        self.max_entries = max(1, int(max_entries))
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(self.SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, folder_path) -> Optional[FolderSummary]:
+        """
+        Return the cached summary of a folder if it is still valid.
+        
+        Returns:
+            FolderSummary, or None if missing or out of date
+        """
+        path = os.path.abspath(folder_path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, file_count, extensions, dir_mtimes FROM folder_summaries WHERE path = ?",
+                (path,)).fetchone()
+        if row is None:
+            return None
+        
+        size, file_count, extensions, dir_mtimes = row
+        dir_mtimes = tuple((rel, mtime) for rel, mtime in json.loads(dir_mtimes))
+        for rel, mtime_ns in dir_mtimes:
+            try:
+                if os.stat(os.path.join(path, rel)).st_mtime_ns != mtime_ns:
+                    break
+            except OSError:
+                break
+        else:
+            with self._lock:
+                self._db.execute("UPDATE folder_summaries SET last_used = ? WHERE path = ?",
+                                 (time.time_ns(), path))
+                self.hits += 1
+            return FolderSummary(size, file_count, frozenset(json.loads(extensions)), dir_mtimes, 0)
+        
+        with self._lock:
+            self._db.execute("DELETE FROM folder_summaries WHERE path = ?", (path,))
+        return None
+    
+    def put(self, folder_path, summary: FolderSummary) -> None:
+        """
+        Store a summary (skipped if part of the tree was unreadable or a
+        folder changed too recently for its mtime to be trusted).
+        """
+        now = time.time_ns()
+        if summary.errors or any(now - mtime < INDEX_RACY_NS for _, mtime in summary.dir_mtimes):
+            return
+        
+        path = os.path.abspath(folder_path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO folder_summaries VALUES (?, ?, ?, ?, ?, ?)",
+                (path, summary.size_bytes, summary.file_count, json.dumps(sorted(summary.extensions)),
+                 json.dumps(summary.dir_mtimes), now))
+            self._db.execute(
+                "DELETE FROM folder_summaries WHERE path IN (SELECT path FROM folder_summaries "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+    
+    def summarize(self, folder_path) -> FolderSummary:
+        """Summary of a folder, from the cache or by walking it (and caching it)."""
+        summary = self.get(folder_path)
+        if summary is None:
+            summary = summarize_folder(folder_path)
+            self.record(folder_path, summary)
+        return summary
+    
+    def record(self, folder_path, summary: FolderSummary) -> None:
+        """Count a cache miss and store the freshly computed summary."""
+        with self._lock:
+            self.misses += 1
+        self.put(folder_path, summary)
+    
+    def forget(self, folder_path) -> None:
+        """Drop a folder (e.g. after it was moved away)."""
+        with self._lock:
+            self._db.execute("DELETE FROM folder_summaries WHERE path = ?",
+                             (os.path.abspath(folder_path),))
+    
+    def commit(self) -> None:
+        with self._lock:
+            self._db.commit()
+    
+    def close(self) -> None:
+        self.commit()
+        self._db.close()
+
+
+# ============================================
+# DUPLICATE DETECTION
+# ============================================
+
+# Bytes hashed from each end of a file for the partial-hash tier
+DEDUP_BLOCK_SIZE = 64 * 1024
+
+# A file registered with the duplicate index:
+#   paths:    paths the file can be read from, in order (a source file
+#             queued for a move is found at its destination once moved)
+#   mtime_ns: mtime of a source file, to check its copy is in place
+#             (None for files already at the destination)
+DedupEntry = namedtuple('DedupEntry', 'paths mtime_ns')
+
+
+class DuplicateIndex:
+    """
+    Finds files with the same content among the files registered so far.
+    
+    Candidates are compared in tiers, each one only for files that matched
+    the previous tier, and every digest is computed at most once per file:
+    1. size          - known from the scan, no reads
+    2. partial hash  - first and last DEDUP_BLOCK_SIZE bytes
+    3. full hash     - whole file (not needed when the partial hash
+                       already covered all of it); taken from known
+                       digests (see read_manifest) when the file's size
+                       and mtime still match
+    """
+    
+    def __init__(self, block_size: int = DEDUP_BLOCK_SIZE, known: dict = None):
+        self.block_size = block_size
+        self.known = known or {}
+        self._by_size = {}
+        self._partial = {}
+        self._full = {}
+        self.partial_reads = 0
+        self.full_reads = 0
+        self.full_reused = 0
+    
+    def add(self, entry: DedupEntry, size: int) -> None:
+        """Register a file as a possible original for later files."""
+        self._by_size.setdefault(size, []).append(entry)
+    
+    def find(self, entry: DedupEntry, size: int) -> Optional[DedupEntry]:
+        """Return the first registered file with the same content, or None."""
+        for other in self._by_size.get(size, ()):
+            if self._digest(entry, size, partial=True) != self._digest(other, size, partial=True):
+                continue
+            if size <= 2 * self.block_size:
+                return other
+            if self._digest(entry, size, partial=False) == self._digest(other, size, partial=False):
+                return other
+        return None
+    
+    def _digest(self, entry: DedupEntry, size: int, partial: bool):
+        cache = self._partial if partial else self._full
+        key = entry.paths[0]
+        if key not in cache:
+            cache[key] = self._read_digest(entry.paths, size, partial)
+        return cache[key]
+    
+    def _read_digest(self, paths: tuple, size: int, partial: bool):
+        for path in paths:
+            try:
+                if not partial:
+                    known = self.known.get(path)
+                    if known is not None:
+                        st = os.stat(path)
+                        if (st.st_size, st.st_mtime_ns) == known[:2]:
+                            self.full_reused += 1
+                            return known[2]
+                    digest = file_digest(path)
+                    self.full_reads += 1
+                    return digest
+                
+                digest = hashlib.blake2b(digest_size=16)
+                with open(path, 'rb') as f:
+                    digest.update(f.read(self.block_size))
+                    if size > self.block_size:
+                        f.seek(max(self.block_size, size - self.block_size))
+                        digest.update(f.read(self.block_size))
+                self.partial_reads += 1
+                return digest.digest()
+            except OSError:
+                continue
+        # Unreadable: a unique value, equal to no other file's digest
+        return object()
+
+
+# ============================================
+# OPERATION JOURNAL
+# ============================================
+
+# The journal is fsync'ed after this many records or this many seconds,
+# whichever comes first (and always before sources are deleted)
+JOURNAL_SYNC_EVERY = 256
+JOURNAL_SYNC_SECONDS = 1.0
+
+# What a journal file says about an earlier run
+#   header:        the run record (source, destination, mode)
+#   ops:           {op id: (kind, source, name)} of every planned operation
+#   done:          {op id: status} of completed operations ('ok'/'skipped'/'error')
+#   copied:        op ids of cross-device moves whose copy was verified
+#   temps:         paths of the temporary copies (see make_temp) the run created
+#   scan_complete: True if the scan finished (every operation was planned)
+#   finished:      True if the run ended normally
+JournalState = namedtuple('JournalState', 'header ops done copied temps scan_complete finished')
+
+
+class Journal:
+    """
+    Append-only write-ahead journal of planned and completed operations.
+    
+    One JSON object per line:
+        {"t": "run", "source": ..., "destination": ..., "copy": ...}
+        {"t": "plan", "id": 7, "kind": "file", "src": ..., "name": ...}
+        {"t": "temp", "id": 7, "path": ...}  (temporary copy created)
+        {"t": "copied", "id": 7}      (cross-device move, copy verified)
+        {"t": "done", "id": 7, "status": "ok"}
+        {"t": "scanned"}              (scan finished, all operations planned)
+        {"t": "end"}                  (run finished)
+    
+    Writes are buffered and fsync'ed in batches. A record lost in a crash
+    only means an operation is re-checked on resume; a torn last line is
+    ignored when the journal is loaded. Temp records are flushed to the
+    OS as soon as they are written, so a killed run leaves no temporary
+    copy behind that the resume does not know about.
+    """
+    
+    def __init__(self, path: str, sync_every: int = JOURNAL_SYNC_EVERY,
+                 sync_seconds: float = JOURNAL_SYNC_SECONDS):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_seconds = sync_seconds
+        self._file = None
+        self._lock = threading.Lock()
+        self._pending = {}  # source path -> op id of operations not done yet
+        self._next_id = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    @staticmethod
+    def load(path: str) -> Optional[JournalState]:
+        """Read a journal file (None if it does not exist)."""
+        if not os.path.exists(path):
+            return None
+        
+        header, ops, done, copied, temps = None, {}, {}, set(), []
+        scan_complete = finished = False
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn write at the point of the crash
+                kind = record.get('t')
+                if kind == 'run':
+                    header = record
+                elif kind == 'plan':
+                    ops[record['id']] = (record['kind'], record['src'], record['name'])
+                elif kind == 'done':
+                    done[record['id']] = record['status']
+                elif kind == 'copied':
+                    copied.add(record['id'])
+                elif kind == 'temp':
+                    temps.append(record['path'])
+                elif kind == 'scanned':
+                    scan_complete = True
+                elif kind == 'end':
+                    finished = True
+        return JournalState(header, ops, done, copied, temps, scan_complete, finished)
+    
+    def start(self, header: dict, state: Optional[JournalState] = None) -> None:
+        """Open the journal: append to a resumed one, or start a new one."""
+        if state is None:
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._write(dict(header, t='run'))
+        else:
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._next_id = max(state.ops, default=-1) + 1
+        self.sync()
+    
+    def plan(self, kind: str, source, name: str) -> int:
+        """Record a planned operation; returns its id."""
+        with self._lock:
+            op_id = self._next_id
+            self._next_id += 1
+            self._pending[str(source)] = op_id
+            self._write({'t': 'plan', 'id': op_id, 'kind': kind, 'src': str(source), 'name': name})
+        return op_id
+    
+    def adopt(self, op_id: int, source) -> None:
+        """Track an operation planned by the interrupted run."""
+        with self._lock:
+            self._pending[str(source)] = op_id
+    
+    def temp(self, source, path) -> None:
+        """Record the temporary copy created for an operation (flushed at once)."""
+        with self._lock:
+            op_id = self._pending.get(str(source))
+            self._write({'t': 'temp', 'id': op_id, 'path': os.fspath(path)})
+            self._file.flush()
+    
+    def copied(self, source) -> None:
+        """Record that a cross-device move's copy is verified and in place."""
+        with self._lock:
+            op_id = self._pending.get(str(source))
+            if op_id is not None:
+                self._write({'t': 'copied', 'id': op_id})
+    
+    def done(self, source, status: str) -> None:
+        """Record a completed operation ('ok', 'skipped' or 'error')."""
+        with self._lock:
+            op_id = self._pending.pop(str(source), None)
+            if op_id is not None:
+                self._write({'t': 'done', 'id': op_id, 'status': status})
+    
+    def scanned(self) -> None:
+        """Record that every operation of the run has been planned."""
+        with self._lock:
+            self._write({'t': 'scanned'})
+    
+    def finish(self) -> None:
+        """Record the end of the run."""
+        with self._lock:
+            self._write({'t': 'end'})
+            self._sync()
+    
+    def sync(self) -> None:
+        """Flush and fsync buffered records now."""
+        with self._lock:
+            self._sync()
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+    
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._unsynced += 1
+        if (self._unsynced >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_seconds):
+            self._sync()
+    
+    def _sync(self) -> None:
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+
+# ============================================
+# OPERATION LOG
+# ============================================
+
+# Operation log lines are written in batches of this many
+OPLOG_BATCH_SIZE = 1000
+
+# JSON string literal of a str, escaped to ASCII like json.dumps does (the C
+# encoder it uses internally): names os could not decode carry lone
+# surrogates, which a UTF-8 file cannot hold but json.loads gives back
+_json_string = json.encoder.encode_basestring_ascii
+
+
+class OperationLog:
+    """
+    Compact, machine-readable record of every operation, in JSON lines:
+        {"ts": 1718000000.123, "op": "move", "src": "...", "dst": "..."}
+    
+    op is one of copy, move, link, skip, error, done (finished by an
+    earlier run) or plan (dry run). Lines are collected in memory and
+    written OPLOG_BATCH_SIZE at a time, so a transfer only appends a string.
+    """
+    
+    def __init__(self, path: str, batch_size: int = OPLOG_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.records = 0
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._batch = []
+    
+    def record(self, op: str, source, destination) -> None:
+        # Built by hand: json.dumps of a dict costs several times more per line
+        line = '{"ts":%.3f,"op":"%s","src":%s,"dst":%s}' % (
+            time.time(), op, _json_string(os.fspath(source)), _json_string(os.fspath(destination)))
+        with self._lock:
+            self._batch.append(line)
+            self.records += 1
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+    
+    def _flush(self) -> None:
+        if self._batch:
+            self._file.write('\n'.join(self._batch) + '\n')
+            self._file.flush()
+            self._batch = []
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+                self._file.close()
+                self._file = None
+
+
+# ============================================
+# OPERATION PLAN
+# ============================================
+
+# Plan file format; apply refuses plans of other versions
+PLAN_VERSION = 1
+
+PlanOp = namedtuple('PlanOp', 'kind source name size mtime_ns')
+
+
+class OperationPlan:
+    """
+    Plan file written by a planning run and executed by an applying one,
+    in JSON lines:
+        {"plan": 1, "source": "...", "destination": "...", "copy": false, ...}
+        {"k": "f", "src": "...", "name": "...", "size": 1234, "mtime": 1718000000123456789}
+        {"end": 1}
+    
+    k is "f" (file) or "d" (folder) and name is the path at the destination.
+    size and mtime (ns) are what the scan saw (size is null for folders), so
+    the applying run can skip anything that changed with one stat. The end
+    record marks a complete plan. Plans are written and read one line at a
+    time and never held in memory. Strings are escaped to ASCII (see
+    _json_string), so json.loads gives names that are not valid UTF-8 back
+    exactly as os returned them when the plan was made.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._lock = threading.Lock()
+    
+    def create(self, header: dict) -> None:
+        """Start a new plan file with the given header fields."""
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(json.dumps(dict(header, plan=PLAN_VERSION), separators=(',', ':')) + '\n')
+    
+    def add(self, kind: str, source, name: str, st: os.stat_result) -> None:
+        """Record a planned operation ('file' or 'folder') and its source's stat."""
+        line = '{"k":"%s","src":%s,"name":%s,"size":%s,"mtime":%d}\n' % (
+            'd' if kind == 'folder' else 'f', _json_string(os.path.abspath(source)), _json_string(name),
+            'null' if kind == 'folder' else st.st_size, st.st_mtime_ns)
+        with self._lock:
+            self._file.write(line)
+            self.count += 1
+    
+    def close(self, complete: bool = False) -> None:
+        """Close the file; only a complete plan gets its end record."""
+        with self._lock:
+            if self._file is not None:
+                if complete:
+                    self._file.write(json.dumps({'end': self.count}) + '\n')
+                self._file.close()
+                self._file = None
+    
+    @staticmethod
+    def read_header(path: str) -> dict:
+        """
+        Header of a complete plan file, with the number of operations added
+        as 'operations'.
+        
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If it is not a plan file, or an incomplete one
+        """
+        with open(path, 'rb') as f:
+            try:
+                header = json.loads(f.readline() or b'null')
+            except ValueError:
+                header = None
+            if not isinstance(header, dict) or header.get('plan') != PLAN_VERSION:
+                raise ValueError(f"{path} is not a plan file (version {PLAN_VERSION})")
+            
+            # The end record is the last line; no need to read the operations
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - 4096))
+            lines = f.read().splitlines()
+        try:
+            end = json.loads(lines[-1])
+        except (IndexError, ValueError):
+            end = None
+        if not isinstance(end, dict) or 'end' not in end:
+            raise ValueError(f"{path} is incomplete (the planning run did not finish)")
+        header['operations'] = end['end']
+        return header
+    
+    @staticmethod
+    def iter_ops(path: str):
+        """
+        Read the operations of a plan file lazily.
+        
+        Yields:
+            PlanOp tuples, in plan order
+        """
+        with open(path, encoding='utf-8') as f:
+            f.readline()  # header
+            for line in f:
+                record = json.loads(line)
+                if 'end' in record:
+                    return
+                yield PlanOp('folder' if record['k'] == 'd' else 'file', record['src'], record['name'],
+                             record['size'], record['mtime'])
+
+
+# ============================================
+# DESTINATION TEMPLATES
+# ============================================
+
+# Fields a destination template can use, e.g. "{ext}/{mtime:%Y}/{mtime:%m}":
+#   name   file/folder name            stem  name without extension
+#   ext    extension, lowercased, without the dot ("noext" if none)
+#   mtime  modification time (datetime; strftime format after the colon)
+#   size   size in bytes (folders: size of the folder entry itself)
+#   dir    folder of the item relative to source ("" at the top level)
+TEMPLATE_FIELDS = frozenset(('name', 'stem', 'ext', 'mtime', 'size', 'dir'))
+
+
+class DestinationTemplate:
+    """
+    Compiled destination template: the sub-folder of destination an item
+    goes into, filled from the item's DirEntry.
+    
+    The template is parsed once. Only templates using mtime or size need the
+    entry's stat, and a DirEntry caches it, so a file whose size was already
+    checked by the filters costs no extra syscall.
+    """
+    
+    def __init__(self, template: str):
+        fields = set()
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            if any(part == os.pardir for part in re.split(r'[\\/]', literal)):
+                raise ValueError(f"Destination template must stay inside the destination: {template!r}")
+            if field is not None:
+                if field not in TEMPLATE_FIELDS:
+                    raise ValueError(f"Unknown field {{{field}}} in destination template "
+                                     f"(use {', '.join(sorted(TEMPLATE_FIELDS))})")
+                fields.add(field)
+        if os.path.isabs(template):
+            raise ValueError(f"Destination template must be relative: {template!r}")
+        self.template = template
+        self.fields = frozenset(fields)
+        self.needs_stat = bool(self.fields & {'mtime', 'size'})
+    
+    def render(self, entry, rel_dir: str = "") -> str:
+        """
+        Sub-folder for an entry.
+        
+        Args:
+            entry: DirEntry (or Path) of the file or folder
+            rel_dir: Folder of the entry relative to source
+            
+        Returns:
+            Relative folder path, normalized
+        
+        Raises:
+            OSError: If the entry has to be stat'ed and cannot be
+        """
+        stem, ext = os.path.splitext(entry.name)
+        values = {'name': entry.name, 'stem': stem, 'ext': ext[1:].lower() or 'noext', 'dir': rel_dir}
+        if self.needs_stat:
+            st = entry.stat()
+            values['mtime'] = datetime.fromtimestamp(st.st_mtime)
+            values['size'] = st.st_size
+        return os.path.normpath(self.template.format_map(values))
+
+
+# ============================================
+# WATCH MODE
+# ============================================
+
+# Seconds an item must be quiet (no events) before watch mode processes it
+WATCH_SETTLE_SECONDS = 0.5
+
+# Seconds between checks when inotify is not available
+WATCH_POLL_SECONDS = 2.0
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event without its name: wd, mask, cookie, len
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def _raise_interrupt(signum, frame):
+    """Signal handler turning SIGTERM into a KeyboardInterrupt."""
+    raise KeyboardInterrupt
+
+
+class InotifyWatcher:
+    """
+    Names of the direct children of a folder that were created, written,
+    touched or moved in, from inotify (Linux) through ctypes.
+    
+    wait() blocks in select() until the kernel reports an event, so an
+    idle watch uses no CPU at all. A name whose last event is IN_CLOSE_WRITE
+    is reported as closed: its writer is done with it.
+    """
+    
+    method = 'inotify'
+    mask = (IN_CREATE | IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO
+            | IN_DELETE_SELF | IN_MOVE_SELF)
+    
+    def __init__(self, path):
+        if ctypes is None or not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "the C library has no inotify")
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), self.mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, os.strerror(error), os.fspath(path))
+    
+    def wait(self, timeout: Optional[float]) -> Optional[List[Tuple[str, bool]]]:
+        """
+        Wait up to timeout seconds (None = forever) for events.
+        
+        Returns:
+            (name, closed) pairs of the names with events (possibly empty),
+            closed being True if the last one was a close after writing;
+            None if events were lost
+        
+        Raises:
+            OSError: If the watched folder was deleted or moved away
+        """
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        
+        names = {}
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                raise OSError(errno.ENOENT, "the watched folder was removed or moved")
+            if name:
+                names[os.fsdecode(name)] = bool(mask & IN_CLOSE_WRITE)
+        return list(names.items())
+    
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class PollWatcher:
+    """
+    Fallback for InotifyWatcher: checks the folder's mtime every interval
+    and lists (and stats) its entries only when the mtime changed, i.e. an
+    entry was added, removed or renamed. Names reported at the last check
+    are stat'ed again, so a file that is still being written keeps being
+    reported until it stops changing.
+    """
+    
+    method = 'poll'
+    
+    def __init__(self, path, interval: float = WATCH_POLL_SECONDS):
+        self.path = os.fspath(path)
+        self.interval = interval
+        self._mtime_ns = None
+        self._seen = {}  # name -> (size, mtime_ns)
+        self._settling = set()  # names reported at the last check
+        self._check()
+        self._settling.clear()
+    
+    def _state(self, name: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(os.path.join(self.path, name), follow_symlinks=False)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+    
+    def _check(self) -> List[str]:
+        """Names that are new or changed since the last check."""
+        st = os.stat(self.path)
+        if st.st_mtime_ns != self._mtime_ns:
+            self._mtime_ns = st.st_mtime_ns
+            with os.scandir(self.path) as it:
+                names = [entry.name for entry in it]
+            self._seen = {name: self._seen.get(name) for name in names}
+            candidates = self._seen
+        else:
+            candidates = self._settling
+        
+        changed = []
+        for name in candidates:
+            if name not in self._seen:
+                continue
+            state = self._state(name)
+            if state is not None and state != self._seen[name]:
+                self._seen[name] = state
+                changed.append(name)
+        self._settling = set(changed)
+        return changed
+    
+    def wait(self, timeout: Optional[float]) -> Optional[List[Tuple[str, bool]]]:
+        """
+        Sleep up to timeout seconds (at most one interval), then check.
+        
+        Returns:
+            (name, False) pairs of the names that are new or changed
+            (possibly empty); polling cannot tell when a writer is done
+        """
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        return [(name, False) for name in self._check()]
+    
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(path, method: str = 'auto', poll_interval: float = WATCH_POLL_SECONDS):
+    """
+    Watcher for a folder: InotifyWatcher, or PollWatcher where inotify is
+    not available (method 'auto') or not wanted (method 'poll').
+    """
+    if method not in ('auto', 'inotify', 'poll'):
+        raise ValueError(f"method must be 'auto', 'inotify' or 'poll', not {method!r}")
+    if method != 'poll':
+        try:
+            return InotifyWatcher(path)
+        except OSError as e:
+            if method == 'inotify':
+                raise
+            logging.info(f"inotify not available ({e}); polling every {poll_interval:g}s")
+    return PollWatcher(path, poll_interval)
+
+
+# ============================================
+# PROFILING
+# ============================================
+
+# Functions / allocation sites listed per phase in the profile report
+PROFILE_TOP = 15
+
+
+class PhaseProfiler:
+    """
+    cProfile (and optionally tracemalloc) per phase of a run.
+    
+    cProfile only sees the thread that enabled it, so every thread that
+    enters a phase gets its own profiler, and the profilers of a phase are
+    merged when the run ends: <directory>/<phase>.pstats can be opened with
+    pstats or snakeviz. Nested phases in one thread count towards the outer
+    one. With memory=True, a tracemalloc snapshot is taken at the end of
+    each phase and compared to the previous one, so allocations a phase
+    keeps alive (e.g. the match lists of a large directory) show up by
+    source line; the snapshots are saved as <directory>/<phase>.tracemalloc.
+    """
+    
+    def __init__(self, directory: str, memory: bool = False, top: int = PROFILE_TOP):
+        self.directory = directory
+        self.memory = memory
+        self.top = max(1, int(top))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = {}  # phase -> cProfile.Profile of every thread
+        self._memory = []  # (phase, traced bytes, peak bytes, growth lines)
+        self._snapshot = None
+    
+    def start(self) -> None:
+        """Create the output directory and start tracing allocations."""
+        os.makedirs(self.directory, exist_ok=True)
+        if self.memory:
+            tracemalloc.start()
+            self._snapshot = self._take_snapshot()
+    
+    @contextmanager
+    def phase(self, name: str, snapshot: bool = True):
+        """
+        Profile the calling thread for the with-block.
+        
+        Args:
+            name: Phase the time is counted towards
+            snapshot: Take a tracemalloc snapshot when the block ends (off
+                for blocks entered once per item)
+        """
+        if getattr(self._local, 'active', False):
+            yield
+            return
+        profiles = getattr(self._local, 'profiles', None)
+        if profiles is None:
+            profiles = self._local.profiles = {}
+        profile = profiles.get(name)
+        if profile is None:
+            profile = profiles[name] = cProfile.Profile()
+            with self._lock:
+                self._profiles.setdefault(name, []).append(profile)
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active (Python 3.12+ allows one per process)
+            profile = None
+        self._local.active = True
+        try:
+            yield
+        finally:
+            self._local.active = False
+            if profile is not None:
+                profile.disable()
+            if snapshot:
+                self.snapshot(name)
+    
+    def snapshot(self, name: str) -> None:
+        """Record the allocations made since the previous snapshot under name."""
+        if not self.memory or not tracemalloc.is_tracing():
+            return
+        with self._lock:
+            current = self._take_snapshot()
+            growth = [stat for stat in current.compare_to(self._snapshot, 'lineno') if stat.size_diff > 0]
+            traced, peak = tracemalloc.get_traced_memory()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self._memory.append((name, traced, peak, growth[:self.top]))
+            current.dump(os.path.join(self.directory, f"{name}.tracemalloc"))
+            self._snapshot = current
+    
+    @staticmethod
+    def _take_snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+    
+    def finish(self) -> List[str]:
+        """
+        Stop tracing, write one .pstats file per phase and describe the
+        hottest functions (by own time) and the biggest allocation growth.
+        
+        Returns:
+            Report lines
+        """
+        lines = []
+        for name, profiles in self._profiles.items():
+            stats = None
+            for profile in profiles:
+                try:
+                    if stats is None:
+                        stats = pstats.Stats(profile)
+                    else:
+                        stats.add(profile)
+                except TypeError:
+                    pass  # enabled but nothing recorded
+            if stats is None:
+                continue
+            path = os.path.join(self.directory, f"{name}.pstats")
+            stats.dump_stats(path)
+            rows = sorted(stats.stats.items(), key=lambda row: row[1][2], reverse=True)
+            lines.append(f"{name}: {stats.total_tt:.3f}s profiled, {len(profiles)} thread(s) ({path})")
+            lines.append(f"  {'own s':>8} {'cum s':>8} {'calls':>9}  function")
+            for (filename, line, function), (primitive, calls, own, cumulative, callers) in rows[:self.top]:
+                where = f"{os.path.basename(filename)}:{line}" if line else filename
+                lines.append(f"  {own:8.3f} {cumulative:8.3f} {calls:9d}  {function} ({where})")
+        
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        for name, traced, peak, growth in self._memory:
+            lines.append(f"{name} memory: {traced / BYTES_PER_MB:.2f} MB traced after, "
+                         f"{peak / BYTES_PER_MB:.2f} MB peak")
+            for stat in growth:
+                frame = stat.traceback[0]
+                lines.append(f"  {stat.size_diff / 1024:+10.1f} KB {stat.count_diff:+8d} blocks  "
+                             f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        self._memory = []
+        return lines
+
+
+# ============================================
+# CORE FUNCTIONALITY
+# ============================================
+
+class FileOrganizer:
+    """
+    A flexible file and folder organizer that sorts based on multiple criteria.
+    
+    Features:
+    - Pattern-based file matching (filename, type, size)
+    - Folder migration (single or multiple folders)
+    - SQL-like filtering with AND conditions
+    - Safe file/folder operations with error handling
+    - Dry-run mode for previewing changes
+    - Detailed logging and statistics
+    - Support for copy or move operations
+    """
+    
+    def __init__(self, source: str, destination: str, pattern: dict = None, 
+                 folders_to_migrate: dict = None, copy_mode: bool = False, 
+                 dry_run: bool = False, workers: int = 1, scan_workers: int = 1,
+                 scan_mode: str = 'thread', stream: bool = False, recursive: bool = False,
+                 max_depth: int = None, exclude: list = None, keep_structure: bool = False,
+                 copy_threads: int = 4, index: str = None, folder_cache=None,
+                 journal: str = None, resume: bool = False, verify: str = None,
+                 manifest: str = None, dedup: str = None, strict: bool = False,
+                 log_items: str = 'all', log_sample: int = 100, op_log: str = None,
+                 profile: str = None, profile_memory: bool = False, profile_top: int = PROFILE_TOP,
+                 plan: str = None, apply: str = None, destination_template: str = None,
+                 large_file_mb: float = None, buffer_size: int = COPY_BUFSIZE, reuse_buffers: bool = True,
+                 throttle: Throttle = None):
+        """
+        Initialize the FileOrganizer.
+        
+        Args:
+            source: Source directory path
+            destination: Destination directory path
+            pattern: Dictionary with filtering criteria (for files):
+                - name_pattern (str/list): Pattern(s) in filename
+                - file_type (str/list): File extension(s)
+                - min_size_mb (float): Minimum file size in MB
+                - max_size_mb (float): Maximum file size in MB
+                Set to None to disable file migration
+            folders_to_migrate: Dictionary with filtering criteria (for folders):
+                - name_pattern (str/list): Pattern(s) in folder name
+                - file_type (str/list): File type(s) that folder must contain
+                - min_size_mb (float): Minimum folder size in MB
+                - max_size_mb (float): Maximum folder size in MB
+                Set to None to disable folder migration
+            copy_mode: If True, copy files/folders instead of moving them
+            dry_run: If True, only preview operations without executing
+            workers: Number of threads transferring files/folders in parallel
+                (1 = sequential)
+            scan_workers: Number of workers evaluating folder criteria in
+                parallel (1 = sequential)
+            scan_mode: 'thread' or 'process' pool for scan_workers > 1
+            stream: If True, transfer matches while the source is still being
+                scanned instead of building the full match lists first
+            recursive: If True, walk the whole source tree instead of only its
+                direct children (matched folders are migrated as a whole and
+                not descended into)
+            max_depth: Maximum number of levels below source to descend into
+                in recursive mode (None = unlimited, 0 = direct children only)
+            exclude: Glob pattern(s) of file/folder names to skip (e.g.
+                ".git", "*.tmp"); excluded folders are not descended into
+            keep_structure: In recursive mode, recreate each item's relative
+                directory under destination instead of flattening
+            copy_threads: Threads used by one cross-device move (chunks of a
+                large file, or the files of a folder)
+            index: Path of a sqlite3 scan index; directories whose mtime is
+                unchanged since the last run are listed from it (None = off)
+            folder_cache: FolderCache, or path of its sqlite3 file, used for
+                folder size/type criteria (None = off)
+            journal: Path of a write-ahead journal recording every planned and
+                completed operation (None = off; ignored in dry-run mode)
+            resume: If True, continue the interrupted run recorded in journal
+            verify: Verify every copied file: 'full' (checksums) or 'fast'
+                (size and mtime); None = off
+            manifest: Path of a file the checksums of verified copies are
+                appended to, in b2sum format (only with verify='full');
+                dedup reuses the checksums it holds for destination files
+                that have not changed since
+            dedup: What to do with files whose content is already at the
+                destination (or earlier in this run): 'skip', 'hardlink' or
+                'report'; None = off (only names are compared)
+            strict: If True, look each destination name up on disk before
+                the item is transferred, for destinations other programs
+                write to during the run (the name index alone only knows
+                this run; items are never put over an existing name either
+                way, but without this the transfer is done first)
+            log_items: Per-item INFO lines: 'all', 'sample' (one in
+                log_sample) or 'none' (summary only); warnings and errors
+                are always logged
+            log_sample: Sampling interval for log_items='sample'
+            op_log: Path of a JSON-lines operation log (None = off)
+            profile: Directory for per-phase cProfile output (None = off)
+            profile_memory: With profile, also take tracemalloc snapshots
+                at the end of each phase
+            profile_top: Functions / allocation sites reported per phase
+            plan: Path of a plan file to write every matched operation to,
+                with its size/mtime; implies dry_run (None = off)
+            apply: Path of a plan file to execute instead of scanning the
+                source; items changed since planning are skipped (None = off)
+            destination_template: Sub-folder of destination each item goes
+                into, e.g. "{ext}/{mtime:%Y}/{mtime:%m}" (see TEMPLATE_FIELDS;
+                None = directly into destination)
+            large_file_mb: Files of at least this many MB are copied without
+                filling the page cache (see CopyEngine; None = off)
+            buffer_size: Buffer size in bytes of read/write copy loops
+            reuse_buffers: Reuse one copy buffer per thread
+            throttle: Throttle limiting bytes and items per second; may be
+                shared with other organizers (None = full speed)
+        """
+        self.source = Path(source)
+        self.destination = Path(destination)
+        
+        # Handle pattern - can be None, dict, or string (for backward compatibility)
+        if pattern is None:
+            self.pattern = None
+        elif isinstance(pattern, dict):
+            self.pattern = pattern
+        elif isinstance(pattern, str):
+            self.pattern = {"name_pattern": pattern}
+        else:
+            self.pattern = None
+        
+        self.copy_mode = copy_mode
+        self.dry_run = dry_run or bool(plan)
+        if plan and apply:
+            raise ValueError("plan and apply cannot be used together")
+        self.plan_path = plan
+        self.plan = None  # OperationPlan being written
+        self.apply_path = apply
+        self.workers = max(1, int(workers))
+        self.scan_workers = max(1, int(scan_workers))
+        if scan_mode not in ('thread', 'process'):
+            raise ValueError(f"scan_mode must be 'thread' or 'process', not {scan_mode!r}")
+        self.scan_mode = scan_mode
+        self.stream = stream
+        self.recursive = recursive
+        self.max_depth = max_depth
+        self.keep_structure = keep_structure
+        self.copy_threads = max(1, int(copy_threads))
+        self.index = ScanIndex(index) if index else None
+        self.journal_path = journal
+        self.resume = resume
+        self.journal = None
+        if verify not in (None, 'full', 'fast'):
+            raise ValueError(f"verify must be 'full' or 'fast', not {verify!r}")
+        self.verify = verify
+        self.manifest_path = manifest if verify == 'full' else None
+        self.manifest_digests = manifest  # read by dedup, see read_manifest
+        self._manifest = None
+        self.manifest_relative = True  # names relative to destination (False: absolute)
+        self._digests = {}  # in-progress copy path -> digest, written once in place
+        if dedup not in (None, 'skip', 'hardlink', 'report'):
+            raise ValueError(f"dedup must be 'skip', 'hardlink' or 'report', not {dedup!r}")
+        self.dedup = dedup
+        self.duplicates = None  # DuplicateIndex, built when the run starts
+        self._duplicate_tasks = []
+        self._journal_skip = frozenset()
+        self._resuming = False
+        if folder_cache is None or isinstance(folder_cache, FolderCache):
+            self.folder_cache = folder_cache
+        else:
+            self.folder_cache = FolderCache(folder_cache)
+        self.exclude = _as_list(exclude)
+        self._exclude_match = (re.compile("|".join(fnmatch.translate(p) for p in self.exclude)).match
+                               if self.exclude else None)
+        self._destination_abs = os.path.abspath(self.destination)
+        self.template = DestinationTemplate(destination_template) if destination_template else None
+        
+        # Handle folders_to_migrate - should be a dict or None
+        if folders_to_migrate is None:
+            self.folders_to_migrate = None
+        elif isinstance(folders_to_migrate, dict):
+            self.folders_to_migrate = folders_to_migrate
+        else:
+            # For backward compatibility, if it's a string or list, convert to dict
+            if isinstance(folders_to_migrate, str):
+                self.folders_to_migrate = {"name_pattern": folders_to_migrate}
+            elif isinstance(folders_to_migrate, list):
+                self.folders_to_migrate = {"name_pattern": folders_to_migrate}
+            else:
+                self.folders_to_migrate = None
+        
+        # Compile the filter dicts once; matching is then a few set/tuple lookups
+        self.file_matcher = RuleMatcher(self.pattern) if self.pattern is not None else None
+        self.folder_matcher = (RuleMatcher(self.folders_to_migrate)
+                               if self.folders_to_migrate is not None else None)
+        
+        self.stats = {
+            'matched': 0,
+            'processed': 0,
+            'skipped': 0,
+            'errors': 0,
+            'folders_matched': 0,
+            'folders_migrated': 0,
+            'moves_renamed': 0,
+            'moves_copied': 0,
+            'resumed': 0,
+            'verified': 0,
+            'duplicates': 0,
+            'bytes_saved': 0,
+            'stale': 0
+        }
+        
+        # FolderProfile of each matched folder whose contents were walked
+        self.folder_profiles = {}
+        
+        # Shared state for parallel transfers: stats counters and the names
+        # in each destination folder (listed once, then kept up to date as
+        # operations claim names, instead of a stat per item)
+        self._lock = threading.Lock()
+        self._destination_names = {}
+        self.strict = strict
+        self._casefold = None  # destination names compared case-insensitively, probed on first claim
+        
+        # Destination folders known to exist: each is created (one makedirs)
+        # the first time an item goes into it, then it is a set lookup
+        self._made_dirs = set()
+        self.dirs_made = 0
+        if log_items not in ('all', 'sample', 'none'):
+            raise ValueError(f"log_items must be 'all', 'sample' or 'none', not {log_items!r}")
+        self.log_items = log_items
+        self.log_sample = max(1, int(log_sample))
+        self._item_counter = count()
+        self.op_log_path = op_log
+        self.op_log = None
+        self._log_buffer = threading.local()
+        
+        # Copies (files, folder trees, cross-device moves) go through here
+        self.copier = CopyEngine(
+            large_file_threshold=int(large_file_mb * BYTES_PER_MB) if large_file_mb is not None else None,
+            buffer_size=buffer_size, reuse_buffers=reuse_buffers)
+        self.throttle = throttle
+        self.copier.throttle = throttle
+        self._copy_function = self._verified_copy if verify else self.copier.copy
+        
+        # Device of the destination and of source folders, for choosing
+        # between rename and copy+delete; verified sources awaiting deletion
+        self._destination_dev = None
+        self._devices = {}
+        self._pending_deletes = []
+        
+        # Seconds from the start of organize() to the first transfer
+        self._started = None
+        self.first_transfer_after = None
+        
+        # Wall time per phase (validate, scan, folder_scan, file_scan, transfer,
+        # resume) and the duration of every transfer operation, for the
+        # summary/report
+        self.phase_seconds = {}
+        self._latencies = array('d')
+        self.profiler = PhaseProfiler(profile, profile_memory, profile_top) if profile else None
+    
+    def validate_paths(self) -> bool:
+        """
+        Validate source and destination paths.
+        
+        Returns:
+            True if paths are valid, False otherwise
+        """
+        if not self.source.exists():
+            logging.error(f"Source directory does not exist: {self.source}")
+            return False
+        
+        if not self.source.is_dir():
+            logging.error(f"Source path is not a directory: {self.source}")
+            return False
+        
+        return True
+    
+    def matches_pattern(self, file_path) -> bool:
+        """
+        Check if a file matches the pattern criteria.
+        
+        Pattern matching supports:
+        - ^pattern = Starts with
+        - pattern$ = Ends with
+        - *pattern* = Contains anywhere
+        - pattern = Ends with (default)
+        
+        Multiple values within name_pattern or file_type use OR logic.
+        Different criteria (name, type, size) use AND logic.
+        
+        Args:
+            file_path: Path or os.DirEntry of the file to check (a DirEntry
+                reuses its cached stat result for the size check)
+            
+        Returns:
+            True if file matches ALL specified criteria, False otherwise
+        """
+        matcher = self.file_matcher
+        name, ext = os.path.splitext(file_path.name)
+        
+        # Cheapest checks first: extension set lookup, then name patterns
+        if not matcher.match_type(ext):
+            return False
+        
+        if not matcher.match_name(name):
+            return False
+        
+        # Check file size constraints (only stat when a bound is set)
+        if matcher.needs_size:
+            try:
+                if not matcher.match_size(file_path.stat().st_size):
+                    return False
+            except OSError as e:
+                logging.warning(f"Could not get size for {file_path.name}: {e}")
+                return False
+        
+        # All criteria matched
+        return True
+    
+    def matches_folder_pattern(self, folder_path) -> bool:
+        """
+        Check if a folder matches the folder pattern criteria.
+        
+        Pattern matching supports:
+        - ^pattern = Starts with
+        - pattern$ = Ends with
+        - *pattern* = Contains anywhere
+        - pattern = Exact match or ends with (default)
+        
+        Multiple values within name_pattern or file_type use OR logic.
+        Different criteria (name, type, size) use AND logic.
+        
+        Args:
+            folder_path: Path or os.DirEntry of the folder to check
+            
+        Returns:
+            True if folder matches ALL specified criteria, False otherwise
+        """
+        return self._evaluate_folder(folder_path)[0]
+    
+    def _evaluate_folder(self, folder_path) -> Tuple[bool, Optional[FolderProfile]]:
+        """
+        Match a folder against the folder rule, profiling its contents once.
+        
+        Returns:
+            Tuple (matched, profile); profile is None if the rule only
+            filters by name and the folder tree did not need to be walked
+        """
+        folder_name = folder_path.name
+        matcher = self.folder_matcher
         
         # Check name pattern (if specified)
-        name_pattern = self.folders_to_migrate.get("name_pattern")
-        if name_pattern is not None:
-            # Convert single pattern to list for uniform processing
-            patterns = [name_pattern] if isinstance(name_pattern, str) else name_pattern
-            
-            # Check if ANY pattern matches (OR logic)
-            pattern_matched = False
-            for pattern in patterns:
-                if pattern.startswith("^") and pattern.endswith("$"):
-                    # Exact match: ^pattern$
-                    if folder_name == pattern[1:-1]:
-                        pattern_matched = True
-                        break
-                elif pattern.startswith("^"):
-                    # Pattern at start of folder name
-                    if folder_name.startswith(pattern[1:]):
-                        pattern_matched = True
-                        break
-                elif pattern.endswith("$"):
-                    # Pattern at end of folder name
-                    if folder_name.endswith(pattern[:-1]):
-                        pattern_matched = True
-                        break
-                elif pattern.startswith("*") and pattern.endswith("*"):
-                    # Pattern anywhere in folder name
-                    if pattern[1:-1] in folder_name:
-                        pattern_matched = True
-                        break
-                else:
-                    # Default: Exact match or ends with pattern
-                    if folder_name == pattern or folder_name.endswith(pattern):
-                        pattern_matched = True
-                        break
+        if not matcher.match_name(folder_name):
+            return False, None
+        
+        # Name-only rules never need to look inside the folder
+        if matcher.types is None and not matcher.needs_size:
+            return True, None
+        
+        # Single walk for file types and folder size (or a cached summary)
+        if self.folder_cache is not None:
+            profile = profile_from_summary(self.folder_cache.summarize(folder_path), matcher)
+        else:
+            profile = profile_folder(folder_path, matcher)
+        return self._profile_matches(folder_name, profile), profile
+    
+    def _evaluate_folder_tree(self, entry, tree: Optional[FolderTree]
+                              ) -> Tuple[bool, Optional[FolderProfile], Optional[FolderTree]]:
+        """
+        _evaluate_folder for the recursive walk, where a folder that does not
+        match is descended into and its subfolders are evaluated in turn.
+        
+        The first folder whose contents are needed is summarized bottom-up
+        with summarize_tree, and the summaries of its subfolders are handed
+        down the walk, so each subtree is walked once instead of once per
+        level above it.
+        
+        Args:
+            entry: DirEntry of the folder
+            tree: Its FolderTree from the walk of a parent folder, if any
+        
+        Returns:
+            Tuple (matched, profile, tree); tree holds the summaries of the
+            folder's subfolders for the walk to descend with (None if there
+            are none yet)
+        """
+        matcher = self.folder_matcher
+        if not matcher.match_name(entry.name):
+            return False, None, tree
+        if matcher.types is None and not matcher.needs_size:
+            return True, None, None
+        
+        if tree is not None:
+            summary = tree.summary
+        else:
+            summary = self.folder_cache.get(entry.path) if self.folder_cache is not None else None
+            if summary is None:
+                tree = summarize_tree(entry)
+                summary = tree.summary
+                if self.folder_cache is not None:
+                    self.folder_cache.record(entry.path, summary)
+        
+        profile = profile_from_summary(summary, matcher)
+        return self._profile_matches(entry.name, profile), profile, tree
+    
+    def _profile_matches(self, folder_name: str, profile: FolderProfile) -> bool:
+        """Check a folder's profile against the type and size criteria."""
+        if profile.errors:
+            logging.debug(f"Could not scan {profile.errors} subfolder(s) of {folder_name}")
+        
+        if not profile.has_type:
+            return False
+        
+        matcher = self.folder_matcher
+        if matcher.needs_size and not matcher.match_size(profile.size_bytes):
+            return False
+        
+        # All criteria matched
+        return True
+    
+    def scan_source(self) -> List[os.DirEntry]:
+        """
+        List the source directory once with os.scandir.
+        
+        The returned DirEntry objects carry the file type from the directory
+        listing (d_type) and cache their stat() result, so the file and folder
+        pipelines can share one listing without extra syscalls per entry.
+        
+        Returns:
+            List of DirEntry objects for the direct children of source
+        """
+        try:
+            if self.index is not None:
+                return self.index.list_dir(self.source)
+            with os.scandir(self.source) as it:
+                return list(it)
+        except PermissionError as e:
+            logging.error(f"Permission denied accessing source directory: {e}")
+            return []
+    
+    def iter_source(self):
+        """
+        Lazily iterate over the source directory with os.scandir.
+        
+        Unlike scan_source(), entries are yielded as the directory is read, so
+        memory stays flat no matter how many entries the source holds.
+        
+        Yields:
+            DirEntry objects for the direct children of source
+        """
+        if self.index is not None:
+            yield from self.scan_source()
+            return
+        
+        try:
+            it = os.scandir(self.source)
+        except PermissionError as e:
+            logging.error(f"Permission denied accessing source directory: {e}")
+            return
+        
+        with it:
+            yield from it
+    
+    def _iter_subdir(self, path: str):
+        """Lazily iterate over a subfolder during a recursive walk."""
+        try:
+            it = self.index.list_dir(path) if self.index is not None else os.scandir(path)
+        except OSError as e:
+            logging.warning(f"Could not scan folder {path}: {e}")
+            return
+        
+        if self.index is not None:
+            yield from it
+            return
+        
+        with it:
+            yield from it
+    
+    def is_excluded(self, name: str) -> bool:
+        """Check a file/folder name against the exclude patterns."""
+        return self._exclude_match is not None and self._exclude_match(name) is not None
+    
+    def get_matching_files(self, entries: Optional[List[os.DirEntry]] = None) -> List[Tuple[Path, str]]:
+        """
+        Find all files matching the pattern criteria.
+        
+        Args:
+            entries: Source listing from scan_source() (scanned here if None)
+        
+        Returns:
+            List of tuples (source_path, filename)
+        """
+        matching_files = []
+        
+        if entries is None:
+            entries = self.scan_source()
+        
+        for entry in entries:
+            try:
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            
+            if self.is_excluded(entry.name):
+                continue
+            
+            if self.matches_pattern(entry):
+                self._count('matched')
+                name = self._destination_name(entry, entry.name)
+                if name is not None:
+                    matching_files.append((Path(entry.path), name))
+        
+        return matching_files
+    
+    def _count(self, key: str, amount: int = 1) -> None:
+        """Thread-safe increment of a stats counter."""
+        with self._lock:
+            self.stats[key] += amount
+    
+    def _log(self, level: int, message: str) -> None:
+        """
+        Log a message, or buffer it when running inside a transfer worker.
+        
+        Buffered messages are emitted by the main thread in submission order,
+        so the output of parallel transfers is never interleaved.
+        """
+        buffer = getattr(self._log_buffer, 'records', None)
+        if buffer is None:
+            logging.log(level, message)
+        else:
+            buffer.append((level, message))
+    
+    def _outcome(self, level: int, op: str, source: Path, destination: Path, message: str) -> None:
+        """
+        Report the outcome of one operation: a log line (per-item INFO lines
+        follow log_items) and a record in the operation log.
+        """
+        if self.op_log is not None:
+            self.op_log.record(op, source, destination)
+        if level == logging.INFO:
+            if self.log_items == 'none':
+                return
+            if self.log_items == 'sample' and next(self._item_counter) % self.log_sample:
+                return
+        self._log(level, message)
+    
+    def _claim_destination(self, destination_path: Path) -> bool:
+        """
+        Reserve a destination path for one operation.
+        
+        Each destination folder is listed with one scandir the first time a
+        name in it is claimed; after that the check is a set lookup. The
+        check and the reservation happen under the same lock, so two workers
+        racing on the same name cannot both pass it. On a case-insensitive
+        destination (probed once) names are compared casefolded. In strict
+        mode a name missing from the listing is also looked up on disk.
+        
+        Returns:
+            True if the path was free and is now claimed, False otherwise
+        """
+        folder = os.fspath(destination_path.parent)
+        with self._lock:
+            if self._casefold is None:
+                self._casefold = probe_case_insensitive(self.destination, write=not self.dry_run)
+            key = self._name_key
+            names = self._destination_names.get(folder)
+            if names is None:
+                try:
+                    with os.scandir(folder) as it:
+                        names = {key(entry.name) for entry in it}
+                except (FileNotFoundError, NotADirectoryError):
+                    names = set()
+                self._destination_names[folder] = names
+                # The folder is created for this item: its name is taken too
+                child, parent = folder, os.path.dirname(folder)
+                while parent in self._destination_names and parent != child:
+                    self._destination_names[parent].add(key(os.path.basename(child)))
+                    child, parent = parent, os.path.dirname(parent)
+            name = key(destination_path.name)
+            if name in names or (self.strict and os.path.lexists(destination_path)):
+                return False
+            names.add(name)
+            return True
+    
+    def _name_key(self, name: str) -> str:
+        """Destination name as compared by the destination filesystem."""
+        return name.casefold() if self._casefold else name
+    
+    def _make_parent(self, destination_path: Path) -> None:
+        """
+        Create the folder destination_path goes into, once per run: later
+        items going into it (or into a folder below it) skip the syscalls.
+        """
+        folder = os.fspath(destination_path.parent)
+        if folder in self._made_dirs:
+            return
+        os.makedirs(folder, exist_ok=True)
+        with self._lock:
+            self.dirs_made += 1
+            # Its parents exist too, up to the destination itself
+            while folder not in self._made_dirs:
+                self._made_dirs.add(folder)
+                if folder == self._destination_abs or folder == os.fspath(self.destination):
+                    break
+                parent = os.path.dirname(folder)
+                if parent == folder:
+                    break
+                folder = parent
+    
+    def _destination_name(self, entry, name: str, rel_dir: str = "") -> Optional[str]:
+        """
+        Name (path relative to destination) of a matched item: name itself,
+        or inside the sub-folder given by the destination template.
+        
+        Returns:
+            The name, or None if the template could not be filled in
+        """
+        if self.template is None:
+            return name
+        try:
+            folder = self.template.render(entry, rel_dir)
+            return name if folder == os.curdir else os.path.join(folder, name)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not fill in destination template for {entry.name}: {e}")
+            self._count('errors')
+            return None
+    
+    def _release_destination(self, destination_path: Path) -> None:
+        """
+        Give a claimed name back after its operation failed.
+        
+        Names of items that were put in place (or would be, in a dry run)
+        stay claimed, so the index matches the destination.
+        """
+        with self._lock:
+            names = self._destination_names.get(os.fspath(destination_path.parent))
+            if names is not None:
+                names.discard(self._name_key(destination_path.name))
+    
+    def _commit(self, source, destination, is_dir: bool = False) -> None:
+        """
+        Rename an item to its final destination path, never over an existing
+        one: files are hard-linked into place, which fails atomically if the
+        name exists, and folders (and files on filesystems without hard
+        links) are checked right before the rename.
+        
+        Raises:
+            FileExistsError: If the name was taken meanwhile
+        """
+        if not is_dir:
+            try:
+                os.link(source, destination, follow_symlinks=False)
+                os.unlink(source)
+                return
+            except FileExistsError:
+                # Linked by an interrupted run that did not get to the unlink
+                if not os.path.samestat(os.lstat(source), os.lstat(destination)):
+                    raise
+                os.unlink(source)
+                return
+            except OSError as e:
+                # Across devices is for the caller; no link support: check
+                if e.errno == errno.EXDEV:
+                    raise
+        if os.path.lexists(destination):
+            raise FileExistsError(errno.EEXIST, "Created at destination during the run", os.fspath(destination))
+        os.rename(source, destination)
+    
+    def process_file(self, source_path: Path, filename: str) -> bool:
+        """
+        Process a single file (copy or move).
+        
+        Args:
+            source_path: Full path to source file
+            filename: Name of the file
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        destination_path = self.destination / filename
+        
+        # Check if destination file already exists (or is taken by another worker)
+        if not self._claim_destination(destination_path):
+            detail = " (different content)" if self.dedup else ""
+            self._outcome(logging.WARNING, 'skip', source_path, destination_path,
+                          f"File already exists at destination: {filename}{detail}")
+            self._count('skipped')
+            self._journal_done(source_path, 'skipped')
+            return False
+        
+        landed = False
+        try:
+            if self.dry_run:
+                action = "COPY" if self.copy_mode else "MOVE"
+                self._outcome(logging.INFO, 'plan', source_path, destination_path,
+                              f"[DRY RUN] Would {action}: {filename}")
+                self._count('processed')
+                landed = True
+                return True
+            
+            # Create destination directory if it doesn't exist
+            self._make_parent(destination_path)
+            
+            # Perform copy or move operation
+            if self.copy_mode:
+                # Copy under a temporary name so an interrupted copy is never
+                # mistaken for a complete one
+                partial = self._make_temp(source_path, destination_path, is_dir=False)
+                try:
+                    self._copy_function(source_path, partial)
+                    self._commit(partial, destination_path)
+                    self._commit_digests(partial, destination_path)
+                except BaseException:
+                    self._commit_digests(partial, None)
+                    _remove_quietly(partial, is_dir=False)
+                    raise
+                how = 'copy'
+                self._outcome(logging.INFO, 'copy', source_path, destination_path, f"Copied: {filename}")
+            else:
+                how = self._move(source_path, destination_path)
+                self._outcome(logging.INFO, 'move', source_path, destination_path,
+                              f"Moved: {filename}{'' if how == 'rename' else ' (across devices)'}")
+            landed = True
+            
+            if self.index is not None:
+                self.index.record_transfer(source_path, destination_path, False, not self.copy_mode)
+            
+            # Cross-device moves are complete once their source is deleted
+            if self.copy_mode or how == 'rename':
+                self._journal_done(source_path, 'ok')
+            
+            self._count('processed')
+            return True
+        
+        except FileExistsError:
+            self._outcome(logging.WARNING, 'skip', source_path, destination_path,
+                          f"File already exists at destination: {filename} (created during the run)")
+            self._count('skipped')
+            self._journal_done(source_path, 'skipped')
+            return False
+        
+        except Exception as e:
+            self._outcome(logging.ERROR, 'error', source_path, destination_path,
+                          f"Error processing {filename}: {e}")
+            self._count('errors')
+            self._journal_done(source_path, 'error')
+            return False
+        
+        finally:
+            if not landed:
+                self._release_destination(destination_path)
+    
+    def process_duplicate(self, source_path: Path, filename: str, original: DedupEntry, size: int) -> bool:
+        """
+        Skip or hardlink a file whose content is already at the destination.
+        
+        Runs after the regular transfers, so originals from this run are in
+        place. If an original did not make it there (or cannot be linked),
+        the file is transferred normally instead.
+        
+        Args:
+            source_path: Full path to source file
+            filename: Name of the file at the destination
+            original: The file with the same content
+            size: Size of the file in bytes
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        destination_path = self.destination / filename
+        target = original.paths[-1]
+        shown = os.path.relpath(target, self.destination)
+        
+        if not self.dry_run and original.mtime_ns is not None:
+            try:
+                st = os.stat(target)
+                in_place = (st.st_size, st.st_mtime_ns) == (size, original.mtime_ns)
+            except OSError:
+                in_place = False
+            if not in_place:
+                self._log(logging.WARNING, f"Original of duplicate {filename} is not at the destination; "
+                                           f"transferring it instead")
+                return self.process_file(source_path, filename)
+        
+        if self.dedup == 'skip' or os.fspath(destination_path) == target:
+            prefix = "[DRY RUN] Would skip" if self.dry_run else "Skipped"
+            self._outcome(logging.INFO, 'skip', source_path, target,
+                          f"{prefix} duplicate: {filename} (same content as {shown})")
+            self._count('skipped')
+            self._count('bytes_saved', size)
+            self._journal_done(source_path, 'skipped')
+            return True
+        
+        if not self._claim_destination(destination_path):
+            self._outcome(logging.WARNING, 'skip', source_path, destination_path,
+                          f"File already exists at destination: {filename} (different content)")
+            self._count('skipped')
+            self._journal_done(source_path, 'skipped')
+            return False
+        
+        linked = False
+        try:
+            if self.dry_run:
+                self._outcome(logging.INFO, 'plan', source_path, destination_path,
+                              f"[DRY RUN] Would HARDLINK: {filename} -> {shown}")
+                self._count('processed')
+                self._count('bytes_saved', size)
+                linked = True
+                return True
             
-            if not pattern_matched:
+            self._make_parent(destination_path)
+            os.link(target, destination_path)
+            linked = True
+            if not self.copy_mode:
+                os.unlink(source_path)
+            self._outcome(logging.INFO, 'link', source_path, destination_path,
+                          f"Linked duplicate: {filename} -> {shown}")
+            self._count('processed')
+            self._count('bytes_saved', size)
+            self._journal_done(source_path, 'ok')
+            return True
+        
+        except OSError as e:
+            if linked:
+                self._outcome(logging.ERROR, 'error', source_path, destination_path,
+                              f"Linked {filename} but could not delete source: {e}")
+                self._count('errors')
+                self._journal_done(source_path, 'error')
                 return False
+            # Another filesystem, or no hard link support: transfer it instead
+            self._log(logging.WARNING, f"Could not hardlink {filename} ({e}); transferring it instead")
+        
+        finally:
+            if not linked:
+                self._release_destination(destination_path)
+        
+        return self.process_file(source_path, filename)
+    
+    def get_folders_to_migrate(self, entries: Optional[List[os.DirEntry]] = None) -> List[Tuple[Path, str]]:
+        """
+        Get list of folders to migrate based on folders_to_migrate filters.
+        
+        Args:
+            entries: Source listing from scan_source() (scanned here if None)
         
-        # Check if folder contains specific file types (if specified)
-        file_type = self.folders_to_migrate.get("file_type")
-        if file_type is not None:
-            # Convert single type to list for uniform processing
-            types = [file_type] if isinstance(file_type, str) else file_type
+        Returns:
+            List of tuples (folder_path, folder_name)
+        """
+        folders = []
+        
+        if self.folders_to_migrate is None:
+            return folders
+        
+        if entries is None:
+            entries = self.scan_source()
+        
+        matcher = self.folder_matcher
+        
+        # Name checks are cheap and done here; only the survivors get walked
+        candidates = []
+        for entry in entries:
+            try:
+                if not entry.is_dir():
+                    continue
+            except OSError:
+                continue
             
-            # Ensure all types start with a dot
-            types = ["." + t if not t.startswith(".") else t for t in types]
+            if matcher.match_name(entry.name) and not self.is_excluded(entry.name):
+                candidates.append(entry)
+        
+        profiles = self._profile_folders(candidates)
+        
+        # Check if each folder matches the criteria, in listing order
+        for entry, profile in zip(candidates, profiles):
+            if profile is not None and not self._profile_matches(entry.name, profile):
+                continue
             
-            # Check if folder contains at least one file of the specified type(s)
-            contains_type = False
-            try:
-                for root, dirs, files in os.walk(folder_path):
-                    for file in files:
-                        file_ext = os.path.splitext(file)[1].lower()
-                        if any(file_ext == ftype.lower() for ftype in types):
-                            contains_type = True
-                            break
-                    if contains_type:
-                        break
-            except (PermissionError, OSError) as e:
-                logging.warning(f"Could not scan folder {folder_name}: {e}")
-                return False
+            self._count('folders_matched')
+            name = self._destination_name(entry, entry.name)
+            if name is not None:
+                folders.append((Path(entry.path), name))
+            if profile is not None:
+                self.folder_profiles[entry.name] = profile
+                logging.debug(f"Folder {entry.name}: {describe_profile(profile)}")
+        
+        return folders
+    
+    def _profile_folders(self, candidates: List[os.DirEntry]) -> List[Optional[FolderProfile]]:
+        """
+        Profile candidate folders, in parallel when scan_workers > 1.
+        
+        Executor.map keeps the results in the order of candidates, so the
+        outcome does not depend on which worker finishes first.
+        
+        Returns:
+            One FolderProfile per candidate (None for name-only rules)
+        """
+        matcher = self.folder_matcher
+        if matcher.types is None and not matcher.needs_size:
+            return [None] * len(candidates)
+        
+        paths = [entry.path for entry in candidates]
+        if self.folder_cache is None:
+            return self._map_folders(profile_folder, paths, matcher)
+        
+        # Valid cache entries are checked here; only the rest get walked
+        summaries = [self.folder_cache.get(path) for path in paths]
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        walked = self._map_folders(summarize_folder, [paths[i] for i in missing])
+        for i, summary in zip(missing, walked):
+            self.folder_cache.record(paths[i], summary)
+            summaries[i] = summary
+        
+        return [profile_from_summary(summary, matcher) for summary in summaries]
+    
+    def _map_folders(self, func, paths: List[str], *args) -> list:
+        """Apply a folder walk to each path, in order, on the scan worker pool."""
+        if self.scan_workers <= 1 or len(paths) <= 1:
+            return [func(path, *args) for path in paths]
+        
+        if self.scan_mode == 'process':
+            executor = ProcessPoolExecutor(max_workers=self.scan_workers)
+            chunksize = max(1, len(paths) // (self.scan_workers * 4))
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.scan_workers)
+            chunksize = 1
+        
+        with executor:
+            return list(executor.map(func, paths, *(repeat(arg) for arg in args), chunksize=chunksize))
+    
+    def process_folder(self, source_folder: Path, folder_name: str) -> bool:
+        """
+        Process a single folder (copy or move entire directory tree).
+        
+        Args:
+            source_folder: Full path to source folder
+            folder_name: Name of the folder
             
-            if not contains_type:
-                return False
+        Returns:
+            True if successful, False otherwise
+        """
+        destination_folder = self.destination / folder_name
+        
+        # Check if destination folder already exists (or is taken by another worker)
+        if not self._claim_destination(destination_folder):
+            self._outcome(logging.WARNING, 'skip', source_folder, destination_folder,
+                          f"Folder already exists at destination: {folder_name}")
+            self._count('skipped')
+            self._journal_done(source_folder, 'skipped')
+            return False
         
-        # Check folder size constraints (if specified)
+        landed = False
         try:
-            # Calculate total folder size
-            folder_size_mb = 0
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    try:
-                        file_path = Path(root) / file
-                        folder_size_mb += file_path.stat().st_size / (1024 * 1024)
-                    except (PermissionError, OSError):
-                        continue
+            if self.dry_run:
+                action = "COPY" if self.copy_mode else "MOVE"
+                self._outcome(logging.INFO, 'plan', source_folder, destination_folder,
+                              f"[DRY RUN] Would {action} folder: {folder_name}")
+                self._count('folders_migrated')
+                landed = True
+                return True
             
-            min_size = self.folders_to_migrate.get("min_size_mb")
-            if min_size is not None:
-                if folder_size_mb < min_size:
-                    return False
+            # Create parent destination directory if it doesn't exist
+            self._make_parent(destination_folder)
             
-            max_size = self.folders_to_migrate.get("max_size_mb")
-            if max_size is not None:
-                if folder_size_mb > max_size:
-                    return False
+            # Perform copy or move operation
+            if self.copy_mode:
+                # Copied under a temporary name, renamed into place when complete
+                self._copy_tree_verified(source_folder, destination_folder)
+                how = 'copy'
+                self._outcome(logging.INFO, 'copy', source_folder, destination_folder,
+                              f"Copied folder: {folder_name}")
+            else:
+                how = self._move(source_folder, destination_folder, is_dir=True)
+                self._outcome(logging.INFO, 'move', source_folder, destination_folder,
+                              f"Moved folder: {folder_name}{'' if how == 'rename' else ' (across devices)'}")
+            landed = True
+            
+            if self.index is not None:
+                self.index.record_transfer(source_folder, destination_folder, True, not self.copy_mode)
+            if self.folder_cache is not None and not self.copy_mode:
+                self.folder_cache.forget(source_folder)
+            
+            # Cross-device moves are complete once their source is deleted
+            if self.copy_mode or how == 'rename':
+                self._journal_done(source_folder, 'ok')
+            
+            self._count('folders_migrated')
+            return True
         
-        except (PermissionError, OSError) as e:
-            logging.warning(f"Could not calculate size for folder {folder_name}: {e}")
+        except FileExistsError:
+            self._outcome(logging.WARNING, 'skip', source_folder, destination_folder,
+                          f"Folder already exists at destination: {folder_name} (created during the run)")
+            self._count('skipped')
+            self._journal_done(source_folder, 'skipped')
             return False
         
-        # All criteria matched
-        return True
+        except Exception as e:
+            self._outcome(logging.ERROR, 'error', source_folder, destination_folder,
+                          f"Error processing folder {folder_name}: {e}")
+            self._count('errors')
+            self._journal_done(source_folder, 'error')
+            return False
+        
+        finally:
+            if not landed:
+                self._release_destination(destination_folder)
     
-    def get_matching_files(self) -> List[Tuple[Path, str]]:
+    def _device_of(self, path: Path, is_dir: bool) -> int:
         """
-        Find all files matching the pattern criteria.
+        st_dev of a source item.
+        
+        Files live on the device of their parent folder, which is looked up
+        once per folder; folders are stat'ed themselves (they may be mount
+        points).
+        """
+        if is_dir:
+            return os.stat(path).st_dev
+        parent = os.path.dirname(path)
+        dev = self._devices.get(parent)
+        if dev is None:
+            dev = self._devices[parent] = os.stat(parent).st_dev
+        return dev
+    
+    def _destination_device(self) -> int:
+        """st_dev of the destination (or of its closest existing parent)."""
+        if self._destination_dev is None:
+            path = os.path.abspath(self.destination)
+            while not os.path.exists(path) and os.path.dirname(path) != path:
+                path = os.path.dirname(path)
+            self._destination_dev = os.stat(path).st_dev
+        return self._destination_dev
+    
+    def _move(self, source: Path, destination: Path, is_dir: bool = False) -> str:
+        """
+        Move a file or folder.
+        
+        On the same device this is a single os.rename. Across devices the item
+        is copied to a temporary name in parallel, verified, renamed into
+        place, and the source is queued for a batched delete, so a failure
+        part way never leaves a half-copied item under its final name nor
+        loses the source.
         
         Returns:
-            List of tuples (source_path, filename)
+            'rename' or 'copy'
         """
-        matching_files = []
+        if self._device_of(source, is_dir) == self._destination_device():
+            try:
+                self._commit(source, destination, is_dir)
+                self._count('moves_renamed')
+                return 'rename'
+            except OSError as e:
+                # st_dev can agree across some bind/overlay mounts
+                if e.errno != errno.EXDEV:
+                    raise
         
+        if is_dir:
+            self._copy_tree_verified(source, destination)
+        else:
+            self._copy_file_verified(source, destination)
+        if self.journal is not None:
+            self.journal.copied(source)
+        self._queue_delete(source, is_dir)
+        self._count('moves_copied')
+        return 'copy'
+    
+    def _copy_file_verified(self, source: Path, destination: Path) -> None:
+        """Copy a file across devices and verify it before it gets its final name."""
+        before = os.stat(source)
+        partial = self._make_temp(source, destination, is_dir=False)
         try:
-            for item in self.source.iterdir():
-                if not item.is_file():
-                    continue
+            if self.verify:
+                self._verified_copy(source, partial)
+            else:
+                self.copier.copy_chunked(source, partial, self.copy_threads)
+            
+            after = os.stat(source)
+            if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+                raise OSError(f"Source changed during copy: {source}")
+            if os.stat(partial).st_size != before.st_size:
+                raise OSError(f"Size mismatch after copy: {destination}")
+            
+            self._commit(partial, destination)
+            self._commit_digests(partial, destination)
+        except BaseException:
+            self._commit_digests(partial, None)
+            _remove_quietly(partial, is_dir=False)
+            raise
+    
+    def _make_temp(self, source: Path, destination: Path, is_dir: bool) -> Path:
+        """Temporary file or folder (see make_temp) to copy source into, recorded in the journal."""
+        record = partial(self.journal.temp, source) if self.journal is not None else None
+        return make_temp(destination, is_dir, record)
+    
+    def _copy_tree_verified(self, source: Path, destination: Path) -> None:
+        """
+        Copy a folder tree into a temporary folder next to destination with
+        parallel file copies, verify file count and total size, then rename
+        it into place (folder copies, and moves across devices).
+        
+        Symlinks are recreated as symlinks, like shutil.move does.
+        """
+        partial = self._make_temp(source, destination, is_dir=True)
+        expected_files = expected_bytes = 0
+        
+        def raise_error(error):
+            raise error
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.copy_threads) as pool:
+                copies = []
+                for root, dirs, files in os.walk(source, onerror=raise_error):
+                    target_root = os.path.join(partial, os.path.relpath(root, source))
+                    os.makedirs(target_root, exist_ok=True)
+                    
+                    for name in dirs + files:
+                        src = os.path.join(root, name)
+                        if os.path.islink(src):
+                            os.symlink(os.readlink(src), os.path.join(target_root, name))
+                    
+                    for name in files:
+                        src = os.path.join(root, name)
+                        if os.path.islink(src):
+                            continue
+                        expected_files += 1
+                        expected_bytes += os.stat(src).st_size
+                        copies.append(pool.submit(self._copy_function, src, os.path.join(target_root, name)))
                 
-                if self.matches_pattern(item):
-                    matching_files.append((item, item.name))
-                    self.stats['matched'] += 1
+                for future in copies:
+                    future.result()
+            
+            # Folder timestamps last, since copying files into them changes them
+            for root, dirs, files in os.walk(source, topdown=False):
+                shutil.copystat(root, os.path.join(partial, os.path.relpath(root, source)))
+            
+            copied_files = copied_bytes = 0
+            for root, dirs, files in os.walk(partial):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if not os.path.islink(path):
+                        copied_files += 1
+                        copied_bytes += os.stat(path).st_size
+            if (copied_files, copied_bytes) != (expected_files, expected_bytes):
+                raise OSError(f"Verification failed for {destination}: {copied_files}/{expected_files} "
+                              f"files, {copied_bytes}/{expected_bytes} bytes")
+            
+            self._commit(partial, destination, is_dir=True)
+            self._commit_digests(partial, destination)
+        except BaseException:
+            self._commit_digests(partial, None)
+            _remove_quietly(partial, is_dir=True)
+            raise
+    
+    def _verified_copy(self, src, dst, *, follow_symlinks: bool = True) -> str:
+        """
+        Copy and verify one file (shutil.copy2 signature, for copytree).
         
-        except PermissionError as e:
-            logging.error(f"Permission denied accessing source directory: {e}")
+        The digest is kept until the copy is renamed into place, see
+        _commit_digests.
         
-        return matching_files
+        Returns:
+            dst
+        """
+        if not follow_symlinks and os.path.islink(src):
+            return self.copier.copy(src, dst, follow_symlinks=False)
+        
+        digest = self.copier.copy_verified(src, dst, fast=(self.verify == 'fast'))
+        self._count('verified')
+        if digest is not None and self._manifest is not None:
+            with self._lock:
+                self._digests[os.fspath(dst)] = digest
+        return dst
     
-    def process_file(self, source_path: Path, filename: str) -> bool:
+    def _commit_digests(self, partial: Path, final: Optional[Path]) -> None:
         """
-        Process a single file (copy or move).
+        Write the digests of a copy (file or folder tree) renamed from partial
+        to final into the manifest; final=None discards them.
+        """
+        if self._manifest is None:
+            return
+        prefix = os.fspath(partial)
+        with self._lock:
+            lines = []
+            for path in [p for p in self._digests if p == prefix or p.startswith(prefix + os.sep)]:
+                digest = self._digests.pop(path)
+                if final is not None:
+                    target = os.fspath(final) + path[len(prefix):]
+                    try:
+                        st = os.stat(target)
+                        lines.append(f"# size={st.st_size} mtime_ns={st.st_mtime_ns}\n")
+                    except OSError:
+                        pass
+                    name = os.path.relpath(target, self.destination) if self.manifest_relative else os.path.abspath(target)
+                    lines.append(manifest_line(digest, name))
+            self._manifest.writelines(lines)
+    
+    def _queue_delete(self, source: Path, is_dir: bool) -> None:
+        """Queue the source of a verified cross-device move for deletion."""
+        with self._lock:
+            self._pending_deletes.append((source, is_dir))
+            full = len(self._pending_deletes) >= DELETE_BATCH_SIZE
+        if full:
+            self._flush_deletes()
+    
+    def _flush_deletes(self) -> None:
+        """Delete the queued sources of cross-device moves."""
+        with self._lock:
+            batch, self._pending_deletes = self._pending_deletes, []
+        
+        # The 'copied' records must be on disk before any source disappears
+        if batch and self.journal is not None:
+            self.journal.sync()
+        
+        for source, is_dir in batch:
+            try:
+                if is_dir:
+                    shutil.rmtree(source)
+                else:
+                    os.unlink(source)
+                self._journal_done(source, 'ok')
+            except OSError as e:
+                logging.error(f"Copied to destination but could not delete source {source}: {e}")
+                self._count('errors')
+                self._journal_done(source, 'error')
+    
+    def _plan_operation(self, kind: str, source: Path, name: str, entry=None) -> bool:
+        """
+        Record a matched item as a planned operation, in the journal and/or
+        the plan file being written.
         
         Args:
-            source_path: Full path to source file
-            filename: Name of the file
+            kind: 'file' or 'folder'
+            source: Path of the item
+            name: Name (relative path) at the destination
+            entry: The scan's os.DirEntry (or IndexedEntry) of the item; its
+                stat, cached by the matchers, goes into the plan instead of
+                a new os.stat
+        
+        Returns:
+            False if the item was already planned by the run being resumed
+            (it is handled from the journal and must not be queued again)
+        """
+        if self.plan is not None:
+            try:
+                self.plan.add(kind, source, name, entry.stat() if entry is not None else os.stat(source))
+            except OSError as e:
+                logging.warning(f"Not planned, could not stat {source}: {e}")
+        if self.journal is None:
+            return True
+        if str(source) in self._journal_skip:
+            return False
+        self.journal.plan(kind, source, name)
+        return True
+    
+    def _build_duplicate_index(self) -> None:
+        """Register the files already at the destination for duplicate detection."""
+        known = None
+        if self.manifest_digests:
+            try:
+                known = read_manifest(self.manifest_digests, self.destination)
+            except (OSError, UnicodeDecodeError) as e:
+                logging.warning(f"Could not read manifest {self.manifest_digests}: {e}")
+        self.duplicates = DuplicateIndex(known=known)
+        source_abs = os.path.abspath(self.source)
+        stack = [os.fspath(self.destination)]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if os.path.abspath(entry.path) != source_abs:
+                                stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False) and not is_temp_name(entry.name):
+                            size = entry.stat(follow_symlinks=False).st_size
+                            self.duplicates.add(DedupEntry((entry.path,), None), size)
+            except OSError as e:
+                logging.warning(f"Could not list destination folder for duplicate detection: {e}")
+    
+    def _check_duplicate(self, source: Path, name: str) -> bool:
+        """
+        Look a matched file up in the duplicate index.
+        
+        Returns:
+            True if the file should be transferred now; duplicates are
+            queued for process_duplicate instead (unless dedup is 'report')
+        """
+        if self.duplicates is None:
+            return True
+        try:
+            st = os.stat(source)
+        except OSError:
+            return True  # process_file reports it
+        
+        entry = DedupEntry((os.fspath(source), os.fspath(self.destination / name)), st.st_mtime_ns)
+        original = self.duplicates.find(entry, st.st_size)
+        if original is None:
+            self.duplicates.add(entry, st.st_size)
+            return True
+        
+        self._count('duplicates')
+        if self.dedup == 'report':
+            logging.info(f"Duplicate: {name} has the same content as "
+                         f"{os.path.relpath(original.paths[-1], self.destination)}")
+            self._count('bytes_saved', st.st_size)
+            return True
+        
+        self._duplicate_tasks.append((self.process_duplicate, (source, name, original, st.st_size)))
+        return False
+    
+    def _run_duplicates(self) -> None:
+        """Handle the duplicates found by the scan, once their originals are in place."""
+        tasks, self._duplicate_tasks = self._duplicate_tasks, []
+        if tasks:
+            self._execute(tasks)
+    
+    def _transfer_function(self, is_dir: bool):
+        """
+        Function transferring a newly matched item: process_file/process_folder,
+        or while resuming, a check for work done by the interrupted run whose
+        plan record was lost with it.
+        """
+        if self._resuming:
+            return partial(self._resume_operation, is_dir=is_dir)
+        return self.process_folder if is_dir else self.process_file
+    
+    def _journal_done(self, source: Path, status: str) -> None:
+        """Record a completed operation in the journal (if enabled)."""
+        if self.journal is not None:
+            self.journal.done(source, status)
+    
+    def _journal_scanned(self) -> None:
+        """Record that the scan has planned every operation of the run."""
+        if self.journal is not None:
+            self.journal.scanned()
+    
+    def _open_journal(self) -> Tuple[bool, Optional[JournalState]]:
+        """
+        Open the journal for this run, loading the interrupted run on resume.
+        
+        Returns:
+            Tuple (ok, state); state is the run being resumed, or None
+        """
+        header = {
+            'source': os.path.abspath(self.source),
+            'destination': os.path.abspath(self.destination),
+            'copy': self.copy_mode,
+            'started': datetime.now().isoformat(timespec='seconds'),
+        }
+        state = Journal.load(self.journal_path)
+        
+        if self.resume:
+            if state is None or state.header is None:
+                logging.error(f"Nothing to resume: no journal at {self.journal_path}")
+                return False, None
+            for key in ('source', 'destination', 'copy'):
+                if state.header.get(key) != header[key]:
+                    logging.error(f"Journal {self.journal_path} was written for a different run "
+                                  f"({key}: {state.header.get(key)!r})")
+                    return False, None
+        elif state is not None and state.header is not None and not state.finished:
+            logging.error(f"Journal {self.journal_path} belongs to an unfinished run; "
+                          f"use --resume to continue it, or delete the file")
+            return False, None
+        else:
+            state = None
+        
+        self.journal = Journal(self.journal_path)
+        self.journal.start(header, state)
+        return True, state
+    
+    def _resume(self, state: JournalState) -> bool:
+        """
+        Finish the operations the interrupted run planned but did not complete.
+        
+        Completed operations are not looked at again. Pending ones are checked
+        with a stat of their source and destination first, since the
+        operation may have finished right before the interruption.
+        
+        Returns:
+            True if there was anything left to do
+        """
+        pending = [(op_id, op) for op_id, op in state.ops.items() if op_id not in state.done]
+        self._resuming = True
+        
+        # Temporary copies the interrupted run created and did not get to
+        # rename or remove; nothing else ever has their names
+        for temp in state.temps:
+            if os.path.lexists(temp):
+                _remove_quietly(temp, is_dir=os.path.isdir(temp) and not os.path.islink(temp))
+                logging.debug(f"Removed unfinished copy {temp}")
+        self.stats['resumed'] = len(state.done)
+        logging.info(f"Resuming from journal: {len(state.done)} operation(s) already done, "
+                     f"{len(pending)} pending")
+        
+        if not state.scan_complete:
+            # The scan did not finish; it runs again but skips planned items
+            self._journal_skip = frozenset(src for kind, src, name in state.ops.values())
+        
+        tasks = []
+        for op_id, (kind, src, name) in pending:
+            self.journal.adopt(op_id, src)
+            if state.scan_complete:  # otherwise the new scan counts it
+                self._count('folders_matched' if kind == 'folder' else 'matched')
+            tasks.append((self._resume_operation, (Path(src), name, kind == 'folder', op_id in state.copied)))
+        
+        self._execute(tasks)
+        return bool(pending)
+    
+    def _resume_operation(self, source: Path, name: str, is_dir: bool = False,
+                          copied: bool = False) -> bool:
+        """
+        Complete one operation the interrupted run may have started.
+        
+        Args:
+            source: Path of the file or folder
+            name: Name (relative path) at the destination
+            is_dir: True for a folder operation
+            copied: True if the journal recorded a verified cross-device copy
             
         Returns:
             True if successful, False otherwise
         """
-        destination_path = self.destination / filename
+        destination = self.destination / name
+        done_key = 'folders_migrated' if is_dir else 'processed'
+        destination_exists = os.path.lexists(destination)
         
-        # Check if destination file already exists
-        if destination_path.exists():
-            logging.warning(f"File already exists at destination: {filename}")
-            self.stats['skipped'] += 1
+        # A moved source is gone once its destination exists
+        if destination_exists and not self.copy_mode and not os.path.lexists(source):
+            self._outcome(logging.INFO, 'done', source, destination, f"Already moved: {name}")
+            self._count(done_key)
+            self._journal_done(source, 'ok')
+            return True
+        
+        # Copies keep size and mtime, and only get their final name once
+        # complete (the 'copied' record may not have reached the disk)
+        if destination_exists and (copied or self._looks_copied(source, destination, is_dir)):
+            if self.copy_mode:
+                self._outcome(logging.INFO, 'done', source, destination, f"Already copied: {name}")
+                self._count(done_key)
+                self._journal_done(source, 'ok')
+                return True
+            self._outcome(logging.INFO, 'move', source, destination, f"Moved: {name} (across devices, finishing)")
+            self._count(done_key)
+            self._count('moves_copied')
+            self._queue_delete(source, is_dir)
+            return True
+        
+        if is_dir:
+            return self.process_folder(source, name)
+        return self.process_file(source, name)
+    
+    @staticmethod
+    def _looks_copied(source: Path, destination: Path, is_dir: bool) -> bool:
+        """Check whether destination is a finished copy of source (size and mtime)."""
+        try:
+            if is_dir:
+                a, b = summarize_folder(source), summarize_folder(destination)
+                return (a.size_bytes, a.file_count) == (b.size_bytes, b.file_count) and not a.errors
+            a, b = os.stat(source), os.stat(destination)
+            return (a.st_size, a.st_mtime_ns) == (b.st_size, b.st_mtime_ns)
+        except OSError:
             return False
+    
+    @contextmanager
+    def _phase(self, name: str, per_item: bool = False):
+        """
+        Add the wall time of the with-block to phase_seconds[name] (and
+        profile it with --profile).
         
+        Args:
+            name: Phase the time is counted towards
+            per_item: The block is entered once per item, so no memory
+                snapshot is taken when it ends
+        """
+        start = time.perf_counter()
         try:
-            if self.dry_run:
-                action = "COPY" if self.copy_mode else "MOVE"
-                logging.info(f"[DRY RUN] Would {action}: {filename}")
-                self.stats['processed'] += 1
-                return True
+            if self.profiler is None:
+                yield
+            else:
+                with self.profiler.phase(name, snapshot=not per_item):
+                    yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + elapsed
+    
+    def _timed(self, iterable, name: str):
+        """Iterate, adding the time spent producing items to phase_seconds[name]."""
+        iterator, done = iter(iterable), object()
+        while True:
+            with self._phase(name, per_item=True):
+                item = next(iterator, done)
+            if item is done:
+                if self.profiler is not None:
+                    self.profiler.snapshot(name)
+                return
+            yield item
+    
+    def _run_timed(self, func, args: tuple) -> None:
+        """Run one transfer, recording how long it took (waiting for the throttle included)."""
+        start = time.perf_counter()
+        try:
+            if self.throttle is not None and not self.dry_run:
+                self.throttle.operation()
+            if self.profiler is None:
+                func(*args)
+            else:
+                # Worker threads are not covered by the transfer phase's profiler
+                with self.profiler.phase('transfer', snapshot=False):
+                    func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._latencies.append(elapsed)
+    
+    def _run_buffered(self, func, args: tuple) -> list:
+        """Run one transfer in a worker thread, returning its buffered log records."""
+        self._log_buffer.records = records = []
+        try:
+            self._run_timed(func, args)
+        finally:
+            self._log_buffer.records = None
+        return records
+    
+    def run_transfers(self, func, items: List[Tuple[Path, str]]) -> None:
+        """
+        Run process_file / process_folder over a list of items.
+        
+        Args:
+            func: self.process_file or self.process_folder
+            items: List of (source_path, name) tuples
+        """
+        self._execute((func, item) for item in items)
+    
+    def _execute(self, tasks) -> None:
+        """
+        Execute (func, (source_path, name)) transfer tasks.
+        
+        With workers > 1 the tasks go through a bounded thread pool: at most
+        2 * workers operations are queued at a time, and each operation's log
+        lines are emitted together, in the order the tasks were submitted.
+        
+        Args:
+            tasks: Iterable of (func, item) tuples; may be a lazy generator
+        """
+        try:
+            if self.workers <= 1:
+                for func, item in tasks:
+                    self._mark_first_transfer()
+                    self._run_timed(func, item)
+                return
             
-            # Create destination directory if it doesn't exist
-            self.destination.mkdir(parents=True, exist_ok=True)
+            def flush(future):
+                for level, message in future.result():
+                    logging.log(level, message)
             
-            # Perform copy or move operation
-            if self.copy_mode:
-                shutil.copy2(source_path, destination_path)
-                logging.info(f"Copied: {filename}")
-            else:
-                shutil.move(str(source_path), str(destination_path))
-                logging.info(f"Moved: {filename}")
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pending = deque()
+                for func, item in tasks:
+                    self._mark_first_transfer()
+                    pending.append(pool.submit(self._run_buffered, func, item))
+                    if len(pending) >= self.workers * 2:
+                        flush(pending.popleft())
+                while pending:
+                    flush(pending.popleft())
+        finally:
+            # Sources of cross-device moves are only removed once copied and verified
+            self._flush_deletes()
+    
+    def _mark_first_transfer(self) -> None:
+        """Record the time from the start of organize() to the first transfer."""
+        if self.first_transfer_after is None and self._started is not None:
+            self.first_transfer_after = time.perf_counter() - self._started
+    
+    def _iter_matches(self):
+        """
+        Scan the source lazily, yielding transfer tasks as matches are found.
+        
+        In recursive mode the tree is walked depth-first with one open
+        scandir iterator per level, so memory depends on the depth of the
+        tree, not on how many files it holds. Matched folders are migrated
+        as a whole and not descended into; so are excluded folders, symlinks
+        to folders and the destination (if it lies inside source).
+        
+        Yields:
+            (func, (source_path, name)) tuples for process_folder/process_file;
+            name is the path relative to source when keep_structure is set
+        """
+        transfer_file = self._transfer_function(is_dir=False)
+        transfer_folder = self._transfer_function(is_dir=True)
+        
+        # Stack of (entries iterator, relative directory, depth, FolderTree
+        # summaries of its subfolders or None; see _evaluate_folder_tree)
+        stack = [(self.iter_source(), "", 0, None)]
+        
+        while stack:
+            entries, rel_dir, depth, trees = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                stack.pop()
+                continue
+            
+            try:
+                is_dir = entry.is_dir()
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                continue
+            
+            if self.is_excluded(entry.name):
+                continue
+            
+            name = os.path.join(rel_dir, entry.name) if self.keep_structure else entry.name
+            
+            if is_dir:
+                tree = trees.pop(entry.name, None) if trees is not None else None
+                descend = self.recursive and (self.max_depth is None or depth < self.max_depth)
+                if self.folders_to_migrate:
+                    if descend:
+                        matched, profile, tree = self._evaluate_folder_tree(entry, tree)
+                    else:
+                        matched, profile = self._evaluate_folder(entry)
+                    if matched:
+                        self._count('folders_matched')
+                        if profile is not None:
+                            self.folder_profiles[name] = profile
+                        name = self._destination_name(entry, name, rel_dir)
+                        if name is not None and self._plan_operation('folder', Path(entry.path), name, entry):
+                            yield transfer_folder, (Path(entry.path), name)
+                        continue
+                
+                if (descend
+                        and not entry.is_symlink()
+                        and os.path.abspath(entry.path) != self._destination_abs):
+                    stack.append((self._iter_subdir(entry.path), os.path.join(rel_dir, entry.name),
+                                  depth + 1, tree.children if tree is not None else None))
+            
+            elif is_file and self.pattern:
+                if self.matches_pattern(entry):
+                    self._count('matched')
+                    name = self._destination_name(entry, name, rel_dir)
+                    if (name is not None
+                            and self._plan_operation('file', Path(entry.path), name, entry)
+                            and self._check_duplicate(Path(entry.path), name)):
+                        yield transfer_file, (Path(entry.path), name)
+        
+        self._journal_scanned()
+    
+    @staticmethod
+    def _prefetch(iterable, maxsize: int):
+        """
+        Run a generator on a background thread, handing its items over through
+        a bounded queue so the producer stays at most maxsize items ahead.
+        
+        Exceptions raised by the producer are re-raised in the consumer.
+        """
+        items = queue.Queue(maxsize)
+        done = object()
+        errors = []
+        
+        def produce():
+            try:
+                for item in iterable:
+                    items.put(item)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                items.put(done)
+        
+        producer = threading.Thread(target=produce, name="scanner", daemon=True)
+        producer.start()
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            yield item
+        producer.join()
+        if errors:
+            raise errors[0]
+    
+    def _organize_streaming(self) -> bool:
+        """
+        Scan and transfer concurrently: a scanner thread feeds matches through
+        a bounded queue to the transfer loop, so copying starts with the first
+        match instead of after the whole source has been scanned.
+        
+        Returns:
+            True if anything matched, False otherwise
+        """
+        logging.info("Scanning and transferring (streaming)...")
+        logging.info("")
+        
+        with self._phase('transfer'):
+            self._execute(self._prefetch(self._timed(self._iter_matches(), 'scan'),
+                                         maxsize=self.workers * 2))
+            self._run_duplicates()
+        
+        if self.folders_to_migrate and not self.stats['folders_matched']:
+            logging.warning(f"No folders found matching the specified criteria")
+        if self.pattern and not self.stats['matched']:
+            logging.warning(f"No files found matching the specified criteria")
+        
+        return bool(self.stats['folders_matched'] or self.stats['matched'])
+    
+    def _open_plan(self) -> bool:
+        """
+        Check the plan file to apply against this run (or start the plan file
+        to write).
+        
+        Returns:
+            True if the run can go ahead, False otherwise
+        """
+        header = {
+            'source': os.path.abspath(self.source),
+            'destination': os.path.abspath(self.destination),
+            'copy': self.copy_mode,
+        }
+        if self.plan_path:
+            self.plan = OperationPlan(self.plan_path)
+            self.plan.create(dict(header, created=datetime.now().isoformat(timespec='seconds'),
+                                  pattern=self.pattern, folders=self.folders_to_migrate))
+            return True
+        
+        try:
+            plan = OperationPlan.read_header(self.apply_path)
+        except (OSError, ValueError) as e:
+            logging.error(f"Cannot apply plan: {e}")
+            return False
+        for key, value in header.items():
+            if plan.get(key) != value:
+                logging.error(f"Plan {self.apply_path} was made for a different run ({key}: {plan.get(key)!r})")
+                return False
+        # The plan's operations were matched when it was made; filters are not applied again
+        for key, value in (('pattern', self.pattern), ('folders', self.folders_to_migrate)):
+            if plan.get(key) != value:
+                logging.warning(f"Plan {self.apply_path} was made with other {key} filters "
+                                f"({describe_rule(plan[key]) if plan.get(key) else 'none'}); "
+                                f"its operations are applied as planned")
+        logging.info(f"Applying plan {self.apply_path}: {plan['operations']} operation(s), "
+                     f"planned {plan.get('created')}")
+        return True
+    
+    def _iter_plan(self):
+        """
+        Read the plan being applied lazily, yielding transfer tasks for the
+        operations whose source is unchanged since planning.
+        
+        Yields:
+            (func, (source_path, name)) tuples, like _iter_matches()
+        """
+        transfer_file = self._transfer_function(is_dir=False)
+        transfer_folder = self._transfer_function(is_dir=True)
+        
+        for op in OperationPlan.iter_ops(self.apply_path):
+            source, is_dir = Path(op.source), op.kind == 'folder'
+            self._count('folders_matched' if is_dir else 'matched')
+            if not self._plan_operation(op.kind, source, op.name):
+                continue
             
-            self.stats['processed'] += 1
-            return True
+            # One stat instead of a scan: size and mtime must be as planned
+            try:
+                st = os.stat(source)
+                changed = st.st_mtime_ns != op.mtime_ns or (not is_dir and st.st_size != op.size)
+                reason = "changed since plan"
+            except OSError:
+                changed, reason = True, "gone since plan"
+            if changed:
+                self._outcome(logging.WARNING, 'skip', source, self.destination / op.name,
+                              f"Skipped {'folder' if is_dir else 'file'} {op.name}: {reason}")
+                self._count('skipped')
+                self._count('stale')
+                self._journal_done(source, 'skipped')
+                continue
+            
+            if is_dir:
+                yield transfer_folder, (source, op.name)
+            elif self._check_duplicate(source, op.name):
+                yield transfer_file, (source, op.name)
         
-        except Exception as e:
-            logging.error(f"Error processing {filename}: {e}")
-            self.stats['errors'] += 1
-            return False
+        self._journal_scanned()
     
-    def get_folders_to_migrate(self) -> List[Tuple[Path, str]]:
+    def _organize_plan(self) -> bool:
         """
-        Get list of folders to migrate based on folders_to_migrate filters.
+        Execute the operations of a plan file, reading it on a background
+        thread while transfers run (like the streaming scan).
         
         Returns:
-            List of tuples (folder_path, folder_name)
+            True if the plan had any operations, False otherwise
         """
-        folders = []
+        logging.info("Executing plan...")
+        logging.info("")
         
-        if self.folders_to_migrate is None:
-            return folders
+        with self._phase('transfer'):
+            self._execute(self._prefetch(self._timed(self._iter_plan(), 'scan'),
+                                         maxsize=self.workers * 2))
+            self._run_duplicates()
         
-        try:
-            for item in self.source.iterdir():
-                if not item.is_dir():
-                    continue
-                
-                # Check if this folder matches the criteria
-                if self.matches_folder_pattern(item):
-                    folders.append((item, item.name))
-                    self.stats['folders_matched'] += 1
+        if not (self.stats['matched'] or self.stats['folders_matched']):
+            logging.warning(f"The plan has no operations")
         
-        except PermissionError as e:
-            logging.error(f"Permission denied accessing source directory: {e}")
+        return bool(self.stats['matched'] or self.stats['folders_matched'])
+    
+    def organize(self) -> dict:
+        """
+        Execute the file organization process.
         
-        return folders
+        Returns:
+            Dictionary containing operation statistics
+        """
+        if self.profiler is not None:
+            self.profiler.start()
+        try:
+            stats = self._organize()
+            if self.journal is not None:
+                self.journal.finish()
+            if self.plan is not None:
+                self.plan.close(complete=True)
+            return stats
+        finally:
+            if self.plan is not None:
+                self.plan.close()
+            if self.profiler is not None:
+                self._print_profile()
+            if self.journal is not None:
+                self.journal.close()
+            self._close_outputs()
     
-    def process_folder(self, source_folder: Path, folder_name: str) -> bool:
+    def _close_outputs(self) -> None:
+        """Close the manifest and operation log and save the caches."""
+        if self._manifest is not None:
+            self._manifest.close()
+        if self.op_log is not None:
+            self.op_log.close()
+        if self.index is not None:
+            # A run listing everything from disk sets the baseline for the summary
+            if self.index.misses and not self.index.hits:
+                self.index.set_meta('cold_list_seconds', self.index.list_seconds)
+            self.index.commit()
+        if self.folder_cache is not None:
+            self.folder_cache.commit()
+    
+    def watch(self, method: str = 'auto', settle: float = WATCH_SETTLE_SECONDS,
+              poll_interval: float = WATCH_POLL_SECONDS) -> dict:
         """
-        Process a single folder (copy or move entire directory tree).
+        Keep migrating: wait for items to arrive in source and process them
+        as they settle, until interrupted (Ctrl+C or SIGTERM).
+        
+        Items already in source are handled first. After that nothing is
+        scanned: only the names the watcher reports go through the matchers
+        and process_file / process_folder. A file is processed as soon as
+        its writer closes it (inotify only); otherwise, e.g. for writers
+        that keep the file open, an item is processed once no event has
+        been seen for it for settle seconds, so files still being written
+        are left alone. Only the direct children of source are watched.
         
         Args:
-            source_folder: Full path to source folder
-            folder_name: Name of the folder
+            method: 'inotify', 'poll' or 'auto' (inotify where available)
+            settle: Seconds an item must be quiet before it is processed
+            poll_interval: Seconds between checks when polling
             
         Returns:
-            True if successful, False otherwise
+            Dictionary containing operation statistics
         """
-        destination_folder = self.destination / folder_name
-        
-        # Check if destination folder already exists
-        if destination_folder.exists():
-            logging.warning(f"Folder already exists at destination: {folder_name}")
-            self.stats['skipped'] += 1
-            return False
+        self._started = time.perf_counter()
+        self._print_header()
+        with self._phase('validate'):
+            if not self.validate_paths():
+                return self.stats
         
         try:
-            if self.dry_run:
-                action = "COPY" if self.copy_mode else "MOVE"
-                logging.info(f"[DRY RUN] Would {action} folder: {folder_name}")
-                self.stats['folders_migrated'] += 1
-                return True
-            
-            # Create parent destination directory if it doesn't exist
-            self.destination.mkdir(parents=True, exist_ok=True)
-            
-            # Perform copy or move operation
-            if self.copy_mode:
-                shutil.copytree(source_folder, destination_folder)
-                logging.info(f"Copied folder: {folder_name}")
-            else:
-                shutil.move(str(source_folder), str(destination_folder))
-                logging.info(f"Moved folder: {folder_name}")
-            
-            self.stats['folders_migrated'] += 1
-            return True
+            watcher = open_watcher(self.source, method, poll_interval)
+        except OSError as e:
+            logging.error(f"Cannot watch {self.source}: {e}")
+            self.stats['errors'] += 1
+            return self.stats
         
-        except Exception as e:
-            logging.error(f"Error processing folder {folder_name}: {e}")
+        if self.manifest_path and not self.dry_run:
+            self._manifest = open(self.manifest_path, 'a', encoding='utf-8', errors=MANIFEST_ERRORS)
+        if self.op_log_path:
+            self.op_log = OperationLog(self.op_log_path)
+        if self.dedup and self.pattern:
+            self._build_duplicate_index()
+        
+        # SIGTERM (service managers) stops the watch like Ctrl+C, until the
+        # handler it replaces is put back
+        on_main_thread = threading.current_thread() is threading.main_thread()
+        if on_main_thread:
+            previous_handler = signal.signal(signal.SIGTERM, _raise_interrupt)
+        
+        logging.info(f"Watching {self.source} ({watcher.method}, settle {settle:g}s); Ctrl+C to stop")
+        
+        try:
+            # Name -> time of its last event; what is already there goes first
+            pending = dict.fromkeys((entry.name for entry in self.scan_source()), 0.0)
+            while True:
+                now = time.monotonic()
+                ready = [name for name, last in pending.items() if now - last >= settle]
+                if ready:
+                    for name in ready:
+                        del pending[name]
+                    self._watch_batch(ready)
+                    continue
+                
+                timeout = min(pending.values()) + settle - now if pending else None
+                changed = watcher.wait(timeout)
+                now = time.monotonic()
+                if changed is None:
+                    # Events were lost (queue overflow): look at everything again
+                    changed = [(entry.name, False) for entry in self.scan_source()]
+                for name, closed in changed:
+                    # Closed by its writer: ready now, no need to wait to settle
+                    pending[name] = now - settle if closed else now
+        except KeyboardInterrupt:
+            logging.info("Watch stopped")
+        except OSError as e:
+            logging.error(f"Watch stopped: {e}")
             self.stats['errors'] += 1
-            return False
+        finally:
+            if on_main_thread:
+                # None: the previous handler was not set from Python; default it is
+                signal.signal(signal.SIGTERM, previous_handler if previous_handler is not None else signal.SIG_DFL)
+            watcher.close()
+            self._close_outputs()
+        
+        self._print_summary()
+        return self.stats
     
-    def organize(self) -> dict:
-        """
-        Execute the file organization process.
+    def _watch_batch(self, names: List[str]) -> None:
+        """Match and transfer the items of source that have settled."""
+        # Other programs may have changed the destination since the last batch
+        with self._lock:
+            self._destination_names.clear()
+            self._made_dirs.clear()
         
-        Returns:
-            Dictionary containing operation statistics
-        """
+        with self._phase('scan'):
+            tasks = self._watch_match(names)
+        if tasks:
+            logging.debug(f"Watch: {len(tasks)} of {len(names)} settled item(s) matched")
+        with self._phase('transfer'):
+            self._execute(tasks)
+            self._run_duplicates()
+    
+    def _watch_match(self, names: List[str]) -> list:
+        """Transfer tasks for the settled names that match a rule."""
+        tasks = []
+        for name in sorted(names):
+            path = self.source / name
+            if self.is_excluded(name) or os.path.abspath(path) == self._destination_abs:
+                continue
+            try:
+                is_dir = path.is_dir()
+                is_file = not is_dir and path.is_file()
+            except OSError:
+                continue  # gone again
+            
+            if is_dir and self.folders_to_migrate:
+                matched, profile = self._evaluate_folder(path)
+                if not matched:
+                    continue
+                self._count('folders_matched')
+                if profile is not None:
+                    self.folder_profiles[name] = profile
+                destination_name = self._destination_name(path, name)
+                if destination_name is not None:
+                    tasks.append((self.process_folder, (path, destination_name)))
+            
+            elif is_file and self.pattern and self.matches_pattern(path):
+                self._count('matched')
+                destination_name = self._destination_name(path, name)
+                if destination_name is not None and self._check_duplicate(path, destination_name):
+                    tasks.append((self.process_file, (path, destination_name)))
+        return tasks
+    
+    def _print_header(self) -> None:
+        """Print the source, destination, criteria and options of the run."""
         logging.info("=" * 60)
         logging.info("Pattern-Based File & Folder Organizer")
         logging.info("=" * 60)
@@ -779,50 +4678,141 @@ class FileOrganizer:
         
         logging.info(f"Mode: {'COPY' if self.copy_mode else 'MOVE'}")
         logging.info(f"Dry Run: {'YES' if self.dry_run else 'NO'}")
+        if self.dedup:
+            logging.info(f"Duplicates: {self.dedup.upper()} (by content)")
+        if self.strict:
+            logging.info(f"Strict: YES (names looked up on disk before each transfer)")
+        if self.verify:
+            logging.info(f"Verify: {self.verify.upper()}"
+                         f"{f' ({VERIFY_ALGORITHM}, manifest: {self.manifest_path})' if self.manifest_path else ''}")
+        if self.journal_path and not self.dry_run:
+            logging.info(f"Journal: {self.journal_path}{' (resume)' if self.resume else ''}")
+        if self.plan_path:
+            logging.info(f"Plan: {self.plan_path} (written, nothing is changed)")
+        if self.apply_path:
+            logging.info(f"Apply: {self.apply_path} (no scan; changed items are skipped)")
+        if self.index is not None:
+            logging.info(f"Scan Index: {self.index.db_path}")
+        if self.folder_cache is not None and self.folders_to_migrate:
+            logging.info(f"Folder Cache: {self.folder_cache.db_path}")
+        if self.workers > 1:
+            logging.info(f"Workers: {self.workers}")
+        if self.folders_to_migrate and self.scan_workers > 1 and not (self.stream or self.recursive):
+            logging.info(f"Scan Workers: {self.scan_workers} ({self.scan_mode})")
+        if self.stream:
+            logging.info(f"Streaming: YES")
+        if self.recursive:
+            depth = "unlimited" if self.max_depth is None else self.max_depth
+            logging.info(f"Recursive: YES (max depth: {depth}, "
+                         f"{'keep structure' if self.keep_structure else 'flatten'})")
+        if self.exclude:
+            logging.info(f"Exclude: {', '.join(self.exclude)}")
+        if self.template is not None:
+            logging.info(f"Destination Template: {self.template.template}")
         logging.info("=" * 60)
+    
+    def _organize(self) -> dict:
+        """Body of organize(); see there."""
+        self._started = time.perf_counter()
+        
+        self._print_header()
         
         # Validate paths
-        if not self.validate_paths():
-            return self.stats
+        with self._phase('validate'):
+            if not self.validate_paths():
+                return self.stats
         
         # Track if we're processing anything
         processed_something = False
         
+        if self.manifest_path and not self.dry_run:
+            self._manifest = open(self.manifest_path, 'a', encoding='utf-8', errors=MANIFEST_ERRORS)
+        if self.op_log_path:
+            self.op_log = OperationLog(self.op_log_path)
+        if (self.plan_path or self.apply_path) and not self._open_plan():
+            self.stats['errors'] += 1
+            return self.stats
+        if self.dedup and (self.pattern or self.apply_path):
+            with self._phase('scan'):
+                self._build_duplicate_index()
+        
+        # Open the journal; on resume, finish the interrupted run's operations
+        # first (no new scan at all if that run had finished scanning)
+        scan_needed = bool(self.folders_to_migrate or self.pattern or self.apply_path)
+        if self.journal_path and not self.dry_run:
+            ok, state = self._open_journal()
+            if not ok:
+                self.stats['errors'] += 1
+                return self.stats
+            if state is not None:
+                with self._phase('resume'):
+                    processed_something = self._resume(state)
+                scan_needed = scan_needed and not state.scan_complete
+        
+        # List the source once and share it between the folder and file scans
+        lazy = self.stream or self.recursive
+        if lazy or not scan_needed or self.apply_path:
+            entries = []
+        else:
+            with self._phase('scan'):
+                entries = self.scan_source()
+        
+        # Listing entries by name, so a plan being written records their stat
+        scanned = {entry.name: entry for entry in entries} if self.plan is not None else {}
+        
+        # A plan replaces the scan: its operations are executed as read
+        if scan_needed and self.apply_path:
+            processed_something = self._organize_plan() or processed_something
+        
+        # Recursive walks always go through the lazy pipeline (constant memory)
+        elif scan_needed and lazy:
+            processed_something = self._organize_streaming() or processed_something
+        
         # Process folders if folder migration is enabled
-        if self.folders_to_migrate:
+        elif scan_needed and self.folders_to_migrate:
             logging.info("Scanning for folders to migrate...")
-            folders = self.get_folders_to_migrate()
+            with self._phase('folder_scan'):
+                folders = [item for item in self.get_folders_to_migrate(entries)
+                           if self._plan_operation('folder', *item, entry=scanned.get(item[0].name))]
+            if not self.pattern:
+                self._journal_scanned()
             
             if folders:
                 logging.info(f"Found {len(folders)} folder(s) matching criteria")
                 logging.info("")
                 
                 # Process each folder
-                for folder_path, folder_name in folders:
-                    self.process_folder(folder_path, folder_name)
+                with self._phase('transfer'):
+                    self.run_transfers(self._transfer_function(is_dir=True), folders)
                 processed_something = True
             else:
                 logging.warning(f"No folders found matching the specified criteria")
         
         # Process files if file migration is enabled
-        if self.pattern:
+        if self.pattern and scan_needed and not lazy and not self.apply_path:
             logging.info("Scanning for matching files...")
-            matching_files = self.get_matching_files()
+            with self._phase('file_scan'):
+                matching_files = [item for item in self.get_matching_files(entries)
+                                  if self._plan_operation('file', *item, entry=scanned.get(item[0].name))]
+            self._journal_scanned()
             
             if matching_files:
                 logging.info(f"Found {len(matching_files)} matching file(s)")
                 logging.info("")
                 
-                # Process each file
-                for source_path, filename in matching_files:
-                    self.process_file(source_path, filename)
+                # Process each file; duplicates once their originals are in place
+                with self._phase('file_scan'):
+                    transfers = [item for item in matching_files if self._check_duplicate(*item)]
+                with self._phase('transfer'):
+                    self.run_transfers(self._transfer_function(is_dir=False), transfers)
+                    self._run_duplicates()
                 processed_something = True
             else:
                 logging.warning(f"No files found matching the specified criteria")
         
         # If neither files nor folders are configured for migration
         if not processed_something:
-            if not self.folders_to_migrate and not self.pattern:
+            if not self.folders_to_migrate and not self.pattern and not self.apply_path:
                 logging.error("No migration configured. FILES_TO_MIGRATE and FOLDERS_TO_MIGRATE are both set to None.")
                 logging.error("Please configure at least one in the script, or provide command line options.")
             return self.stats
@@ -832,6 +4822,61 @@ class FileOrganizer:
         
         return self.stats
     
+    def report(self) -> dict:
+        """
+        Counters, timings and throughput of the run, as plain data (this is
+        what --stats-json writes).
+        
+        Returns:
+            Dictionary with stats, per-phase seconds, bytes copied, items/s,
+            MB/s, per-operation latency percentiles and copy methods
+        """
+        elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+        transfer = self.phase_seconds.get('transfer', 0.0)
+        items = self.stats['processed'] + self.stats['folders_migrated']
+        bytes_copied = sum(size for files, size in self.copier.counters.values())
+        latencies = sorted(self._latencies)
+        
+        return {
+            'source': os.path.abspath(self.source),
+            'destination': os.path.abspath(self.destination),
+            'mode': 'copy' if self.copy_mode else 'move',
+            'dry_run': self.dry_run,
+            'workers': self.workers,
+            'stats': dict(self.stats),
+            'elapsed_seconds': round(elapsed, 6),
+            'phase_seconds': {name: round(seconds, 6) for name, seconds in self.phase_seconds.items()},
+            'first_transfer_after': self.first_transfer_after,
+            'bytes_copied': bytes_copied,
+            'items_per_second': round(items / transfer, 3) if transfer else None,
+            'mb_per_second': round(bytes_copied / BYTES_PER_MB / transfer, 3) if transfer else None,
+            'latency_ms': {
+                'operations': len(latencies),
+                'p50': round(percentile(latencies, 50) * 1000, 3),
+                'p90': round(percentile(latencies, 90) * 1000, 3),
+                'p99': round(percentile(latencies, 99) * 1000, 3),
+                'max': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+            'dirs_made': self.dirs_made,
+            'throttle': self.throttle.report() if self.throttle is not None else None,
+            'copy_methods': {method: {'files': files, 'bytes': size}
+                             for method, (files, size) in self.copier.counters.items() if files},
+            'peak_rss_mb': peak_rss_mb(),
+        }
+    
+    def _print_profile(self) -> None:
+        """Write the per-phase profiles and print the hot spots of each phase."""
+        lines = self.profiler.finish()
+        if not lines:
+            return
+        logging.info("")
+        logging.info("=" * 60)
+        logging.info(f"PROFILE ({self.profiler.directory})")
+        logging.info("=" * 60)
+        for line in lines:
+            logging.info(line)
+        logging.info("=" * 60)
+    
     def _print_summary(self) -> None:
         """Print operation summary."""
         logging.info("")
@@ -850,13 +4895,503 @@ class FileOrganizer:
             logging.info(f"FOLDERS:")
             logging.info(f"  Matched:  {self.stats['folders_matched']}")
             logging.info(f"  Migrated: {self.stats['folders_migrated']}")
+            if self.folder_profiles and self.folder_matcher.needs_size:
+                total = FolderProfile(
+                    sum(p.size_bytes for p in self.folder_profiles.values()),
+                    sum(p.file_count for p in self.folder_profiles.values()),
+                    True,
+                    all(p.complete for p in self.folder_profiles.values()),
+                    0
+                )
+                logging.info(f"  Size:     {describe_profile(total)}")
         
         # Show common statistics
         if self.pattern or self.folders_to_migrate:
             logging.info(f"OVERALL:")
             logging.info(f"  Skipped: {self.stats['skipped']}")
             logging.info(f"  Errors:  {self.stats['errors']}")
+            if self.stats['resumed']:
+                logging.info(f"  Done before resume: {self.stats['resumed']}")
+            if self.apply_path:
+                logging.info(f"  Changed since plan: {self.stats['stale']}")
+            if self.first_transfer_after is not None:
+                logging.info(f"  First transfer after: {self.first_transfer_after:.3f}s")
+            peak = peak_rss_mb()
+            if peak is not None:
+                logging.info(f"  Peak memory (RSS):    {peak:.1f} MB")
+        
+        # Show where the time went and how fast data moved
+        if self.pattern or self.folders_to_migrate:
+            report = self.report()
+            phases = report['phase_seconds']
+            overlap = " (scan overlaps transfer)" if (self.stream or self.recursive or self.apply_path) else ""
+            logging.info(f"PERFORMANCE:")
+            logging.info(f"  Elapsed:    {report['elapsed_seconds']:.3f}s")
+            logging.info(f"  Phases:     " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in phases.items())
+                         + overlap)
+            if report['items_per_second'] is not None:
+                copied = (f", {report['mb_per_second']:.2f} MB/s ({report['bytes_copied'] / BYTES_PER_MB:.2f} MB copied)"
+                          if report['bytes_copied'] else "")
+                logging.info(f"  Throughput: {report['items_per_second']:.1f} items/s{copied}")
+            latency = report['latency_ms']
+            if latency['operations']:
+                logging.info(f"  Latency:    p50 {latency['p50']:.2f}ms, p90 {latency['p90']:.2f}ms, "
+                             f"p99 {latency['p99']:.2f}ms, max {latency['max']:.2f}ms")
+        
+        # Show the throughput achieved against the caps
+        if self.throttle is not None and not self.dry_run:
+            logging.info(f"THROTTLE:")
+            for line in self.throttle.describe():
+                logging.info(f"  {line}")
+        
+        # Show how much listing work the scan index saved
+        if self.index is not None and (self.index.hits or self.index.misses):
+            index = self.index
+            logging.info(f"SCAN INDEX:")
+            logging.info(f"  Folders from index: {index.hits}")
+            logging.info(f"  Folders re-listed:  {index.misses}")
+            logging.info(f"  Listing time:       {index.list_seconds:.3f}s")
+            cold = index.get_meta('cold_list_seconds')
+            if index.hits and cold is not None and index.list_seconds > 0:
+                logging.info(f"  Cold listing time:  {float(cold):.3f}s "
+                             f"({float(cold) / index.list_seconds:.1f}x faster)")
+        
+        # Show how many folder walks the folder cache saved
+        if self.folder_cache is not None and (self.folder_cache.hits or self.folder_cache.misses):
+            logging.info(f"FOLDER CACHE:")
+            logging.info(f"  Hits:   {self.folder_cache.hits}")
+            logging.info(f"  Walked: {self.folder_cache.misses}")
+        
+        # Show how many destination folders had to be created
+        if self.dirs_made:
+            logging.info(f"FOLDERS CREATED:")
+            logging.info(f"  Destination folders: {self.dirs_made} (one makedirs each)")
+        
+        # Show how moves were carried out
+        if self.stats['moves_renamed'] or self.stats['moves_copied']:
+            logging.info(f"MOVES:")
+            logging.info(f"  Renamed (same device):     {self.stats['moves_renamed']}")
+            logging.info(f"  Copied + deleted (cross):  {self.stats['moves_copied']}")
+        
+        # Show what duplicate detection found and how much it read
+        if self.duplicates is not None:
+            saved = "Bytes saveable" if self.dedup == 'report' else "Bytes saved"
+            logging.info(f"DUPLICATES:")
+            logging.info(f"  Found:          {self.stats['duplicates']}")
+            logging.info(f"  {saved + ':':<15} {self.stats['bytes_saved'] / BYTES_PER_MB:.2f} MB")
+            logging.info(f"  Partial hashes: {self.duplicates.partial_reads}")
+            logging.info(f"  Full hashes:    {self.duplicates.full_reads}")
+            if self.duplicates.full_reused:
+                logging.info(f"  From manifest:  {self.duplicates.full_reused}")
+        
+        # Show what the plan file holds and how to execute it
+        if self.plan is not None:
+            logging.info(f"PLAN:")
+            logging.info(f"  Operations: {self.plan.count} ({self.plan_path})")
+            logging.info(f"  Execute with: --apply {self.plan_path}")
+        
+        # Show where the machine-readable record of the run went
+        if self.op_log is not None:
+            logging.info(f"OPERATION LOG:")
+            logging.info(f"  Records: {self.op_log.records} ({self.op_log.path})")
+        
+        # Show how many copies were checked
+        if self.verify and self.stats['verified']:
+            logging.info(f"VERIFY:")
+            logging.info(f"  Verified: {self.stats['verified']} file(s) "
+                         f"({'checksums' if self.verify == 'full' else 'size and mtime'})")
+            if self.manifest_path:
+                logging.info(f"  Manifest: {self.manifest_path}")
+        
+        # Show how copied data was transferred
+        copy_methods = self.copier.describe()
+        if copy_methods:
+            logging.info(f"COPY METHODS:")
+            for line in copy_methods:
+                logging.info(f"  {line}")
+        
+        logging.info("=" * 60)
+
+
+# ============================================
+# MULTI-RULE RUNS
+# ============================================
+
+# Keys a rule in a rules file may have
+RULE_KEYS = frozenset(('name', 'destination', 'copy', 'files', 'folders', 'template'))
+
+
+def load_rules(path: str) -> Tuple[str, List[dict]]:
+    """
+    Read a rules file: JSON, or TOML (.toml, Python 3.11+).
+    
+    Format (JSON):
+        {"match": "first",
+         "rules": [
+            {"name": "pdfs", "destination": "/archive/pdf", "copy": false,
+             "files": {"file_type": ".pdf", "min_size_mb": 1}},
+            {"name": "projects", "destination": "/archive/projects",
+             "folders": {"name_pattern": "^Project"}}]}
+    
+    files and folders take the keys of FILES_TO_MIGRATE / FOLDERS_TO_MIGRATE
+    (an empty table matches everything); a rule needs at least one of them.
+    A rule may also have a destination template ("template").
+    
+    Args:
+        path: Path of the rules file
+        
+    Returns:
+        Tuple (match, rules); match is 'first' or 'all', and every rule has
+        a name and a copy flag
+    
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is not a valid rules file
+    """
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise ValueError(f"{path}: TOML rules files need Python 3.11+ (tomllib); use JSON")
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    
+    if not isinstance(data, dict) or not isinstance(data.get('rules'), list) or not data['rules']:
+        raise ValueError(f"{path}: expected a non-empty 'rules' list")
+    match = data.get('match', 'first')
+    if match not in ('first', 'all'):
+        raise ValueError(f"{path}: match must be 'first' or 'all', not {match!r}")
+    
+    rules = []
+    for number, rule in enumerate(data['rules'], 1):
+        if not isinstance(rule, dict) or not rule.get('destination'):
+            raise ValueError(f"{path}: rule {number} has no destination")
+        unknown = set(rule) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"{path}: rule {number} has unknown key(s) {', '.join(sorted(unknown))}")
+        if 'files' not in rule and 'folders' not in rule:
+            raise ValueError(f"{path}: rule {number} has neither 'files' nor 'folders'")
+        for key in ('files', 'folders'):
+            if key in rule and not isinstance(rule[key], dict):
+                raise ValueError(f"{path}: '{key}' of rule {number} must be a table/object")
+        if 'template' in rule:
+            DestinationTemplate(rule['template'])
+        rules.append(dict(rule, name=rule.get('name') or f"rule {number}", copy=bool(rule.get('copy', False))))
+    return match, rules
+
+
+def describe_rule(criteria: dict) -> str:
+    """One-line description of a files/folders filter dict."""
+    parts = []
+    if criteria.get("name_pattern") is not None:
+        parts.append("name " + " or ".join(_as_list(criteria["name_pattern"])))
+    if criteria.get("file_type") is not None:
+        parts.append("type " + " or ".join(_as_list(criteria["file_type"])))
+    if criteria.get("min_size_mb") is not None:
+        parts.append(f">= {criteria['min_size_mb']} MB")
+    if criteria.get("max_size_mb") is not None:
+        parts.append(f"<= {criteria['max_size_mb']} MB")
+    return ", ".join(parts) or "all"
+
+
+class MultiRuleOrganizer:
+    """
+    Several rules, each with its own destination and copy/move mode,
+    evaluated against one listing of the source.
+    
+    Every rule gets a FileOrganizer that carries out (and counts) its
+    transfers, but the source is listed once and each entry is checked
+    against all rules. DirEntry caches its stat, so a file is stat'ed at
+    most once however many rules filter on size, and a folder's contents
+    are walked at most once (one FolderSummary shared by every rule that
+    filters on folder contents).
+    
+    match='first' gives each entry to the first rule that matches it;
+    match='all' to every matching rule: copies first, then at most one
+    move, since an item can only be moved once.
+    """
+    
+    def __init__(self, source: str, rules: List[dict], match: str = 'first',
+                 dry_run: bool = False, workers: int = 1, folder_cache=None,
+                 op_log: str = None, manifest: str = None, **options):
+        """
+        Initialize the MultiRuleOrganizer.
+        
+        Args:
+            source: Source directory path
+            rules: Rules as returned by load_rules()
+            match: 'first' or 'all'
+            dry_run: If True, only preview operations without executing
+            workers: Number of threads transferring items in parallel
+            folder_cache: FolderCache, or path of its sqlite3 file, used for
+                folder type/size criteria (None = off)
+            op_log: Path of a JSON-lines operation log shared by all rules
+            manifest: Path of a b2sum manifest shared by all rules (only
+                with verify='full'); its names are absolute, since each
+                rule has its own destination
+            **options: Further FileOrganizer arguments applied to every rule
+                (exclude, verify, strict, copy_threads, log_items, ...)
+        """
+        if match not in ('first', 'all'):
+            raise ValueError(f"match must be 'first' or 'all', not {match!r}")
+        self.source = Path(source)
+        self.rules = rules
+        self.match = match
+        self.dry_run = dry_run
+        self.workers = max(1, int(workers))
+        if folder_cache is None or isinstance(folder_cache, FolderCache):
+            self.folder_cache = folder_cache
+        else:
+            self.folder_cache = FolderCache(folder_cache)
+        self.op_log_path = op_log
+        self.op_log = None
+        self.manifest_path = manifest if options.get('verify') == 'full' else None
+        self._manifest = None
+        self.throttle = options.get('throttle')
+        
+        self.organizers = [FileOrganizer(source, rule['destination'], pattern=rule.get('files'),
+                                         folders_to_migrate=rule.get('folders'), copy_mode=rule['copy'],
+                                         dry_run=dry_run, destination_template=rule.get('template'),
+                                         **options)
+                           for rule in rules]
+        
+        # One lock and one index of destination names for all rules, so
+        # rules sharing a destination folder see each other's names
+        lock, names = threading.Lock(), {}
+        for organizer in self.organizers:
+            organizer._lock = lock
+            organizer._destination_names = names
+        
+        self.phase_seconds = {}
+        self._started = None
+    
+    @contextmanager
+    def _phase(self, name: str):
+        """Add the wall time of the with-block to phase_seconds[name]."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.perf_counter() - start
+    
+    def organize(self) -> List[dict]:
+        """
+        List the source once, match every entry against the rules and carry
+        out the transfers.
+        
+        Returns:
+            Statistics dictionary of each rule, in rule order
+        """
+        self._started = time.perf_counter()
+        first = self.organizers[0]
+        
+        logging.info("=" * 60)
+        logging.info("Pattern-Based File & Folder Organizer")
+        logging.info("=" * 60)
+        logging.info(f"Source: {self.source}")
+        logging.info(f"Rules: {len(self.rules)} ({self.match}-match, one scan)")
+        for number, (rule, organizer) in enumerate(zip(self.rules, self.organizers), 1):
+            action = 'COPY' if organizer.copy_mode else 'MOVE'
+            logging.info(f"  {number}. {rule['name']}: {action} to {organizer.destination}")
+            if organizer.pattern is not None:
+                logging.info(f"       files:   {describe_rule(organizer.pattern)}")
+            if organizer.folders_to_migrate is not None:
+                logging.info(f"       folders: {describe_rule(organizer.folders_to_migrate)}")
+        logging.info(f"Dry Run: {'YES' if self.dry_run else 'NO'}")
+        if self.workers > 1:
+            logging.info(f"Workers: {self.workers}")
+        logging.info("=" * 60)
+        
+        try:
+            with self._phase('validate'):
+                if not first.validate_paths():
+                    first.stats['errors'] += 1
+                    return [organizer.stats for organizer in self.organizers]
+            
+            if self.op_log_path:
+                self.op_log = OperationLog(self.op_log_path)
+                for organizer in self.organizers:
+                    organizer.op_log = self.op_log
+            if self.manifest_path and not self.dry_run:
+                self._manifest = open(self.manifest_path, 'a', encoding='utf-8', errors=MANIFEST_ERRORS)
+                for organizer in self.organizers:
+                    organizer._manifest = self._manifest
+                    organizer.manifest_relative = False
+            
+            with self._phase('scan'):
+                entries = first.scan_source()
+            with self._phase('match'):
+                tasks = [task for task in map(self._match, entries) if task is not None]
+            logging.info(f"Matched {len(tasks)} item(s) in {len(entries)} entries")
+            logging.info("")
+            
+            with self._phase('transfer'):
+                self._execute(tasks)
+            
+            self._print_summary()
+            return [organizer.stats for organizer in self.organizers]
+        finally:
+            if self.op_log is not None:
+                self.op_log.close()
+            if self._manifest is not None:
+                self._manifest.close()
+            if self.folder_cache is not None:
+                self.folder_cache.commit()
+    
+    def _match(self, entry: os.DirEntry) -> Optional[tuple]:
+        """
+        Match one source entry against the rules.
+        
+        Returns:
+            Tuple (source_path, is_dir, targets) with the (organizer, name)
+            of every rule the entry goes to, or None if no rule matched
+        """
+        try:
+            is_dir = entry.is_dir()
+            is_file = not is_dir and entry.is_file()
+        except OSError:
+            return None
+        if not (is_dir or is_file) or self.organizers[0].is_excluded(entry.name):
+            return None
+        
+        targets = []
+        summary = None
+        for organizer in self.organizers:
+            if is_dir:
+                matcher = organizer.folder_matcher
+                if matcher is None or not matcher.match_name(entry.name):
+                    continue
+                if matcher.types is not None or matcher.needs_size:
+                    # One walk of the folder, whatever the number of rules
+                    if summary is None:
+                        summary = (self.folder_cache.summarize(entry) if self.folder_cache is not None
+                                   else summarize_folder(entry))
+                    profile = profile_from_summary(summary, matcher)
+                    if not organizer._profile_matches(entry.name, profile):
+                        continue
+                    organizer.folder_profiles[entry.name] = profile
+                organizer._count('folders_matched')
+            else:
+                if organizer.file_matcher is None or not organizer.matches_pattern(entry):
+                    continue
+                organizer._count('matched')
+            
+            name = organizer._destination_name(entry, entry.name)
+            if name is not None:
+                targets.append((organizer, name))
+            if self.match == 'first':
+                break
+        
+        return (Path(entry.path), is_dir, targets) if targets else None
+    
+    def _transfer(self, source: Path, is_dir: bool, targets: list) -> None:
+        """Carry out one matched item for each of its rules: copies first, then one move."""
+        moved_by = None
+        for organizer, name in sorted(targets, key=lambda target: not target[0].copy_mode):
+            if not organizer.copy_mode:
+                if moved_by is not None:
+                    organizer._outcome(logging.WARNING, 'skip', source, organizer.destination / name,
+                                       f"Not moved: {name} (already moved by rule '{moved_by}')")
+                    organizer._count('skipped')
+                    continue
+                moved_by = self.rules[self.organizers.index(organizer)]['name']
+            func = organizer.process_folder if is_dir else organizer.process_file
+            organizer._run_timed(func, (source, name))
+    
+    def _transfer_buffered(self, source: Path, is_dir: bool, targets: list) -> list:
+        """Run _transfer in a worker thread, returning the log records of all its rules."""
+        records = []
+        for organizer in self.organizers:
+            organizer._log_buffer.records = records
+        try:
+            self._transfer(source, is_dir, targets)
+        finally:
+            for organizer in self.organizers:
+                organizer._log_buffer.records = None
+        return records
+    
+    def _execute(self, tasks: list) -> None:
+        """
+        Run the matched items, like FileOrganizer._execute: with workers > 1
+        at most 2 * workers items are queued at a time, and each item's log
+        lines (for every rule it went to) are emitted together, in order.
+        """
+        try:
+            if self.workers <= 1:
+                for task in tasks:
+                    self._transfer(*task)
+                return
+            
+            def flush(future):
+                for level, message in future.result():
+                    logging.log(level, message)
+            
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.submit(self._transfer_buffered, *task))
+                    if len(pending) >= self.workers * 2:
+                        flush(pending.popleft())
+                while pending:
+                    flush(pending.popleft())
+        finally:
+            for organizer in self.organizers:
+                organizer._flush_deletes()
+    
+    def report(self) -> dict:
+        """
+        Timings of the run and the report() of every rule, as plain data
+        (this is what --stats-json writes).
+        """
+        elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+        return {
+            'source': os.path.abspath(self.source),
+            'match': self.match,
+            'dry_run': self.dry_run,
+            'workers': self.workers,
+            'elapsed_seconds': round(elapsed, 6),
+            'phase_seconds': {name: round(seconds, 6) for name, seconds in self.phase_seconds.items()},
+            'throttle': self.throttle.report() if self.throttle is not None else None,
+            'rules': [dict(organizer.report(), name=rule['name'])
+                      for rule, organizer in zip(self.rules, self.organizers)],
+        }
+    
+    def _print_summary(self) -> None:
+        """Print one line per rule and the totals."""
+        logging.info("")
+        logging.info("=" * 60)
+        logging.info("OPERATION SUMMARY")
+        logging.info("=" * 60)
+        logging.info(f"  {'rule':<20} {'matched':>8} {'done':>8} {'skipped':>8} {'errors':>7}")
+        totals = [0, 0, 0, 0]
+        for rule, organizer in zip(self.rules, self.organizers):
+            stats = organizer.stats
+            row = [stats['matched'] + stats['folders_matched'], stats['processed'] + stats['folders_migrated'],
+                   stats['skipped'], stats['errors']]
+            totals = [total + value for total, value in zip(totals, row)]
+            logging.info(f"  {rule['name'][:20]:<20} {row[0]:8d} {row[1]:8d} {row[2]:8d} {row[3]:7d}")
+        logging.info(f"  {'total':<20} {totals[0]:8d} {totals[1]:8d} {totals[2]:8d} {totals[3]:7d}")
         
+        report = self.report()
+        logging.info(f"PERFORMANCE:")
+        logging.info(f"  Elapsed: {report['elapsed_seconds']:.3f}s")
+        logging.info(f"  Phases:  " + ", ".join(f"{name} {seconds:.3f}s"
+                                                 for name, seconds in report['phase_seconds'].items()))
+        peak = peak_rss_mb()
+        if peak is not None:
+            logging.info(f"  Peak memory (RSS): {peak:.1f} MB")
+        verified = sum(organizer.stats['verified'] for organizer in self.organizers)
+        if verified:
+            logging.info(f"VERIFY:")
+            logging.info(f"  Verified: {verified} file(s) "
+                         f"({'checksums' if self.organizers[0].verify == 'full' else 'size and mtime'})")
+            if self.manifest_path:
+                logging.info(f"  Manifest: {self.manifest_path}")
+        if self.throttle is not None and not self.dry_run:
+            logging.info(f"THROTTLE:")
+            for line in self.throttle.describe():
+                logging.info(f"  {line}")
         logging.info("=" * 60)
 
 
@@ -939,6 +5474,50 @@ GENERAL OPTIONS:
   
   # Verbose logging
   python file_organizer.py /source /dest -p "_old" -v --log operations.log
+  
+  # Transfer with 8 parallel threads
+  python file_organizer.py /source /dest -t ".mp4" --workers 8
+  
+  # Start copying while a huge source is still being scanned
+  python file_organizer.py /source /dest -t ".pdf" --stream --workers 4
+  
+  # Whole tree, keeping sub-folders, skipping .git and temp files
+  python file_organizer.py /source /dest -t ".pdf" -r --keep-structure --exclude ".git" "*.tmp"
+  
+  # Weekly run on a big share: only re-list folders that changed
+  python file_organizer.py /source /dest -t ".pdf" -r --index --log friday.log
+  
+  # Archive folders over 1 GB, re-using folder sizes from earlier runs
+  python file_organizer.py /source /dest --folder-min-size 1024 --folder-cache
+  
+  # Hardlink files whose content already exists at the destination
+  python file_organizer.py /source /dest -t ".jpg" -r --dedup hardlink
+  
+  # Sort photos into year/month folders
+  python file_organizer.py /source /photos -t ".jpg" -r --dest-template "{mtime:%Y}/{mtime:%m}"
+  
+  # The Friday routine: many rules and destinations, one scan of the source
+  python file_organizer.py /source --rules friday.json --workers 4
+  
+  # Review a plan, then execute exactly that plan without scanning again
+  python file_organizer.py /source /dest -t ".pdf" -r --plan pdfs.plan
+  python file_organizer.py --apply pdfs.plan --workers 4
+  
+  # Keep an inbox tidy: move new scans away as soon as they are written
+  python file_organizer.py /inbox /scans -t ".pdf" --watch
+  
+  # Daytime run on a shared disk: 20 MB/s, raised later by editing the control file
+  python file_organizer.py /source /dest -t ".mov" --max-mbps 20 --throttle-file caps.json
+  
+  # Crash-safe long move, and continuing it after an interruption
+  python file_organizer.py /source /dest -t ".mov" --journal move.journal
+  python file_organizer.py /source /dest -t ".mov" --journal move.journal --resume
+  
+  # Find out where a slow run spends its time (and memory)
+  python file_organizer.py /source /dest -t ".pdf" --profile prof --profile-memory
+  
+  # Evaluate large folder trees on 4 processes
+  python file_organizer.py /source /dest --folder-min-size 500 --scan-workers 4 --scan-mode process
 
 PATTERN SYNTAX:
   ^pattern  = Starts with pattern (e.g., "^Report")
@@ -981,6 +5560,103 @@ PATTERN SYNTAX:
                         help='Copy files instead of moving them')
     op_group.add_argument('--dry-run', action='store_true',
                         help='Preview operations without executing them')
+    op_group.add_argument('--verify', nargs='?', const='full', choices=['full', 'fast'],
+                        help='Verify every copied file: checksums computed during the copy (default), '
+                             'or "fast" size and mtime checks; checksums go to a b2sum manifest next to --log '
+                             '(or ./file_folder_migration.b2sum)')
+    op_group.add_argument('--dedup', choices=['skip', 'hardlink', 'report'],
+                        help='Detect files whose content is already at the destination (or earlier in '
+                             'this run) and skip them, hardlink them, or only report them')
+    op_group.add_argument('--strict', action='store_true',
+                        help='Look each destination name up on disk before the item is transferred '
+                             '(destinations written by other programs during the run)')
+    op_group.add_argument('--dest-template', metavar='TEMPLATE',
+                        help='Sort items into sub-folders of destination, e.g. "{ext}/{mtime:%%Y}/{mtime:%%m}" '
+                             '(fields: name, stem, ext, mtime, size, dir)')
+    op_group.add_argument('--workers', type=int, default=1, metavar='N',
+                        help='Number of parallel transfer threads (default: 1)')
+    op_group.add_argument('--copy-threads', type=int, default=4, metavar='N',
+                        help='Threads per cross-device move (default: 4)')
+    op_group.add_argument('--large-file-mb', type=float, metavar='MB',
+                        help='Copy files of at least MB megabytes without filling the page cache '
+                             '(streamed with posix_fadvise; default: off)')
+    op_group.add_argument('--buffer-size', type=int, default=COPY_BUFSIZE // 1024, metavar='KB',
+                        help=f'Buffer size of read/write copies in KB (default: {COPY_BUFSIZE // 1024})')
+    op_group.add_argument('--no-buffer-reuse', dest='reuse_buffers', action='store_false',
+                        help='Allocate a new copy buffer per file instead of one per thread')
+    op_group.add_argument('--stream', action='store_true',
+                        help='Start transfers while the source is still being scanned')
+    op_group.add_argument('--scan-workers', type=int, default=1, metavar='N',
+                        help='Number of parallel workers evaluating folder criteria (default: 1)')
+    op_group.add_argument('--scan-mode', choices=['thread', 'process'], default='thread',
+                        help='Use a thread or process pool for --scan-workers (default: thread)')
+    
+    # Recursive scanning options
+    tree_group = parser.add_argument_group('Recursive Options')
+    tree_group.add_argument('-r', '--recursive', action='store_true',
+                        help='Walk the whole source tree, not only its direct children')
+    tree_group.add_argument('--max-depth', type=int, metavar='N',
+                        help='Descend at most N levels below source (with --recursive)')
+    tree_group.add_argument('--keep-structure', action='store_true',
+                        help='Recreate relative folders under destination (with --recursive)')
+    tree_group.add_argument('--exclude', nargs='+', metavar='GLOB',
+                        help='File/folder names to skip (e.g., ".git", "*.tmp")')
+    
+    # Rules file options
+    rules_group = parser.add_argument_group('Rules File Options')
+    rules_group.add_argument('--rules', metavar='FILE',
+                        help='Run many rules, each with its own destination and copy/move mode, over one scan '
+                             'of the source (JSON, or TOML on Python 3.11+); replaces the filter options')
+    rules_group.add_argument('--match', choices=['first', 'all'],
+                        help='Give each item to the first matching rule, or to all of them '
+                             '(default: the rules file\'s "match", else first)')
+    
+    # Throttle options
+    throttle_group = parser.add_argument_group('Throttle Options')
+    throttle_group.add_argument('--max-mbps', type=float, metavar='MB',
+                        help='Copy at most MB megabytes per second, across all workers')
+    throttle_group.add_argument('--max-ops-per-sec', type=float, metavar='N',
+                        help='Copy or move at most N items per second, across all workers')
+    throttle_group.add_argument('--throttle-file', metavar='FILE',
+                        help='JSON control file written with the caps; edit it (or send SIGHUP after editing) '
+                             'to change them while the run goes on, e.g. {"max_mbps": 20, "max_ops_per_sec": null}')
+    
+    # Watch options
+    watch_group = parser.add_argument_group('Watch Options')
+    watch_group.add_argument('--watch', nargs='?', const='auto', choices=['auto', 'inotify', 'poll'],
+                        help='Keep running and migrate matching items as they arrive in source '
+                             '(inotify on Linux, else polling; default: auto)')
+    watch_group.add_argument('--settle', type=float, default=WATCH_SETTLE_SECONDS, metavar='SECONDS',
+                        help=f'With --watch, wait until an item has not changed for SECONDS, unless its '
+                             f'writer closed it (inotify) (default: {WATCH_SETTLE_SECONDS:g})')
+    watch_group.add_argument('--poll-interval', type=float, default=WATCH_POLL_SECONDS, metavar='SECONDS',
+                        help=f'With --watch poll, seconds between checks (default: {WATCH_POLL_SECONDS:g})')
+    
+    # Plan options
+    plan_group = parser.add_argument_group('Plan Options')
+    plan_group.add_argument('--plan', metavar='FILE',
+                        help='Scan and match only (like --dry-run), writing every operation to a plan file')
+    plan_group.add_argument('--apply', metavar='FILE',
+                        help='Execute a plan file without scanning; items changed since planning are skipped '
+                             '(source, destination, mode and filters come from the plan)')
+    
+    # Journal options
+    journal_group = parser.add_argument_group('Journal Options')
+    journal_group.add_argument('--journal', metavar='FILE',
+                        help='Record every planned and completed operation in a crash-safe journal')
+    journal_group.add_argument('--resume', action='store_true',
+                        help='Continue the interrupted run recorded in --journal')
+    
+    # Cache options
+    cache_group = parser.add_argument_group('Cache Options')
+    cache_group.add_argument('--index', nargs='?', const='', metavar='FILE',
+                        help='Keep a sqlite3 scan index so unchanged folders are not re-listed '
+                             '(default file: next to --log, or ./file_folder_migration.index.db)')
+    cache_group.add_argument('--folder-cache', nargs='?', const='', metavar='FILE',
+                        help='Cache folder sizes/file types between runs, validated by folder mtimes '
+                             '(default file: next to --log, or ./file_folder_migration.folders.db)')
+    cache_group.add_argument('--folder-cache-size', type=int, default=10000, metavar='N',
+                        help='Maximum number of folders kept in the folder cache (default: 10000)')
     
     # Logging options
     log_group = parser.add_argument_group('Logging Options')
@@ -988,6 +5664,28 @@ PATTERN SYNTAX:
                         help='Enable verbose logging')
     log_group.add_argument('--log', metavar='FILE',
                         help='Save log output to file')
+    log_group.add_argument('--log-background', action='store_true',
+                        help='Format and write log lines on a background thread')
+    log_group.add_argument('--per-file', choices=['all', 'sample', 'none'], default='all',
+                        help='Per-file log lines: all (default), one in --log-sample, or none (summary only); '
+                             'warnings and errors are always logged')
+    log_group.add_argument('--log-sample', type=int, default=100, metavar='N',
+                        help='Log one in N files with --per-file sample (default: 100)')
+    log_group.add_argument('--op-log', metavar='FILE',
+                        help='Write every operation to FILE as compact JSON lines, in batches')
+    log_group.add_argument('--stats-json', metavar='FILE',
+                        help='Write counters, phase timings, throughput and latency percentiles to FILE as JSON')
+    
+    # Profiling options
+    profile_group = parser.add_argument_group('Profiling Options')
+    profile_group.add_argument('--profile', nargs='?', const='', metavar='DIR',
+                        help='Profile each phase (validate, scan, folder_scan, file_scan, transfer) with cProfile, '
+                             'save DIR/<phase>.pstats and print the hottest functions '
+                             '(default DIR: next to --log, or ./file_folder_migration.profile)')
+    profile_group.add_argument('--profile-top', type=int, default=PROFILE_TOP, metavar='N',
+                        help=f'Functions / allocation sites printed per phase (default: {PROFILE_TOP})')
+    profile_group.add_argument('--profile-memory', action='store_true',
+                        help='With --profile, also compare tracemalloc snapshots taken at the end of each phase')
     
     return parser.parse_args()
 
@@ -996,12 +5694,64 @@ PATTERN SYNTAX:
 # MAIN EXECUTION
 # ============================================
 
+def run_rules(args, folder_cache, throttle=None, manifest: str = None) -> int:
+    """Run a rules file (--rules); returns the exit code."""
+    unsupported = [option for option, used in (
+        ('--copy', args.copy), ('--journal', args.journal), ('--plan', args.plan), ('--apply', args.apply),
+        ('--dedup', args.dedup), ('--index', args.index is not None), ('--stream', args.stream),
+        ('--recursive', args.recursive), ('--profile', args.profile is not None),
+        ('--dest-template (use the rules\' "template" key)', args.dest_template),
+    ) if used]
+    if unsupported:
+        logging.error(f"--rules cannot be combined with {', '.join(unsupported)}")
+        return 1
+    if args.destination != DEFAULT_DESTINATION:
+        logging.error("With --rules, every rule has its own destination; give only the source")
+        return 1
+    try:
+        match, rules = load_rules(args.rules)
+    except (OSError, ValueError) as e:
+        logging.error(f"Cannot read rules file: {e}")
+        return 1
+    
+    organizer = MultiRuleOrganizer(
+        args.source,
+        rules,
+        match=args.match or match,
+        dry_run=args.dry_run,
+        workers=args.workers,
+        folder_cache=folder_cache,
+        op_log=args.op_log,
+        exclude=args.exclude,
+        copy_threads=args.copy_threads,
+        large_file_mb=args.large_file_mb,
+        buffer_size=args.buffer_size * 1024,
+        reuse_buffers=args.reuse_buffers,
+        throttle=throttle,
+        verify=args.verify,
+        manifest=manifest,
+        strict=args.strict,
+        log_items=args.per_file,
+        log_sample=args.log_sample
+    )
+    results = organizer.organize()
+    
+    if args.stats_json:
+        with open(args.stats_json, 'w', encoding='utf-8') as f:
+            json.dump(organizer.report(), f, indent=2)
+    
+    return 1 if any(stats['errors'] for stats in results) else 0
+
+
 def main():
     """Main entry point for the application."""
     args = parse_arguments()
     
+    # Only the command line owns the process's logging switches
+    skip_record_lookups()
+    
     # Setup logging
-    setup_logging(log_file=args.log, verbose=args.verbose)
+    setup_logging(log_file=args.log, verbose=args.verbose, background=args.log_background)
     
     # Check if any folder migration options are specified
     has_folder_options = any([
@@ -1085,13 +5835,87 @@ def main():
         # Use default from configuration
         pattern = FILES_TO_MIGRATE
     
+    if args.resume and not args.journal:
+        logging.error("--resume needs the --journal FILE of the interrupted run")
+        return 1
+    
+    # A plan brings its own source, destination, mode and filters; the plan
+    # is the source of truth, filter options that differ only get a warning
+    if args.apply:
+        if args.plan:
+            logging.error("--plan and --apply cannot be used together")
+            return 1
+        try:
+            plan = OperationPlan.read_header(args.apply)
+        except (OSError, ValueError) as e:
+            logging.error(f"Cannot apply plan: {e}")
+            return 1
+        if args.source == DEFAULT_SOURCE:
+            args.source = plan['source']
+        if args.destination == DEFAULT_DESTINATION:
+            args.destination = plan['destination']
+        args.copy = args.copy or plan['copy']
+        if not has_file_options:
+            pattern = plan.get('pattern')
+        if not has_folder_options:
+            folders_to_migrate = plan.get('folders')
+    
     # Check if at least one migration type is enabled
-    if pattern is None and folders_to_migrate is None:
+    if pattern is None and folders_to_migrate is None and not args.rules:
         logging.error("No migration enabled. Please enable either FILES_TO_MIGRATE or FOLDERS_TO_MIGRATE in the configuration,")
         logging.error("or provide command line options for file filtering (-p, -t, --min-size, --max-size)")
         logging.error("or folder filtering (--folder-pattern, --folder-contains, --folder-min-size, --folder-max-size)")
         return 1
     
+    # Scan index and folder cache files default to sitting next to the log file
+    log_base = os.path.splitext(args.log)[0] if args.log else 'file_folder_migration'
+    index = args.index
+    if index == '':
+        index = log_base + '.index.db'
+    
+    profile = args.profile
+    if profile == '':
+        profile = log_base + '.profile'
+    if args.profile_memory and profile is None:
+        logging.error("--profile-memory needs --profile")
+        return 1
+    
+    folder_cache = None
+    if args.folder_cache is not None:
+        folder_cache = FolderCache(args.folder_cache or log_base + '.folders.db',
+                                   max_entries=args.folder_cache_size)
+    
+    if args.watch:
+        unsupported = [option for option, used in (
+            ('--recursive', args.recursive), ('--stream', args.stream), ('--plan', args.plan),
+            ('--apply', args.apply), ('--rules', args.rules), ('--journal', args.journal),
+        ) if used]
+        if unsupported:
+            logging.error(f"--watch cannot be combined with {', '.join(unsupported)}")
+            return 1
+    
+    throttle = None
+    if args.max_mbps is not None or args.max_ops_per_sec is not None or args.throttle_file:
+        try:
+            throttle = Throttle(args.max_mbps, args.max_ops_per_sec, args.throttle_file)
+        except OSError as e:
+            logging.error(f"Cannot write throttle control file: {e}")
+            return 1
+        if args.throttle_file and hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, lambda signum, frame: throttle.request_reload())
+        logging.info(f"Throttle: {throttle.describe_caps()}")
+    
+    if args.rules:
+        return run_rules(args, folder_cache, throttle,
+                         manifest=log_base + '.b2sum' if args.verify == 'full' else None)
+    
+    if args.dest_template:
+        try:
+            DestinationTemplate(args.dest_template)
+        except ValueError as e:
+            logging.error(str(e))
+            return 1
+    
     # Create organizer instance
     organizer = FileOrganizer(
         source=args.source,
@@ -1099,11 +5923,48 @@ def main():
         pattern=pattern,
         folders_to_migrate=folders_to_migrate,
         copy_mode=args.copy,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        workers=args.workers,
+        scan_workers=args.scan_workers,
+        scan_mode=args.scan_mode,
+        stream=args.stream,
+        recursive=args.recursive,
+        max_depth=args.max_depth,
+        exclude=args.exclude,
+        keep_structure=args.keep_structure,
+        copy_threads=args.copy_threads,
+        large_file_mb=args.large_file_mb,
+        buffer_size=args.buffer_size * 1024,
+        reuse_buffers=args.reuse_buffers,
+        throttle=throttle,
+        index=index,
+        folder_cache=folder_cache,
+        journal=args.journal,
+        resume=args.resume,
+        verify=args.verify,
+        manifest=log_base + '.b2sum' if args.verify == 'full' or args.dedup else None,
+        dedup=args.dedup,
+        strict=args.strict,
+        log_items=args.per_file,
+        log_sample=args.log_sample,
+        op_log=args.op_log,
+        profile=profile,
+        profile_memory=args.profile_memory,
+        profile_top=args.profile_top,
+        plan=args.plan,
+        apply=args.apply,
+        destination_template=args.dest_template
     )
     
     # Execute organization
-    stats = organizer.organize()
+    if args.watch:
+        stats = organizer.watch(args.watch, settle=args.settle, poll_interval=args.poll_interval)
+    else:
+        stats = organizer.organize()
+    
+    if args.stats_json:
+        with open(args.stats_json, 'w', encoding='utf-8') as f:
+            json.dump(organizer.report(), f, indent=2)
     
     # Exit with appropriate code
     exit_code = 1 if stats['errors'] > 0 else 0
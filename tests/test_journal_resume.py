@@ -0,0 +1,124 @@
+"""
+Crash test for --journal / --resume: runs are killed with SIGKILL after a
+random number of operations, resumed (and killed again), and the final
+trees are compared with what an uninterrupted run produces.
+
+Run with:  python -m pytest tests
+"""
+
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'file_folder_migration.py')
+
+# Destinations on another device exercise the copy + verify + delete path
+# of moves; /dev/shm is a tmpfs on most Linux systems
+CROSS_DEVICE_ROOT = '/dev/shm'
+
+
+def make_tree(root: str, rng: random.Random) -> None:
+    """Loose files matching '_1' (some large enough to be interrupted) and 'Project' folders."""
+    os.makedirs(root)
+    for i in range(40):
+        size = rng.choice([0, 100, 5000, 300000, 2000000])
+        with open(os.path.join(root, f'file_{i:03d}_1.bin'), 'wb') as f:
+            f.write(rng.randbytes(size) if hasattr(rng, 'randbytes') else os.urandom(size))
+    for i in range(4):
+        folder = os.path.join(root, f'Project_{i}', 'sub')
+        os.makedirs(folder)
+        for j in range(5):
+            with open(os.path.join(folder, f'doc_{j}.txt'), 'w') as f:
+                f.write(f'{i}/{j}\n' * (j + 1) * 1000)
+    with open(os.path.join(root, 'unmatched.txt'), 'w') as f:
+        f.write('stays\n')
+
+
+def snapshot(root: str) -> dict:
+    """{relative path: contents} of every file below root."""
+    files = {}
+    for folder, dirs, names in os.walk(root):
+        for name in names:
+            path = os.path.join(folder, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+class JournalResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = os.path.join(self.tmp.name, 'src')
+        self.journal = os.path.join(self.tmp.name, 'run.journal')
+    
+    def command(self, destination: str, copy: bool, resume: bool) -> list:
+        command = [sys.executable, SCRIPT, self.source, destination, '-p', '_1', '--folder-pattern', '^Project',
+                   '--workers', '2', '--journal', self.journal]
+        return command + (['--copy'] if copy else []) + (['--resume'] if resume else [])
+    
+    def run_killed(self, command: list, operations: int) -> bool:
+        """Run command and SIGKILL it after the given number of logged operations; False if it finished first."""
+        env = dict(os.environ, PYTHONUNBUFFERED='1')
+        process = subprocess.Popen(command, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, env=env,
+                                   universal_newlines=True)
+        seen = 0
+        for line in process.stderr:
+            if ' - INFO - Copied' in line or ' - INFO - Moved' in line:
+                seen += 1
+                if seen >= operations:
+                    process.send_signal(signal.SIGKILL)
+                    break
+        process.stderr.close()
+        process.wait()
+        return process.returncode == -signal.SIGKILL
+    
+    def check(self, destination: str, copy: bool, seed: int) -> None:
+        rng = random.Random(seed)
+        make_tree(self.source, rng)
+        expected = {path: data for path, data in snapshot(self.source).items() if path != 'unmatched.txt'}
+        
+        # Killed during the first run, then (maybe) during a resume as well
+        killed = self.run_killed(self.command(destination, copy, resume=False), rng.randint(1, 30))
+        if killed and rng.random() < 0.5:
+            self.run_killed(self.command(destination, copy, resume=True), rng.randint(1, 10))
+        if killed:
+            result = subprocess.run(self.command(destination, copy, resume=True),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+            self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        
+        self.assertEqual(snapshot(destination), expected, f"seed {seed}")
+        remaining = set(snapshot(self.source))
+        self.assertEqual(remaining, set(expected) | {'unmatched.txt'} if copy else {'unmatched.txt'},
+                         f"seed {seed}")
+    
+    def test_copy(self):
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                self.setUp()
+                self.check(os.path.join(self.tmp.name, 'dst'), copy=True, seed=seed)
+    
+    def test_move(self):
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                self.setUp()
+                self.check(os.path.join(self.tmp.name, 'dst'), copy=False, seed=seed)
+    
+    @unittest.skipUnless(os.path.isdir(CROSS_DEVICE_ROOT), "no tmpfs at " + CROSS_DEVICE_ROOT)
+    def test_move_across_devices(self):
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                self.setUp()
+                destination = tempfile.mkdtemp(dir=CROSS_DEVICE_ROOT)
+                self.addCleanup(subprocess.call, ['rm', '-rf', destination])
+                os.rmdir(destination)
+                self.check(destination, copy=False, seed=seed)
+
+
+if __name__ == '__main__':
+    unittest.main()
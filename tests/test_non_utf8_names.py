@@ -0,0 +1,106 @@
+"""
+File names that are not valid UTF-8 (os hands them over with surrogate
+escapes) must survive every file the script writes about them.
+
+Run with:  python -m pytest tests
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'file_folder_migration.py')
+
+# Latin-1 byte, not valid UTF-8 on its own
+BAD_NAME = b'bad\xff_1.txt'
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), "needs a filesystem that takes any bytes in names")
+class NonUtf8NamesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = os.path.join(self.tmp.name, 'src')
+        self.destination = os.path.join(self.tmp.name, 'dst')
+        os.makedirs(self.source)
+        with open(os.path.join(os.fsencode(self.source), BAD_NAME), 'wb') as f:
+            f.write(b'data\n')
+    
+    def run_script(self, *options) -> subprocess.CompletedProcess:
+        result = subprocess.run([sys.executable, SCRIPT, self.source, self.destination, '-p', '_1'] + list(options),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True,
+                                cwd=self.tmp.name)
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        self.assertNotIn('Traceback', result.stderr)
+        return result
+    
+    def assert_moved(self):
+        self.assertEqual(os.listdir(os.fsencode(self.destination)), [BAD_NAME])
+        self.assertEqual(os.listdir(os.fsencode(self.source)), [])
+    
+    def test_op_log(self):
+        op_log = os.path.join(self.tmp.name, 'ops.jsonl')
+        self.run_script('--op-log', op_log)
+        self.assert_moved()
+        
+        with open(op_log, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record['op'] for record in records], ['move'])
+        self.assertEqual(os.fsencode(records[0]['dst']), os.path.join(os.fsencode(self.destination), BAD_NAME))
+
+    
+    def test_log_file(self):
+        for option in ([], ['--log-background']):
+            with self.subTest(option=option):
+                self.setUp()
+                log = os.path.join(self.tmp.name, 'run.log')
+                self.run_script('--log', log, *option)
+                self.assert_moved()
+                with open(log, encoding='utf-8') as f:
+                    self.assertIn('Moved: bad\\udcff_1.txt', f.read())
+    
+    def test_plan_and_apply(self):
+        plan = os.path.join(self.tmp.name, 'plan.jsonl')
+        self.run_script('--plan', plan)
+        self.assertEqual(os.listdir(os.fsencode(self.source)), [BAD_NAME])
+        
+        result = subprocess.run([sys.executable, SCRIPT, '--apply', plan], stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, universal_newlines=True, cwd=self.tmp.name)
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        self.assert_moved()
+
+    
+    def test_verify_manifest(self):
+        # Names b2sum escapes, next to the undecodable one
+        for name in (b'back\\slash_1.txt', b'new\nline_1.txt'):
+            with open(os.path.join(os.fsencode(self.source), name), 'wb') as f:
+                f.write(name)
+        result = self.run_script('--copy', '--verify')
+        self.assertNotIn('Error processing', result.stderr)
+        
+        # Without --log, in the current folder
+        manifest = os.path.join(self.tmp.name, 'file_folder_migration.b2sum')
+        with open(manifest, 'rb') as f:
+            digests = [line for line in f if not line.startswith(b'#')]
+        self.assertEqual(len(digests), 3)
+        if shutil.which('b2sum'):
+            check = subprocess.run(['b2sum', '-c', '--strict', manifest], cwd=self.destination,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            self.assertEqual(check.returncode, 0, check.stdout)
+        
+        # Read back for --dedup: every destination hash comes from the manifest
+        sys.path.insert(0, os.path.dirname(SCRIPT))
+        from file_folder_migration import read_manifest
+        known = read_manifest(manifest, self.destination)
+        self.assertEqual(sorted(os.fsencode(path) for path in known),
+                         sorted(os.path.join(os.fsencode(self.destination), name)
+                                for name in os.listdir(os.fsencode(self.destination))))
+
+
+if __name__ == '__main__':
+    unittest.main()